@@ -0,0 +1,144 @@
+"""
+Adaptive Inference
+Feedback controller that trades detector input size and detection interval against measured latency to hold a target frame rate
+"""
+
+import logging
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+STRIDE = 32  # YOLO input sizes must be multiples of the largest feature stride
+
+
+class AdaptiveController:
+    """
+    Keeps per-frame processing within the frame budget of a target FPS
+
+    Every processed frame reports how long it took and whether the
+    detector ran on it. The controller keeps exponential moving averages
+    of the detector's latency and of the remaining per-frame work
+    (tracking, counting, drawing, encoding), and from them the load:
+
+        load = (overhead + detector latency / interval) * target_fps
+
+    A load above 1 means frames take longer than they arrive and the
+    pipeline falls behind the stream. When that persists, the controller
+    first shrinks the detector's input size (latency falls roughly with
+    its square, and small objects are the only loss), and only at the
+    minimum size starts detecting less often, leaving the tracker to
+    carry boxes in between. When the load falls well below 1 it undoes
+    these steps in reverse order: detection interval first, input size
+    last. An upward step is only taken when the predicted load after it
+    still stays under the upper threshold, and every change is followed
+    by a cooldown of detector runs, so the controller settles instead
+    of oscillating between two settings.
+
+    Args:
+        target_fps: Frame rate to sustain, usually the stream's
+        min_imgsz, max_imgsz: Bounds of the detector input size
+        min_interval, max_interval: Bounds of the detect-every-N-frames interval
+        high, low: Load above which to degrade and below which to recover
+        smoothing: Weight of the newest sample in the moving averages
+        cooldown: Detector runs to wait after a change before the next one
+    """
+
+    def __init__(self, target_fps: float = 15.0, min_imgsz: int = 320, max_imgsz: int = 640,
+                 min_interval: int = 1, max_interval: int = 6, high: float = 0.9, low: float = 0.6,
+                 smoothing: float = 0.2, cooldown: int = 5):
+        if target_fps <= 0:
+            raise ValueError("target_fps must be positive")
+        self.target_fps = target_fps
+        self.min_imgsz = max(STRIDE, min_imgsz // STRIDE * STRIDE)
+        self.max_imgsz = max(self.min_imgsz, max_imgsz // STRIDE * STRIDE)
+        self.min_interval = max(1, min_interval)
+        self.max_interval = max(self.min_interval, max_interval)
+        self.high = high
+        self.low = low
+        self.smoothing = smoothing
+        self.cooldown = cooldown
+
+        self.imgsz = self.max_imgsz
+        self.interval = self.min_interval
+        self.adjustments = 0
+        self._detect_latency = None
+        self._overhead = None
+        self._since_change = 0
+        self._since_detect = None
+
+    def should_detect(self) -> bool:
+        """Call once per frame; True when the detector is due on this frame"""
+        if self._since_detect is None or self._since_detect + 1 >= self.interval:
+            self._since_detect = 0
+            return True
+        self._since_detect += 1
+        return False
+
+    def _average(self, current, sample: float) -> float:
+        return sample if current is None else current + self.smoothing * (sample - current)
+
+    def load_at(self, imgsz: int, interval: int) -> float:
+        """Predicted load at another setting, assuming detector latency scales with input area"""
+        if self._detect_latency is None:
+            return 0.0
+        latency = self._detect_latency * (imgsz / self.imgsz) ** 2
+        return ((self._overhead or 0.0) + latency / interval) * self.target_fps
+
+    @property
+    def load(self) -> float:
+        return self.load_at(self.imgsz, self.interval)
+
+    def record(self, frame_seconds: float, detect_seconds: float = 0.0, detected: bool = False):
+        """
+        Report one processed frame and adjust the settings if needed
+
+        Args:
+            frame_seconds: Total processing time of the frame, detector included
+            detect_seconds: Time spent in the detector on this frame
+            detected: Whether the detector ran on this frame
+        """
+        self._overhead = self._average(self._overhead, max(frame_seconds - detect_seconds, 0.0))
+        if not detected:
+            return
+        self._detect_latency = self._average(self._detect_latency, detect_seconds)
+        self._since_change += 1
+        if self._since_change < self.cooldown:
+            return
+
+        load = self.load
+        if load > self.high:
+            if self.imgsz > self.min_imgsz:
+                # Pick the largest size predicted to fit, so a sudden overload is fixed in one step
+                size = self.imgsz - STRIDE
+                while size > self.min_imgsz and self.load_at(size, self.interval) > self.high:
+                    size -= STRIDE
+                self._set(size, self.interval, load)
+            elif self.interval < self.max_interval:
+                self._set(self.imgsz, self.interval + 1, load)
+        elif load < self.low:
+            if self.interval > self.min_interval and self.load_at(self.imgsz, self.interval - 1) < self.high:
+                self._set(self.imgsz, self.interval - 1, load)
+            elif (self.interval == self.min_interval and self.imgsz < self.max_imgsz
+                  and self.load_at(self.imgsz + STRIDE, self.interval) < self.high):
+                self._set(self.imgsz + STRIDE, self.interval, load)
+
+    def _set(self, imgsz: int, interval: int, load: float):
+        logger.info(f"Load {load:.2f} at {self.imgsz}px every {self.interval} frame(s); "
+                    f"switching to {imgsz}px every {interval} frame(s)")
+        # Rescale the latency estimate so the next decision does not wait for the average to catch up
+        self._detect_latency *= (imgsz / self.imgsz) ** 2
+        self.imgsz = imgsz
+        self.interval = interval
+        self.adjustments += 1
+        self._since_change = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Current input size, interval, load and smoothed latencies"""
+        return {
+            'imgsz': self.imgsz,
+            'interval': self.interval,
+            'load': self.load,
+            'detect_ms': (self._detect_latency or 0.0) * 1000,
+            'overhead_ms': (self._overhead or 0.0) * 1000,
+            'adjustments': self.adjustments,
+        }
@@ -65,6 +65,55 @@ class Config:
         self.MAIN_CAMERA_STREAM_URL = os.getenv('MAIN_CAMERA_STREAM_URL', '')
         self.BACKUP_CAMERA_STREAM_URL = os.getenv('BACKUP_CAMERA_STREAM_URL', '')
         self.TRAFFIC_CAMERA_API_KEY = os.getenv('TRAFFIC_CAMERA_API_KEY', '')
+        # A stream with no frame for this long is reopened; reconnects back off up to STREAM_MAX_BACKOFF seconds
+        self.STREAM_STALL_TIMEOUT = float(os.getenv('STREAM_STALL_TIMEOUT', '10'))
+        self.STREAM_MAX_BACKOFF = float(os.getenv('STREAM_MAX_BACKOFF', '30'))
+        # Extra intersection cameras for the multi-camera vehicle counter (comma-separated URLs)
+        self.CAMERA_STREAM_URLS = [url.strip() for url in os.getenv('CAMERA_STREAM_URLS', '').split(',') if url.strip()]
+        self.CAMERA_TARGET_FPS = float(os.getenv('CAMERA_TARGET_FPS', '5'))
+        self.DETECTION_BATCH_SIZE = int(os.getenv('DETECTION_BATCH_SIZE', '8'))
+        # Vehicle detector: torch, onnx, onnx-int8, openvino or openvino-int8
+        self.DETECTION_BACKEND = os.getenv('DETECTION_BACKEND', 'torch')
+        self.DETECTION_MODEL = os.getenv('DETECTION_MODEL', 'yolov8n.pt')
+        self.DETECTION_IMGSZ = int(os.getenv('DETECTION_IMGSZ', '640'))
+        self.DETECTION_MODEL_DIR = os.getenv('DETECTION_MODEL_DIR', 'data/models')
+        self.DETECTION_CALIBRATION_DIR = os.getenv('DETECTION_CALIBRATION_DIR', 'data/calibration')
+        # Adaptive inference: shrink the input size, then detect less often, to keep up with INFERENCE_TARGET_FPS
+        self.ADAPTIVE_INFERENCE = os.getenv('ADAPTIVE_INFERENCE', 'true').lower() == 'true'
+        self.INFERENCE_TARGET_FPS = float(os.getenv('INFERENCE_TARGET_FPS', '15'))
+        self.ADAPTIVE_MIN_IMGSZ = int(os.getenv('ADAPTIVE_MIN_IMGSZ', '320'))
+        self.ADAPTIVE_MAX_INTERVAL = int(os.getenv('ADAPTIVE_MAX_INTERVAL', '6'))
+        # Skip detection when nothing moves (off, diff or mog2) and analyse only road regions
+        self.MOTION_GATING = os.getenv('MOTION_GATING', 'diff')
+        self.MOTION_THRESHOLD = float(os.getenv('MOTION_THRESHOLD', '0.003'))
+        self.MOTION_HEARTBEAT = int(os.getenv('MOTION_HEARTBEAT', '30'))
+        self.DETECTION_ROIS = os.getenv('DETECTION_ROIS', '')  # x1,y1,x2,y2;... as fractions of the frame
+        # Counting lines and polygons, kind:name:x1,y1,x2,y2,...;... (empty = one trip line at half height)
+        self.COUNTING_ZONES = os.getenv('COUNTING_ZONES', '')
+        # Counts written by the headless detection worker and read by the dashboard
+        self.COUNT_STORE_PATH = os.getenv('COUNT_STORE_PATH', 'data/vehicle_counts.db')
+        self.COUNT_INTERVAL_SECONDS = int(os.getenv('COUNT_INTERVAL_SECONDS', '60'))
+        self.REPLAY_VIDEO_PATH = os.getenv('REPLAY_VIDEO_PATH', '')  # local clip replayed instead of the live stream
+        # Annotated frames sent to the browser: streamlit (throttled JPEG) or mjpeg (local endpoint)
+        self.FRAME_DELIVERY = os.getenv('FRAME_DELIVERY', 'streamlit')
+        self.DISPLAY_WIDTH = int(os.getenv('DISPLAY_WIDTH', '960'))
+        self.DISPLAY_FPS = float(os.getenv('DISPLAY_FPS', '10'))
+        self.JPEG_TARGET_KB = float(os.getenv('JPEG_TARGET_KB', '60'))
+        self.MJPEG_PORT = int(os.getenv('MJPEG_PORT', '8765'))
+        
+        # =============================================================================
+        # AI ASSISTANT (RETRIEVAL & CHAT)
+        # =============================================================================
+        self.CHAT_BACKEND = os.getenv('CHAT_BACKEND', 'auto')  # auto, gemini or offline
+        self.GEMINI_MODEL_NAME = os.getenv('GEMINI_MODEL_NAME', 'gemini-1.5-flash')
+        self.EMBEDDING_MODEL_NAME = os.getenv('EMBEDDING_MODEL_NAME', 'sentence-transformers/all-MiniLM-L6-v2')
+        self.VECTORSTORE_DIR = os.getenv('VECTORSTORE_DIR', 'data/vectorstore')
+        self.EMBEDDING_CACHE_DIR = os.getenv('EMBEDDING_CACHE_DIR', 'data/vectorstore/embeddings')
+        self.EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '512'))
+        self.EMBEDDING_WORKERS = int(os.getenv('EMBEDDING_WORKERS', '0'))  # 0 = pick from CPU count
+        self.DOCUMENTS_DIR = os.getenv('DOCUMENTS_DIR', 'data/documents')
+        self.RETRIEVAL_TOP_K = int(os.getenv('RETRIEVAL_TOP_K', '4'))
+        self.CHAT_CACHE_SIMILARITY = float(os.getenv('CHAT_CACHE_SIMILARITY', '0.92'))
         
         # =============================================================================
         # APPLICATION SETTINGS
@@ -169,6 +218,16 @@ class Config:
             'west': self.CORAL_GABLES_WEST_BOUNDARY,
         }
     
+    def get_camera_streams(self) -> Dict[str, str]:
+        """Get the configured camera streams by name, main camera first"""
+        streams = {}
+        if self.MAIN_CAMERA_STREAM_URL:
+            streams['Main camera'] = self.MAIN_CAMERA_STREAM_URL
+        for index, url in enumerate(self.CAMERA_STREAM_URLS, start=1):
+            if url not in streams.values():
+                streams[f'Camera {index}'] = url
+        return streams
+    
     def get_default_location(self) -> tuple:
         """Get the default latitude and longitude"""
         return (self.DEFAULT_LATITUDE, self.DEFAULT_LONGITUDE)
@@ -0,0 +1,67 @@
+"""
+Bounded Conversation Context
+Rolling window of recent chat turns with older turns folded into a fixed-size summary
+"""
+
+import re
+from collections import deque
+from typing import Callable, Optional
+
+# Summariser signature: (current summary, question, answer) -> new summary
+Summarizer = Callable[[str, str, str], str]
+
+
+def _first_sentence(text: str, limit: int) -> str:
+    text = re.sub(r'\s+', ' ', text).strip()
+    sentence = re.split(r'(?<=[.!?])\s', text, maxsplit=1)[0]
+    return sentence if len(sentence) <= limit else sentence[:limit - 3].rstrip() + '...'
+
+
+def extractive_summarizer(summary: str, question: str, answer: str) -> str:
+    """Append a one-line digest of a turn to the running summary"""
+    line = f"- Asked: {_first_sentence(question, 100)} Answered: {_first_sentence(answer, 160)}"
+    return f"{summary}\n{line}" if summary else line
+
+
+class ConversationContext:
+    """
+    Prompt-side memory of a chat session with a bounded size
+
+    The last max_recent_turns turns are kept verbatim. Older turns are
+    folded into a running summary that is trimmed to max_summary_chars,
+    keeping the most recent part, so the rendered context (and the cost
+    of every LLM call) stays flat however long the session runs.
+    """
+
+    def __init__(self, max_recent_turns: int = 4, max_summary_chars: int = 1200,
+                 summarizer: Optional[Summarizer] = None):
+        self.max_recent_turns = max_recent_turns
+        self.max_summary_chars = max_summary_chars
+        self.summarizer = summarizer or extractive_summarizer
+        self.recent = deque()
+        self.summary = ""
+        self.total_turns = 0
+
+    def add_turn(self, question: str, answer: str):
+        self.recent.append((question, answer))
+        self.total_turns += 1
+        while len(self.recent) > self.max_recent_turns:
+            old_question, old_answer = self.recent.popleft()
+            self.summary = self.summarizer(self.summary, old_question, old_answer)
+            if len(self.summary) > self.max_summary_chars:
+                trimmed = self.summary[-self.max_summary_chars:]
+                # Drop the partial first line left by the cut
+                self.summary = trimmed.split('\n', 1)[1] if '\n' in trimmed else trimmed
+
+    def render(self) -> str:
+        """Context string to place in the prompt"""
+        parts = []
+        if self.summary:
+            parts.append(f"Summary of earlier conversation:\n{self.summary}")
+        parts.extend(f"Human: {q}\nAI: {a}" for q, a in self.recent)
+        return "\n".join(parts)
+
+    def clear(self):
+        self.recent.clear()
+        self.summary = ""
+        self.total_turns = 0
@@ -0,0 +1,181 @@
+"""
+Vehicle Count Store
+SQLite (WAL) store of per-interval car, person and counting-zone totals written by the detection worker
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS vehicle_counts (
+    camera TEXT NOT NULL,
+    interval_start INTEGER NOT NULL,
+    interval_seconds INTEGER NOT NULL,
+    cars INTEGER NOT NULL DEFAULT 0,
+    people INTEGER NOT NULL DEFAULT 0,
+    frames INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (camera, interval_start)
+);
+CREATE INDEX IF NOT EXISTS vehicle_counts_interval ON vehicle_counts (interval_start);
+CREATE TABLE IF NOT EXISTS zone_counts (
+    camera TEXT NOT NULL,
+    interval_start INTEGER NOT NULL,
+    zone TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    class_id INTEGER NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (camera, interval_start, zone, direction, class_id)
+);
+CREATE INDEX IF NOT EXISTS zone_counts_interval ON zone_counts (interval_start);
+CREATE TABLE IF NOT EXISTS worker_status (
+    camera TEXT PRIMARY KEY,
+    updated_at INTEGER NOT NULL,
+    fps REAL,
+    lag_ms REAL,
+    gated INTEGER,
+    error TEXT
+);
+"""
+
+
+class CountStore:
+    """
+    Per-interval counts shared between the detection worker and the dashboard
+
+    The worker is the only writer; it adds its counts to the row of the
+    current interval every few seconds, so viewers see near-live numbers
+    without the worker holding a transaction open. In WAL mode readers
+    never block the writer or each other, so any number of dashboard
+    sessions can poll the store while detection runs once.
+
+    Args:
+        path: SQLite database file
+    """
+
+    def __init__(self, path: str = 'data/vehicle_counts.db'):
+        self.path = Path(path)
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(str(self.path), timeout=10)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(_SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def interval_start(timestamp: float, interval_seconds: int) -> int:
+        """Start (epoch seconds) of the interval containing timestamp"""
+        return int(timestamp // interval_seconds * interval_seconds)
+
+    def add_counts(self, camera: str, interval_start: int, interval_seconds: int,
+                   cars: int = 0, people: int = 0, frames: int = 0):
+        """Add counts to an interval's row, creating it if needed"""
+        connection = self._connect()
+        with connection:
+            connection.execute(
+                """
+                INSERT INTO vehicle_counts (camera, interval_start, interval_seconds, cars, people, frames)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (camera, interval_start) DO UPDATE SET
+                    cars = cars + excluded.cars,
+                    people = people + excluded.people,
+                    frames = frames + excluded.frames
+                """,
+                (camera, interval_start, interval_seconds, cars, people, frames),
+            )
+
+    def add_zone_counts(self, camera: str, interval_start: int, counts: Dict[tuple, int]):
+        """Add per-zone counts, keyed by (zone, direction, class id), to an interval"""
+        if not counts:
+            return
+        connection = self._connect()
+        with connection:
+            connection.executemany(
+                """
+                INSERT INTO zone_counts (camera, interval_start, zone, direction, class_id, count)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (camera, interval_start, zone, direction, class_id) DO UPDATE SET
+                    count = count + excluded.count
+                """,
+                [(camera, interval_start, zone, direction, class_id, count)
+                 for (zone, direction, class_id), count in counts.items()],
+            )
+
+    def update_status(self, camera: str, fps: float = 0.0, lag_ms: float = 0.0, gated: int = 0, error: str = ''):
+        """Record the worker's heartbeat and health for a camera"""
+        connection = self._connect()
+        with connection:
+            connection.execute(
+                """
+                INSERT INTO worker_status (camera, updated_at, fps, lag_ms, gated, error)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (camera) DO UPDATE SET
+                    updated_at = excluded.updated_at, fps = excluded.fps, lag_ms = excluded.lag_ms,
+                    gated = excluded.gated, error = excluded.error
+                """,
+                (camera, int(time.time()), fps, lag_ms, gated, error),
+            )
+
+    def counts(self, since: Optional[float] = None, camera: Optional[str] = None) -> pd.DataFrame:
+        """
+        Interval rows, oldest first
+
+        Args:
+            since: Optional epoch seconds; only intervals starting at or after it
+            camera: Optional camera name
+
+        Returns:
+            DataFrame with camera, interval_start (datetime, UTC), cars, people and frames
+        """
+        if not self.path.exists():
+            return pd.DataFrame(columns=['camera', 'interval_start', 'interval_seconds', 'cars', 'people', 'frames'])
+        query = 'SELECT camera, interval_start, interval_seconds, cars, people, frames FROM vehicle_counts WHERE 1 = 1'
+        params = []
+        if since is not None:
+            query += ' AND interval_start >= ?'
+            params.append(int(since))
+        if camera is not None:
+            query += ' AND camera = ?'
+            params.append(camera)
+        counts = pd.read_sql_query(query + ' ORDER BY interval_start', self._connect(), params=params)
+        counts['interval_start'] = pd.to_datetime(counts['interval_start'], unit='s', utc=True)
+        return counts
+
+    def zone_counts(self, since: Optional[float] = None) -> pd.DataFrame:
+        """Zone totals per camera, zone, direction and class since an optional epoch time"""
+        columns = ['camera', 'zone', 'direction', 'class_id', 'count']
+        if not self.path.exists():
+            return pd.DataFrame(columns=columns)
+        return pd.read_sql_query(
+            """
+            SELECT camera, zone, direction, class_id, SUM(count) AS count FROM zone_counts
+            WHERE interval_start >= ? GROUP BY camera, zone, direction, class_id ORDER BY camera, zone, direction
+            """,
+            self._connect(), params=[int(since or 0)],
+        )
+
+    def status(self) -> Dict[str, Dict]:
+        """Latest worker heartbeat per camera, with its age in seconds"""
+        if not self.path.exists():
+            return {}
+        rows = self._connect().execute(
+            'SELECT camera, updated_at, fps, lag_ms, gated, error FROM worker_status'
+        ).fetchall()
+        now = time.time()
+        return {
+            camera: {'age_s': now - updated_at, 'fps': fps, 'lag_ms': lag_ms, 'gated': gated, 'error': error}
+            for camera, updated_at, fps, lag_ms, gated, error in rows
+        }
@@ -0,0 +1,257 @@
+"""
+Counting Zones
+Per-direction, per-class counts over any number of trip lines and polygons, evaluated for all tracks at once
+"""
+
+import logging
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from vehicle_tracker import Track
+
+logger = logging.getLogger(__name__)
+
+LINE_DIRECTIONS = ('forward', 'backward')
+POLYGON_DIRECTIONS = ('entered', 'exited')
+MAX_CLASSES = 80  # COCO
+DEFAULT_ZONES = 'line:Trip line:0,0.5,1,0.5'
+
+
+class Zone:
+    """
+    A named trip line (two points) or polygon (three or more points)
+
+    Points are (x, y) fractions of the frame, so zones survive changes of
+    stream resolution. For a line, 'forward' means crossing to the
+    right-hand side of the line as seen on screen when facing from its
+    first point to its second; a line drawn left to right counts
+    downward movement as forward.
+    """
+
+    def __init__(self, kind: str, name: str, points: Sequence[Tuple[float, float]]):
+        if kind not in ('line', 'polygon'):
+            raise ValueError(f"Unknown zone type '{kind}', expected line or polygon")
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if kind == 'line' and len(points) != 2:
+            raise ValueError(f"Line '{name}' needs exactly two points")
+        if kind == 'polygon' and len(points) < 3:
+            raise ValueError(f"Polygon '{name}' needs at least three points")
+        self.kind = kind
+        self.name = name
+        self.points = points
+
+    @property
+    def directions(self) -> Tuple[str, str]:
+        return LINE_DIRECTIONS if self.kind == 'line' else POLYGON_DIRECTIONS
+
+    def pixels(self, width: int, height: int) -> np.ndarray:
+        return self.points * (width, height)
+
+
+def parse_zones(spec: str) -> List[Zone]:
+    """
+    Parse 'line:Name:x1,y1,x2,y2;polygon:Name:x1,y1,x2,y2,x3,y3,...' into zones
+
+    Coordinates are fractions of the frame. An empty spec gives a single
+    horizontal trip line at half height.
+    """
+    zones = []
+    for part in (spec or DEFAULT_ZONES).split(';'):
+        if not part.strip():
+            continue
+        try:
+            kind, name, coords = part.strip().split(':', 2)
+            values = [float(v) for v in coords.split(',')]
+        except ValueError:
+            raise ValueError(f"Counting zone '{part}' must look like kind:name:x1,y1,x2,y2,...")
+        if len(values) % 2:
+            raise ValueError(f"Counting zone '{name}' has an odd number of coordinates")
+        zones.append(Zone(kind.strip().lower(), name.strip(), list(zip(values[::2], values[1::2]))))
+    return zones
+
+
+def _cross(o: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """z component of (a - o) x (b - o), broadcast over leading dimensions"""
+    return (a[..., 0] - o[..., 0]) * (b[..., 1] - o[..., 1]) - (a[..., 1] - o[..., 1]) * (b[..., 0] - o[..., 0])
+
+
+def segment_crossings(starts: np.ndarray, ends: np.ndarray, line_a: np.ndarray, line_b: np.ndarray) -> np.ndarray:
+    """
+    Which movements cross which lines, and in which direction
+
+    Args:
+        starts, ends: (N, 2) previous and current positions
+        line_a, line_b: (L, 2) line end points
+
+    Returns:
+        (N, L) int array: +1 for a forward crossing, -1 backward, 0 none.
+        A position exactly on a line counts as on its forward side, so a
+        track that stops on the line is counted once, not twice.
+    """
+    p, q = starts[:, None, :], ends[:, None, :]
+    a, b = line_a[None, :, :], line_b[None, :, :]
+    side_p = _cross(a, b, p) >= 0
+    side_q = _cross(a, b, q) >= 0
+    # The movement must also straddle the line's supporting segment, not just its infinite extension
+    ca, cb = _cross(p, q, a), _cross(p, q, b)
+    within = (ca * cb <= 0) & ((ca != 0) | (cb != 0))
+    crossed = (side_p != side_q) & within
+    return np.where(crossed, np.where(side_q, 1, -1), 0)
+
+
+def points_in_polygon(points: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+    """(N,) mask of points inside a polygon, by even-odd ray casting over all edges at once"""
+    if len(points) == 0:
+        return np.zeros(0, dtype=bool)
+    x, y = points[:, 0:1], points[:, 1:2]
+    x1, y1 = polygon[:, 0][None, :], polygon[:, 1][None, :]
+    x2, y2 = np.roll(polygon[:, 0], -1)[None, :], np.roll(polygon[:, 1], -1)[None, :]
+    straddles = (y1 > y) != (y2 > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_at_y = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return np.count_nonzero(straddles & (x < x_at_y), axis=1) % 2 == 1
+
+
+class ZoneCounter:
+    """
+    Counts tracked objects against a set of lines and polygons
+
+    Each update() takes the live tracks of a frame, pairs their centroids
+    with the previous frame's by track id and then evaluates every
+    movement against every line in one broadcast segment-intersection
+    test, and every centroid against each polygon in one vectorised
+    point-in-polygon test. A track is counted at most once per line
+    (whichever direction it crossed first) and once per polygon entry or
+    exit, so jitter around a line does not inflate counts.
+
+    Counts live in a (zones, 2 directions, classes) array; counts(),
+    occupancy() and totals() present them by name. totals() counts each
+    track once however many lines it crosses, so adding a second line
+    does not double the number of vehicles.
+
+    Pass confirmed tracks only (VehicleTracker.confirmed_tracks()), so a
+    one-frame false detection cannot register a crossing.
+
+    Args:
+        zones: Lines and polygons to count
+    """
+
+    def __init__(self, zones: Sequence[Zone]):
+        self.zones = list(zones)
+        self.lines = [z for z in self.zones if z.kind == 'line']
+        self.polygons = [z for z in self.zones if z.kind == 'polygon']
+        self._counts = np.zeros((len(self.zones), 2, MAX_CLASSES), dtype=np.int64)
+        self._occupancy = np.zeros((len(self.polygons), MAX_CLASSES), dtype=np.int64)
+        self._totals = np.zeros(MAX_CLASSES, dtype=np.int64)
+        self._line_index = np.array([self.zones.index(z) for z in self.lines], dtype=int)
+        self._polygon_index = np.array([self.zones.index(z) for z in self.polygons], dtype=int)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._points = np.zeros((0, 2))
+        self._counted = np.zeros((0, len(self.lines)), dtype=bool)
+        self._inside = np.zeros((0, len(self.polygons)), dtype=bool)
+
+    def update(self, tracks: Iterable[Track], width: int, height: int) -> List[Tuple[str, str, int, int]]:
+        """
+        Record the current positions of the tracks
+
+        Pass every confirmed track, including ones coasting between
+        detections; tracks no longer passed in are forgotten.
+
+        Args:
+            tracks: Live tracks
+            width, height: Frame size in pixels
+
+        Returns:
+            (zone name, direction, class id, track id) for every count made in this call
+        """
+        tracks = list(tracks)
+        ids = np.fromiter((t.track_id for t in tracks), dtype=np.int64, count=len(tracks))
+        classes = np.fromiter((t.class_id for t in tracks), dtype=np.int64, count=len(tracks))
+        boxes = np.array([t.box for t in tracks], dtype=float).reshape(-1, 4)
+        points = np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2], axis=1)
+        classes = np.clip(classes, 0, MAX_CLASSES - 1)
+
+        # Match to the previous frame's tracks by id
+        order = np.argsort(self._ids)
+        position = np.searchsorted(self._ids, ids, sorter=order)
+        position = order[np.minimum(position, len(order) - 1)] if len(order) else np.zeros(len(ids), dtype=int)
+        known = (self._ids[position] == ids) if len(self._ids) else np.zeros(len(ids), dtype=bool)
+
+        events = []
+        counted = np.zeros((len(ids), len(self.lines)), dtype=bool)
+        inside_before = np.zeros((len(ids), len(self.polygons)), dtype=bool)
+        if known.any():
+            counted[known] = self._counted[position[known]]
+            inside_before[known] = self._inside[position[known]]
+
+        if self.lines and known.any():
+            ends = np.array([z.pixels(width, height) for z in self.lines])
+            crossing = np.zeros((len(ids), len(self.lines)), dtype=int)
+            crossing[known] = segment_crossings(self._points[position[known]], points[known], ends[:, 0], ends[:, 1])
+            new = (crossing != 0) & ~counted
+            rows, cols = np.nonzero(new)
+            direction = (crossing[rows, cols] < 0).astype(int)  # 0 forward, 1 backward
+            np.add.at(self._counts, (self._line_index[cols], direction, classes[rows]), 1)
+            # A track adds to the totals on its first crossing of any line only
+            first = new.any(axis=1) & ~counted.any(axis=1)
+            np.add.at(self._totals, classes[first], 1)
+            counted |= new
+            events += [
+                (self.lines[c].name, LINE_DIRECTIONS[d], int(classes[r]), int(ids[r]))
+                for r, c, d in zip(rows, cols, direction)
+            ]
+
+        inside = np.zeros((len(ids), len(self.polygons)), dtype=bool)
+        for j, zone in enumerate(self.polygons):
+            inside[:, j] = points_in_polygon(points, zone.pixels(width, height))
+        if self.polygons:
+            # Entries and exits only for tracks seen before, so a track born inside a zone is not an entry
+            change = (inside != inside_before) & known[:, None]
+            rows, cols = np.nonzero(change)
+            direction = (~inside[rows, cols]).astype(int)  # 0 entered, 1 exited
+            np.add.at(self._counts, (self._polygon_index[cols], direction, classes[rows]), 1)
+            events += [
+                (self.polygons[c].name, POLYGON_DIRECTIONS[d], int(classes[r]), int(ids[r]))
+                for r, c, d in zip(rows, cols, direction)
+            ]
+            self._occupancy[:] = 0
+            rows, cols = np.nonzero(inside)
+            np.add.at(self._occupancy, (cols, classes[rows]), 1)
+
+        self._ids, self._points, self._counted, self._inside = ids, points, counted, inside
+        return events
+
+    def counts(self) -> Dict[str, Dict[str, Dict[int, int]]]:
+        """zone name -> direction -> class id -> count, only non-zero counts"""
+        result = {}
+        for i, zone in enumerate(self.zones):
+            result[zone.name] = {
+                direction: {int(c): int(self._counts[i, d, c]) for c in np.flatnonzero(self._counts[i, d])}
+                for d, direction in enumerate(zone.directions)
+            }
+        return result
+
+    def occupancy(self) -> Dict[str, Dict[int, int]]:
+        """polygon name -> class id -> tracks currently inside"""
+        return {
+            zone.name: {int(c): int(self._occupancy[j, c]) for c in np.flatnonzero(self._occupancy[j])}
+            for j, zone in enumerate(self.polygons)
+        }
+
+    def totals(self) -> Dict[int, int]:
+        """class id -> tracks that crossed at least one line, in either direction, each counted once"""
+        return {int(c): int(self._totals[c]) for c in np.flatnonzero(self._totals)}
+
+    def forget_tracks(self):
+        """Drop remembered track positions but keep the counts, e.g. when the tracker restarts its ids"""
+        self._occupancy[:] = 0
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._points = np.zeros((0, 2))
+        self._counted = np.zeros((0, len(self.lines)), dtype=bool)
+        self._inside = np.zeros((0, len(self.polygons)), dtype=bool)
+
+    def reset(self):
+        self._counts[:] = 0
+        self._totals[:] = 0
+        self.forget_tracks()
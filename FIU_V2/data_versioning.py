@@ -0,0 +1,48 @@
+"""
+Data Versioning Helpers
+Stable content fingerprints for loaded datasets, used as cache keys
+"""
+
+import hashlib
+from typing import Optional, Tuple
+
+import pandas as pd
+
+
+def dataframe_version(*frames: Optional[pd.DataFrame]) -> str:
+    """
+    Compute a short content fingerprint for one or more DataFrames
+
+    The fingerprint changes whenever any value, column or row order changes,
+    so it can be used to key caches of derived results (joins, map
+    aggregates, rendered figures). Hashing reads every row, so compute it
+    once where the frame is loaded (see versioned()) rather than per rerun.
+
+    Args:
+        frames: DataFrames to fingerprint; None entries are allowed
+
+    Returns:
+        16 character hex digest
+    """
+    digest = hashlib.sha1()
+    for df in frames:
+        if df is None:
+            digest.update(b'<none>')
+            continue
+        digest.update(','.join(map(str, df.columns)).encode())
+        digest.update(str(len(df)).encode())
+        if len(df):
+            row_hashes = pd.util.hash_pandas_object(df, index=False).values
+            digest.update(row_hashes.tobytes())
+    return digest.hexdigest()[:16]
+
+
+def versioned(df: pd.DataFrame) -> Tuple[pd.DataFrame, str]:
+    """
+    Pair a freshly loaded DataFrame with its fingerprint
+
+    Meant for the return value of st.cache_data loaders: the frame is
+    hashed once per load, and every rerun gets the cached version string
+    instead of hashing the frame again before consulting other caches.
+    """
+    return df, dataframe_version(df)
@@ -0,0 +1,174 @@
+"""
+Headless Detection Worker
+Counts vehicles and people on every configured camera outside Streamlit and writes the counts to the count store
+"""
+
+import argparse
+import logging
+import signal
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from count_store import CountStore
+from counting_zones import Zone, ZoneCounter
+from multi_camera import MultiCameraScheduler
+from stream_reader import ResilientStream
+from vehicle_tracker import VehicleTracker
+
+logger = logging.getLogger(__name__)
+
+PERSON, CAR = 0, 2  # COCO class ids
+
+
+class CountingWorker:
+    """
+    Runs detection, tracking and line counting for a set of cameras
+
+    Each camera gets its own tracker and zone counter over the same
+    counting zones as the live detection page. Car and person totals are
+    tracks that crossed at least one line, each counted once; every zone
+    event is also kept per zone, direction and class. Counts are accumulated in
+    memory and added to the store every flush_seconds, into the row of
+    the interval they happened in, so a restart loses at most one flush
+    worth of counts and the dashboard never waits on inference.
+
+    Args:
+        store: Destination CountStore
+        sources: Camera name -> callable opening the stream
+        detect_fn: Batched detector returning (boxes, scores, classes) per frame
+        interval_seconds: Length of one count interval
+        flush_seconds: How often pending counts are written
+        zones: Counting lines and polygons
+        target_fps, max_batch, gates: Passed on to MultiCameraScheduler
+    """
+
+    def __init__(self, store: CountStore, sources: Dict[str, Callable], detect_fn: Callable,
+                 zones: List[Zone], interval_seconds: int = 60, flush_seconds: float = 10.0, target_fps=5.0,
+                 max_batch: int = 8, gates: Optional[Dict] = None):
+        self.store = store
+        self.interval_seconds = interval_seconds
+        self.flush_seconds = flush_seconds
+        self.trackers = {name: VehicleTracker() for name in sources}
+        self.counters = {name: ZoneCounter(zones) for name in sources}
+        self.scheduler = MultiCameraScheduler(
+            sources, detect_fn, self._on_result, target_fps=target_fps, max_batch=max_batch, gates=gates
+        )
+        self._pending: Dict[tuple, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _on_result(self, name: str, frame: np.ndarray, result):
+        tracker, counter = self.trackers[name], self.counters[name]
+        # A gated frame (no result) still advances the tracks, so they do not freeze while the gate is closed
+        if result is not None:
+            tracker.update(*result)
+        else:
+            tracker.predict()
+        before = counter.totals()
+        events = counter.update(tracker.confirmed_tracks(), frame.shape[1], frame.shape[0])
+        after = counter.totals()
+
+        key = (name, CountStore.interval_start(time.time(), self.interval_seconds))
+        with self._lock:
+            pending = self._pending.setdefault(key, {'cars': 0, 'people': 0, 'frames': 0, 'zones': {}})
+            pending['frames'] += 1
+            pending['cars'] += after.get(CAR, 0) - before.get(CAR, 0)
+            pending['people'] += after.get(PERSON, 0) - before.get(PERSON, 0)
+            for zone, direction, class_id, _ in events:
+                pending['zones'][(zone, direction, class_id)] = pending['zones'].get((zone, direction, class_id), 0) + 1
+
+    def flush(self):
+        """Write pending counts and per-camera health to the store"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for (name, interval_start), counts in pending.items():
+            zones = counts.pop('zones')
+            self.store.add_counts(name, interval_start, self.interval_seconds, **counts)
+            self.store.add_zone_counts(name, interval_start, zones)
+
+        stats = self.scheduler.stats()
+        for name, camera in stats['cameras'].items():
+            error = camera['error'] or (str(self.scheduler.error) if self.scheduler.error else '')
+            stream = camera['stream']
+            if not error and stream and stream['state'] != 'connected':
+                error = f"stream {stream['state']}: {stream['last_error']}"
+            self.store.update_status(name, camera['fps'], camera['lag_ms'], camera['gated'], error)
+
+    def run(self):
+        """Process until stop() is called or the scheduler fails, flushing periodically"""
+        self.scheduler.start()
+        logger.info(f"Detection worker started for {len(self.trackers)} camera(s)")
+        try:
+            while not self._stop.wait(self.flush_seconds):
+                self.flush()
+                if self.scheduler.error is not None:
+                    raise RuntimeError(f"Camera scheduler failed: {self.scheduler.error}")
+        finally:
+            self.scheduler.stop()
+            self.flush()
+            logger.info("Detection worker stopped")
+
+    def stop(self):
+        self._stop.set()
+
+
+def open_camera(url: str, backup_url: str = '', stall_timeout: float = 10.0, max_backoff: float = 30.0) -> Callable:
+    """Source factory for a stream URL that reconnects on its own and fails over to backup_url"""
+    def open_source():
+        return ResilientStream([url, backup_url], stall_timeout=stall_timeout, max_delay=max_backoff)
+    return open_source
+
+
+if __name__ == "__main__":
+    # Run next to the dashboard, e.g. as a service: python detection_worker.py
+    from config import config
+    from detector_backends import load_detector
+    from counting_zones import parse_zones
+    from motion_gating import MotionGate, RoiDetector, parse_rois
+
+    parser = argparse.ArgumentParser(description="Count vehicles and people on the configured cameras")
+    parser.add_argument('--db', default=config.COUNT_STORE_PATH)
+    parser.add_argument('--interval', type=int, default=config.COUNT_INTERVAL_SECONDS, help="Seconds per count interval")
+    parser.add_argument('--flush', type=float, default=10.0, help="Seconds between writes")
+    parser.add_argument('--backend', default=config.DETECTION_BACKEND)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    streams = config.get_camera_streams()
+    if not streams:
+        raise SystemExit("No camera streams configured (MAIN_CAMERA_STREAM_URL / CAMERA_STREAM_URLS)")
+
+    detector = load_detector(
+        args.backend, config.DETECTION_MODEL, config.DETECTION_IMGSZ,
+        config.DETECTION_MODEL_DIR, config.DETECTION_CALIBRATION_DIR
+    )
+    detector.warmup()
+    rois = parse_rois(config.DETECTION_ROIS)
+    roi_detector = RoiDetector(detector.detect, rois)
+    worker = CountingWorker(
+        CountStore(args.db),
+        {
+            name: open_camera(
+                url, config.BACKUP_CAMERA_STREAM_URL if url == config.MAIN_CAMERA_STREAM_URL else '',
+                config.STREAM_STALL_TIMEOUT, config.STREAM_MAX_BACKOFF
+            )
+            for name, url in streams.items()
+        },
+        lambda frames: roi_detector.detect(frames, classes=[PERSON, CAR]),
+        parse_zones(config.COUNTING_ZONES),
+        interval_seconds=args.interval,
+        flush_seconds=args.flush,
+        target_fps=config.CAMERA_TARGET_FPS,
+        max_batch=config.DETECTION_BATCH_SIZE,
+        gates={
+            name: MotionGate(config.MOTION_GATING, rois, threshold=config.MOTION_THRESHOLD,
+                             heartbeat=config.MOTION_HEARTBEAT)
+            for name in streams
+        },
+    )
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: worker.stop())
+    worker.run()
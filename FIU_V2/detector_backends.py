@@ -0,0 +1,410 @@
+"""
+Detector Backends
+YOLO inference through PyTorch, ONNX Runtime or OpenVINO, with optional INT8 quantization and a comparison harness
+"""
+
+import argparse
+import json
+import logging
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Backend names accepted by load_detector(); the -int8 variants are statically quantized
+BACKENDS = ('torch', 'onnx', 'onnx-int8', 'openvino', 'openvino-int8')
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.bmp'}
+VIDEO_SUFFIXES = {'.mp4', '.avi', '.mov', '.mkv', '.ts'}
+
+# (boxes (N, 4) as [x1, y1, x2, y2], scores (N,), class ids (N,)) for one frame
+Detections = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def parse_backend(name: str) -> Tuple[str, bool]:
+    """Split a backend name such as 'onnx-int8' into its runtime and INT8 flag"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown detector backend '{name}', expected one of {', '.join(BACKENDS)}")
+    runtime, _, precision = name.partition('-')
+    return runtime, precision == 'int8'
+
+
+def letterbox(frame: np.ndarray, imgsz: int = 640) -> np.ndarray:
+    """
+    Resize a BGR frame into a padded square network input, as ultralytics does
+
+    Returns:
+        (1, 3, imgsz, imgsz) float32 RGB tensor scaled to [0, 1]
+    """
+    import cv2
+
+    h, w = frame.shape[:2]
+    scale = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - new_h) // 2, (imgsz - new_w) // 2
+    canvas[top:top + new_h, left:left + new_w] = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    tensor = canvas[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+    return np.ascontiguousarray(tensor[None])
+
+
+def load_images(source, limit: int = 200) -> List[np.ndarray]:
+    """
+    BGR frames from a folder of images or evenly spaced from a video file
+
+    Used both as the INT8 calibration set and as benchmark input; the
+    frames should look like the camera footage the detector will see.
+    """
+    import cv2
+
+    source = Path(source)
+    if source.is_dir():
+        paths = sorted(p for p in source.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)[:limit]
+        frames = [cv2.imread(str(p)) for p in paths]
+        return [f for f in frames if f is not None]
+
+    if source.suffix.lower() in VIDEO_SUFFIXES:
+        cap = cv2.VideoCapture(str(source))
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or limit
+        wanted = set(np.linspace(0, total - 1, min(limit, total)).astype(int).tolist())
+        frames, index = [], 0
+        while len(frames) < len(wanted):
+            ok, frame = cap.read()
+            if not ok:
+                break
+            if index in wanted:
+                frames.append(frame)
+            index += 1
+        cap.release()
+        return frames
+
+    raise ValueError(f"Expected an image folder or video file, got {source}")
+
+
+class _CalibrationReader:
+    """ONNX Runtime calibration data reader over preprocessed frames"""
+
+    def __init__(self, input_name: str, frames: Sequence[np.ndarray], imgsz: int):
+        self.input_name = input_name
+        self.frames = frames
+        self.imgsz = imgsz
+        self._next = 0
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        if self._next >= len(self.frames):
+            return None
+        frame = self.frames[self._next]
+        self._next += 1
+        return {self.input_name: letterbox(frame, self.imgsz)}
+
+    def rewind(self):
+        self._next = 0
+
+
+def _head_prefix(node_names: Sequence[str]) -> Optional[str]:
+    """Name prefix of the last '/model.N/' block of an exported YOLO graph, i.e. the Detect head"""
+    indices = set()
+    for name in node_names:
+        if name.startswith('/model.'):
+            block = name.split('/')[1].split('.')[-1]
+            if block.isdigit():
+                indices.add(int(block))
+    return f"/model.{max(indices)}/" if indices else None
+
+
+def export_onnx(weights: str, imgsz: int, model_dir: Path) -> Path:
+    """Export the PyTorch weights to ONNX once, with a dynamic batch axis for batched camera inference"""
+    from ultralytics import YOLO
+
+    target = model_dir / f"{Path(weights).stem}.onnx"
+    if target.exists():
+        return target
+    logger.info(f"Exporting {weights} to ONNX")
+    exported = YOLO(weights).export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True)
+    model_dir.mkdir(parents=True, exist_ok=True)
+    shutil.move(str(exported), target)
+    return target
+
+
+def quantize_onnx(fp32_path: Path, calibration_frames: Sequence[np.ndarray], imgsz: int) -> Path:
+    """
+    Statically quantize an ONNX detector to INT8 with ONNX Runtime
+
+    Weights are quantized per channel and activations per tensor in QDQ
+    format, with ranges calibrated on the given frames. The Detect head
+    (box decoding, class sigmoid and concatenation of the three scales)
+    stays in float: its outputs mix pixel coordinates and probabilities
+    in one tensor, which a single INT8 scale cannot represent without
+    a large accuracy loss, and it is a small share of the compute.
+    """
+    import onnx
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+
+    target = fp32_path.with_name(f"{fp32_path.stem}.int8.onnx")
+    if target.exists():
+        return target
+    if not calibration_frames:
+        raise ValueError("INT8 quantization needs calibration frames (DETECTION_CALIBRATION_DIR)")
+
+    model = onnx.load(str(fp32_path))
+    node_names = [node.name for node in model.graph.node]
+    head = _head_prefix(node_names)
+    excluded = [name for name in node_names if head and name.startswith(head)]
+    reader = _CalibrationReader(model.graph.input[0].name, calibration_frames, imgsz)
+
+    logger.info(f"Quantizing {fp32_path.name} to INT8 on {len(calibration_frames)} frames")
+    quantize_static(
+        str(fp32_path), str(target), reader,
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        nodes_to_exclude=excluded,
+    )
+
+    # Carry over the class names and input size ultralytics reads from the model metadata
+    quantized = onnx.load(str(target))
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(model.metadata_props)
+    onnx.save(quantized, str(target))
+    return target
+
+
+def export_openvino(weights: str, imgsz: int, model_dir: Path, calibration_frames: Optional[Sequence[np.ndarray]] = None) -> Path:
+    """
+    Export to an OpenVINO IR folder, optionally quantized to INT8 with NNCF
+
+    As with quantize_onnx(), the Detect head's post-processing operations
+    are kept in float.
+    """
+    from ultralytics import YOLO
+
+    fp32_dir = model_dir / f"{Path(weights).stem}_openvino_model"
+    if not fp32_dir.exists():
+        logger.info(f"Exporting {weights} to OpenVINO")
+        exported = YOLO(weights).export(format='openvino', imgsz=imgsz, dynamic=True)
+        model_dir.mkdir(parents=True, exist_ok=True)
+        shutil.move(str(exported), fp32_dir)
+    if calibration_frames is None:
+        return fp32_dir
+
+    int8_dir = model_dir / f"{Path(weights).stem}_int8_openvino_model"
+    if int8_dir.exists():
+        return int8_dir
+    if not calibration_frames:
+        raise ValueError("INT8 quantization needs calibration frames (DETECTION_CALIBRATION_DIR)")
+
+    import nncf
+    import openvino as ov
+
+    xml_path = next(fp32_dir.glob('*.xml'))
+    model = ov.Core().read_model(xml_path)
+    node_names = [op.get_friendly_name() for op in model.get_ops()]
+    head = _head_prefix(node_names)
+
+    logger.info(f"Quantizing {xml_path.name} to INT8 on {len(calibration_frames)} frames")
+    quantized = nncf.quantize(
+        model,
+        nncf.Dataset(list(calibration_frames), lambda frame: letterbox(frame, imgsz)),
+        preset=nncf.QuantizationPreset.MIXED,
+        ignored_scope=nncf.IgnoredScope(
+            types=['Multiply', 'Subtract', 'Sigmoid'],
+            patterns=[f"{head}.*"] if head else [],
+            validate=False,
+        ),
+    )
+    int8_dir.mkdir(parents=True)
+    ov.save_model(quantized, int8_dir / xml_path.name)
+    for metadata in fp32_dir.glob('*.yaml'):
+        shutil.copy(metadata, int8_dir / metadata.name)
+    return int8_dir
+
+
+class Detector:
+    """
+    One YOLO model behind a backend-independent detect() call
+
+    Exported ONNX and OpenVINO models are loaded through ultralytics,
+    which runs them with ONNX Runtime or the OpenVINO runtime on CPU and
+    applies the same pre- and post-processing (letterbox, NMS) as the
+    PyTorch path, so boxes from different backends are directly comparable.
+
+    One instance can be shared by every session and thread of the app;
+    calls are serialised because an ultralytics predictor keeps per-call
+    state and is not safe to run concurrently.
+
+    Args:
+        model: ultralytics YOLO instance
+        backend: Backend name from BACKENDS
+        imgsz: Network input size
+        conf: Minimum confidence of returned detections
+    """
+
+    def __init__(self, model, backend: str, imgsz: int = 640, conf: float = 0.25):
+        self.model = model
+        self.backend = backend
+        self.imgsz = imgsz
+        self.conf = conf
+        self._lock = threading.Lock()
+
+    def warmup(self, runs: int = 1):
+        """Run dummy inferences so the first real frame does not pay for setup and allocation"""
+        frame = np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)
+        started = time.perf_counter()
+        for _ in range(runs):
+            self.detect([frame])
+        logger.info(f"Warmed up {self.backend} detector in {time.perf_counter() - started:.2f}s")
+
+    def detect(self, frames: Sequence[np.ndarray], classes: Optional[Sequence[int]] = None,
+               imgsz: Optional[int] = None) -> List[Detections]:
+        """
+        Detect objects in a batch of BGR frames
+
+        Args:
+            frames: Images to run in one batched call
+            classes: Optional COCO class ids to keep, e.g. [0, 2] for person and car
+            imgsz: Input size for this call instead of the detector's own (exported models are dynamic)
+
+        Returns:
+            (boxes, scores, class ids) numpy arrays per frame
+        """
+        if not len(frames):
+            return []
+        with self._lock:
+            results = self.model(list(frames), imgsz=imgsz or self.imgsz, conf=self.conf, classes=classes, verbose=False)
+        detections = []
+        for result in results:
+            boxes = result.boxes
+            detections.append((
+                boxes.xyxy.cpu().numpy(),
+                boxes.conf.cpu().numpy(),
+                boxes.cls.cpu().numpy().astype(int),
+            ))
+        return detections
+
+    def __call__(self, frames: Sequence[np.ndarray], classes: Optional[Sequence[int]] = None) -> List[Detections]:
+        return self.detect(frames, classes)
+
+
+def load_detector(backend: str = 'torch', weights: str = 'yolov8n.pt', imgsz: int = 640,
+                  model_dir: str = 'data/models', calibration_source: Optional[str] = None,
+                  conf: float = 0.25) -> Detector:
+    """
+    Load a detector for the given backend, exporting and quantizing on first use
+
+    Exported models are written to model_dir and reused afterwards, so
+    only the first load of a backend pays for export and calibration.
+
+    Args:
+        backend: One of BACKENDS
+        weights: PyTorch weights the other backends are exported from
+        imgsz: Network input size
+        model_dir: Folder for exported models
+        calibration_source: Image folder or video file for INT8 calibration
+        conf: Minimum detection confidence
+    """
+    from ultralytics import YOLO
+
+    runtime, int8 = parse_backend(backend)
+    model_dir = Path(model_dir)
+    calibration = load_images(calibration_source) if int8 and calibration_source else []
+
+    if runtime == 'torch':
+        path = weights
+    elif runtime == 'onnx':
+        path = export_onnx(weights, imgsz, model_dir)
+        if int8:
+            path = quantize_onnx(path, calibration, imgsz)
+    else:
+        path = export_openvino(weights, imgsz, model_dir, calibration if int8 else None)
+
+    logger.info(f"Loading {backend} detector from {path}")
+    return Detector(YOLO(str(path), task='detect'), backend, imgsz=imgsz, conf=conf)
+
+
+def benchmark(detector: Detector, frames: Sequence[np.ndarray], runs: int = 100, batch: int = 8,
+              warmup: int = 5, data: Optional[str] = None) -> Dict[str, float]:
+    """
+    Latency, throughput and (optionally) accuracy of one detector
+
+    Args:
+        detector: Detector to measure
+        frames: Benchmark frames, cycled as needed
+        runs: Number of single-frame calls to time
+        batch: Batch size for the throughput measurement
+        warmup: Untimed calls before measuring
+        data: Optional ultralytics dataset YAML (e.g. coco128.yaml) for mAP
+
+    Returns:
+        Latency percentiles in milliseconds, frames per second at batch 1
+        and at the given batch size, and mAP50 / mAP50-95 when data is set
+    """
+    for i in range(warmup):
+        detector.detect([frames[i % len(frames)]])
+
+    latencies = []
+    for i in range(runs):
+        started = time.perf_counter()
+        detector.detect([frames[i % len(frames)]])
+        latencies.append(time.perf_counter() - started)
+    latencies = np.array(latencies) * 1000
+
+    batches = max(runs // batch, 1)
+    started = time.perf_counter()
+    for i in range(batches):
+        detector.detect([frames[(i * batch + j) % len(frames)] for j in range(batch)])
+    batched_seconds = time.perf_counter() - started
+
+    result = {
+        'mean_ms': float(latencies.mean()),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'fps': float(1000 / latencies.mean()),
+        'batch_fps': batches * batch / batched_seconds,
+    }
+    if data:
+        metrics = detector.model.val(data=data, imgsz=detector.imgsz, batch=1, plots=False, verbose=False)
+        result['map50'] = float(metrics.box.map50)
+        result['map50_95'] = float(metrics.box.map)
+    return result
+
+
+if __name__ == "__main__":
+    # Compare backends on the same frames, e.g.
+    #   python detector_backends.py --frames data/calibration --backends torch onnx onnx-int8 --data coco128.yaml
+    from config import config
+
+    parser = argparse.ArgumentParser(description="Compare detector backends on latency, throughput and mAP")
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument('--weights', default=config.DETECTION_MODEL)
+    parser.add_argument('--imgsz', type=int, default=config.DETECTION_IMGSZ)
+    parser.add_argument('--frames', default=config.DETECTION_CALIBRATION_DIR, help="Image folder or video file")
+    parser.add_argument('--runs', type=int, default=100)
+    parser.add_argument('--batch', type=int, default=config.DETECTION_BATCH_SIZE)
+    parser.add_argument('--data', default=None, help="Dataset YAML for mAP, e.g. coco128.yaml")
+    parser.add_argument('--output', default=None, help="Write the results as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    frames = load_images(args.frames)
+    if not frames:
+        raise SystemExit(f"No frames found in {args.frames}")
+
+    results = {}
+    for name in args.backends:
+        detector = load_detector(name, args.weights, args.imgsz, config.DETECTION_MODEL_DIR, args.frames)
+        results[name] = benchmark(detector, frames, runs=args.runs, batch=args.batch, data=args.data)
+
+    baseline = results.get('torch')
+    print(f"{'backend':<15}{'mean ms':>9}{'p95 ms':>9}{'fps':>8}{'batch fps':>11}{'mAP50-95':>10}{'speedup':>9}")
+    for name, r in results.items():
+        speedup = baseline['mean_ms'] / r['mean_ms'] if baseline else float('nan')
+        accuracy = f"{r['map50_95']:.3f}" if 'map50_95' in r else '-'
+        print(f"{name:<15}{r['mean_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['fps']:>8.1f}{r['batch_fps']:>11.1f}"
+              f"{accuracy:>10}{speedup:>8.2f}x")
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
@@ -0,0 +1,244 @@
+"""
+Parallel PDF Ingestion
+Parses city documents (council minutes, ordinances, ...) across a process pool and streams chunks into the vector store
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PDF_ID_PREFIX = 'pdf:'
+
+
+def file_hash(path: Path, block_size: int = 1 << 20) -> str:
+    """SHA-1 of a file's bytes"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 150) -> List[str]:
+    """
+    Split text into chunks of about chunk_size characters with overlap
+
+    Chunks end on whitespace where possible so words are not cut in half.
+    """
+    text = re.sub(r'\s+', ' ', text).strip()
+    if len(text) <= chunk_size:
+        return [text] if text else []
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            boundary = text.rfind(' ', start + chunk_size // 2, end)
+            if boundary != -1:
+                end = boundary
+        chunks.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+        # Start the next chunk at a word boundary inside the overlap
+        space = text.find(' ', start, end)
+        if space != -1:
+            start = space + 1
+    return [c for c in chunks if c]
+
+
+def parse_pdf(path: str, relative_name: str, chunk_size: int, overlap: int) -> Tuple[str, List[Dict]]:
+    """
+    Parse one PDF into chunk documents; runs inside a worker process
+
+    Returns:
+        Tuple of (relative_name, list of dicts with 'id', 'text' and 'metadata')
+    """
+    from langchain_community.document_loaders import PyPDFLoader
+
+    documents = []
+    for page in PyPDFLoader(path).load():
+        page_number = int(page.metadata.get('page', 0))
+        for index, chunk in enumerate(chunk_text(page.page_content, chunk_size, overlap)):
+            documents.append({
+                'id': f"{PDF_ID_PREFIX}{relative_name}:{page_number}:{index}",
+                'text': chunk,
+                'metadata': {'source': relative_name, 'page': page_number, 'chunk': index},
+            })
+    return relative_name, documents
+
+
+class PDFIngestionPipeline:
+    """
+    Incremental, parallel ingestion of a directory of PDFs into a LocalRAGPipeline
+
+    A manifest records each file's size, mtime, content hash and chunk ids.
+    Files whose size and mtime are unchanged are skipped without reading
+    them; touched files are re-hashed and only parsed when the bytes
+    actually changed. Parsing and chunking run in a process pool, so a
+    full re-ingestion scales with the number of cores, while the parent
+    process streams finished chunks into the vector store in batches.
+    """
+
+    def __init__(self, rag_pipeline, documents_dir: str, chunk_size: int = 1000,
+                 overlap: int = 150, max_workers: Optional[int] = None, batch_size: int = 512):
+        self.rag_pipeline = rag_pipeline
+        self.documents_dir = Path(documents_dir)
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.manifest_path = rag_pipeline.persist_dir / 'pdf_manifest.json'
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> Dict[str, Dict]:
+        try:
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"Error reading PDF manifest, re-ingesting: {e}")
+            return {}
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f)
+        tmp_path.replace(self.manifest_path)
+
+    def _changed_files(self) -> Tuple[List[Tuple[Path, str, Dict]], List[str], int]:
+        """Return (files needing parsing with their new manifest entry, removed file names, unchanged count)"""
+        current = {}
+        if self.documents_dir.exists():
+            for path in sorted(self.documents_dir.glob('**/*.pdf')):
+                current[path.relative_to(self.documents_dir).as_posix()] = path
+
+        changed = []
+        for name, path in current.items():
+            stat = path.stat()
+            entry = {'size': stat.st_size, 'mtime': stat.st_mtime}
+            previous = self.manifest.get(name)
+            if previous and previous['size'] == entry['size'] and previous['mtime'] == entry['mtime']:
+                continue
+            entry['hash'] = file_hash(path)
+            if previous and previous.get('hash') == entry['hash']:
+                # Touched but identical: just remember the new mtime
+                previous.update(entry)
+                continue
+            changed.append((path, name, entry))
+
+        removed = [name for name in self.manifest if name not in current]
+        return changed, removed, len(current) - len(changed)
+
+    def _flush(self, buffer: List[Dict], names: List[str], entries: Dict[str, Dict]):
+        """
+        Store a batch of chunks, then record their files in the manifest
+
+        Files are only marked as ingested once all their chunks are stored,
+        and the manifest is saved after every batch, so an interrupted run
+        resumes with the files that were not finished.
+        """
+        if buffer:
+            self.rag_pipeline.add_documents(buffer)
+        for name in names:
+            self.manifest[name] = entries[name]
+        self._save_manifest()
+
+    def run(self) -> Dict[str, int]:
+        """
+        Ingest new and changed PDFs and drop chunks of deleted ones
+
+        Returns:
+            Counts of parsed, skipped, removed and failed files and of chunks added
+        """
+        changed, removed, unchanged = self._changed_files()
+        stats = {'parsed': 0, 'skipped': unchanged, 'removed': len(removed), 'failed': 0, 'chunks': 0}
+
+        stale_ids = []
+        for name in removed:
+            stale_ids.extend(self.manifest.pop(name).get('chunk_ids', []))
+        # PDF documents in the index that no tracked file owns (e.g. an older id layout)
+        known = {cid for entry in self.manifest.values() for cid in entry.get('chunk_ids', [])}
+        stale_ids.extend(
+            doc_id for doc_id in self.rag_pipeline.manifest
+            if doc_id.startswith(PDF_ID_PREFIX) and doc_id not in known
+        )
+        self.rag_pipeline.delete_documents(sorted(set(stale_ids)))
+        if removed:
+            self._save_manifest()
+
+        if changed:
+            logger.info(f"Parsing {len(changed)} PDFs with {self.max_workers} workers")
+            entries = {name: entry for _, name, entry in changed}
+            buffer: List[Dict] = []
+            pending: List[str] = []  # Files whose chunks are still in the buffer
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(changed))) as pool:
+                futures = {
+                    pool.submit(parse_pdf, str(path), name, self.chunk_size, self.overlap): name
+                    for path, name, _ in changed
+                }
+                for future in as_completed(futures):
+                    name = futures[future]
+                    try:
+                        _, documents = future.result()
+                    except Exception as e:
+                        logger.error(f"Error parsing {name}: {e}")
+                        stats['failed'] += 1
+                        continue
+
+                    # Chunks from the previous version of this file that no longer exist
+                    old_ids = set(self.manifest.get(name, {}).get('chunk_ids', []))
+                    new_ids = [doc['id'] for doc in documents]
+                    self.rag_pipeline.delete_documents(sorted(old_ids - set(new_ids)))
+
+                    entries[name]['chunk_ids'] = new_ids
+                    buffer.extend(documents)
+                    pending.append(name)
+                    stats['parsed'] += 1
+                    stats['chunks'] += len(documents)
+                    if len(buffer) >= self.batch_size:
+                        self._flush(buffer, pending, entries)
+                        buffer, pending = [], []
+
+                if pending:
+                    self._flush(buffer, pending, entries)
+
+        logger.info(f"PDF ingestion: {stats}")
+        return stats
+
+
+if __name__ == "__main__":
+    # Full or incremental ingestion outside Streamlit, e.g. after dropping in new council minutes
+    from config import config
+    from embedding_cache import CachedEmbeddings
+    from rag_pipeline import LazyEmbeddings, LocalRAGPipeline
+
+    parser = argparse.ArgumentParser(description="Ingest city PDFs into the LocalPulse vector store")
+    parser.add_argument('--documents-dir', default=config.DOCUMENTS_DIR)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--overlap', type=int, default=150)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    embeddings = CachedEmbeddings(
+        LazyEmbeddings(config.EMBEDDING_MODEL_NAME),
+        config.EMBEDDING_CACHE_DIR,
+        namespace=config.EMBEDDING_MODEL_NAME,
+        batch_size=config.EMBEDDING_BATCH_SIZE,
+    )
+    rag = LocalRAGPipeline(config.VECTORSTORE_DIR, embeddings)
+    result = PDFIngestionPipeline(
+        rag, args.documents_dir, chunk_size=args.chunk_size, overlap=args.overlap, max_workers=args.workers
+    ).run()
+    print(f"Ingestion complete: {result}")
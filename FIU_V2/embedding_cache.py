@@ -0,0 +1,180 @@
+"""
+Content-Addressed Embedding Cache
+Deduplicates texts, batches encoder calls across a worker pool and keeps vectors in a memory-mapped matrix
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def text_key(text: str) -> str:
+    """Content address of a text"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Append-only float32 matrix on disk, one row per distinct text hash
+
+    Layout of the directory:
+        vectors.f32  raw little-endian float32 rows, memory-mapped for reads
+        keys.txt     one hex hash per line, line i describes row i
+        meta.json    vector dimension
+
+    Rows are written before their keys, so a crash mid-append leaves at
+    most some unreferenced trailing bytes. vectors.f32 is cut back to the
+    rows keys.txt describes on load and before every append, so new rows
+    always land at the index their keys are given.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.directory / 'vectors.f32'
+        self.keys_path = self.directory / 'keys.txt'
+        self.meta_path = self.directory / 'meta.json'
+        self._lock = threading.Lock()
+        self.dim: Optional[int] = None
+        self.index: Dict[str, int] = {}
+        self._matrix = None
+        self._load()
+
+    def _load(self):
+        if self.meta_path.exists():
+            with open(self.meta_path, 'r') as f:
+                self.dim = json.load(f).get('dim')
+        if not self.dim or not self.keys_path.exists():
+            return
+
+        with open(self.keys_path, 'r') as f:
+            keys = f.read().split()
+        stored_rows = self.vectors_path.stat().st_size // (4 * self.dim) if self.vectors_path.exists() else 0
+        if len(keys) > stored_rows:
+            logger.warning(f"Embedding cache has {len(keys)} keys but {stored_rows} rows; truncating keys")
+            keys = keys[:stored_rows]
+            with open(self.keys_path, 'w') as f:
+                f.write(''.join(f"{k}\n" for k in keys))
+        self.index = {key: row for row, key in enumerate(keys)}
+        self._truncate_vectors()
+        self._remap()
+
+    def _truncate_vectors(self):
+        """Drop rows (or partial rows) past the last key, left behind by an interrupted append"""
+        if not self.vectors_path.exists():
+            return
+        expected = len(self.index) * 4 * self.dim
+        size = self.vectors_path.stat().st_size
+        if size > expected:
+            logger.warning(f"Embedding cache has {size - expected} unreferenced bytes after row {len(self.index)}; truncating")
+            # Release the mapping first; a mapped file cannot be truncated on every platform
+            self._matrix = None
+            os.truncate(self.vectors_path, expected)
+
+    def _remap(self):
+        rows = len(self.index)
+        self._matrix = (
+            np.memmap(self.vectors_path, dtype='<f4', mode='r', shape=(rows, self.dim))
+            if rows else None
+        )
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.index
+
+    def get(self, keys: List[str]) -> np.ndarray:
+        """Return the stored vectors for keys, all of which must be present"""
+        with self._lock:
+            rows = np.fromiter((self.index[k] for k in keys), dtype=np.int64, count=len(keys))
+            return np.asarray(self._matrix[rows])
+
+    def append(self, keys: List[str], vectors: np.ndarray):
+        """Store new vectors; keys already present are skipped"""
+        vectors = np.asarray(vectors, dtype='<f4')
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                with open(self.meta_path, 'w') as f:
+                    json.dump({'dim': self.dim}, f)
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match cache ({self.dim})")
+
+            fresh = [i for i, k in enumerate(keys) if k not in self.index]
+            if not fresh:
+                return
+            self._truncate_vectors()
+            with open(self.vectors_path, 'ab') as f:
+                f.write(np.ascontiguousarray(vectors[fresh]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self.keys_path, 'a') as f:
+                f.write(''.join(f"{keys[i]}\n" for i in fresh))
+            start = len(self.index)
+            for offset, i in enumerate(fresh):
+                self.index[keys[i]] = start + offset
+            self._remap()
+
+
+class CachedEmbeddings:
+    """
+    Embeddings wrapper that only encodes texts it has never seen
+
+    Inputs are deduplicated by content hash, cache misses are encoded in
+    large batches spread over a thread pool (the encoder releases the GIL
+    while running the model) and every result is appended to an
+    EmbeddingStore, so re-indexing a grown corpus embeds only the delta.
+    Queries are passed straight through to the wrapped embeddings.
+    """
+
+    def __init__(self, base, cache_dir: str, namespace: str = 'default',
+                 batch_size: int = 512, max_workers: Optional[int] = None):
+        self.base = base
+        safe_namespace = re.sub(r'[^\w.-]+', '_', namespace)
+        self.store = EmbeddingStore(str(Path(cache_dir) / safe_namespace))
+        self.batch_size = batch_size
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.stats = {'requested': 0, 'unique': 0, 'encoded': 0}
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1 or self.max_workers == 1:
+            results = [self.base.embed_documents(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                results = list(pool.map(self.base.embed_documents, batches))
+        return np.vstack([np.asarray(r, dtype=np.float32) for r in results])
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """Embed texts and return an (n, dim) float32 array"""
+        keys = [text_key(t) for t in texts]
+        unique = dict(zip(keys, texts))
+        missing = [k for k in unique if k not in self.store]
+
+        self.stats['requested'] += len(texts)
+        self.stats['unique'] += len(unique)
+        self.stats['encoded'] += len(missing)
+
+        if missing:
+            logger.info(f"Embedding {len(missing)} new texts ({len(texts) - len(missing)} served from cache)")
+            self.store.append(missing, self._encode([unique[k] for k in missing]))
+        if not keys:
+            return np.empty((0, self.store.dim or 0), dtype=np.float32)
+        return self.store.get(keys)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.base.embed_query(text)
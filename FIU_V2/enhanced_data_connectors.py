@@ -467,8 +467,7 @@ def display_miami_data_dashboard():
     if processed_data:
         st.subheader("🗺️ Geographic Data Visualization")
         
-        # Create a map with all data points
-        map_data = []
+        # One layer per source with a constant colour; only coordinates go in the payload
         colors = {
             'miami_311': [255, 0, 0],      # Red for 311 requests
             'miami_permits': [0, 255, 0],  # Green for permits
@@ -478,22 +477,27 @@ def display_miami_data_dashboard():
             'mdade_traffic': [255, 255, 0]  # Yellow for traffic
         }
         
+        import pydeck as pdk
+        from map_payloads import compact_points
+        
+        layers = []
         for source_name, df in processed_data.items():
             if 'latitude' in df.columns and 'longitude' in df.columns:
-                source_df = df[['latitude', 'longitude']].dropna()
-                source_df = source_df[(source_df['latitude'] != 0) & (source_df['longitude'] != 0)]
+                source_df = compact_points(df, lat_col='latitude', lon_col='longitude')
+                source_df = source_df[(source_df['lat'] != 0) & (source_df['lon'] != 0)]
                 
                 if not source_df.empty:
-                    source_df['source'] = source_name
-                    source_df['color'] = [colors.get(source_name, [128, 128, 128])] * len(source_df)
-                    map_data.append(source_df)
+                    layers.append(pdk.Layer(
+                        "ScatterplotLayer",
+                        source_df,
+                        id=source_name,
+                        get_position=["lon", "lat"],
+                        get_color=colors.get(source_name, [128, 128, 128]),
+                        get_radius=50,
+                        pickable=True,
+                    ))
         
-        if map_data:
-            combined_map_data = pd.concat(map_data, ignore_index=True)
-            
-            # Create pydeck map
-            import pydeck as pdk
-            
+        if layers:
             view_state = pdk.ViewState(
                 latitude=25.721,
                 longitude=-80.268,
@@ -501,19 +505,10 @@ def display_miami_data_dashboard():
                 pitch=0,
             )
             
-            layer = pdk.Layer(
-                "ScatterplotLayer",
-                combined_map_data,
-                get_position=["longitude", "latitude"],
-                get_color="color",
-                get_radius=50,
-                pickable=True,
-            )
-            
             deck = pdk.Deck(
                 map_style='mapbox://styles/mapbox/light-v9',
                 initial_view_state=view_state,
-                layers=[layer],
+                layers=layers,
             )
             
             st.pydeck_chart(deck)
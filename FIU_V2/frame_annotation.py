@@ -0,0 +1,73 @@
+"""
+Frame Annotation
+Draws counting zones, road regions, tracked boxes and running counts onto detection frames
+"""
+
+import logging
+from typing import Iterable, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from counting_zones import Zone
+from motion_gating import FULL_FRAME, Roi, roi_pixels
+from vehicle_tracker import Track
+
+logger = logging.getLogger(__name__)
+
+PERSON_COLOR = (255, 0, 0)
+CAR_COLOR = (0, 255, 0)
+LINE_COLOR = (0, 0, 255)
+POLYGON_COLOR = (0, 215, 255)
+
+
+def draw_overlay(frame: np.ndarray, tracks: Iterable[Track], zones: Sequence[Zone], car_count: int,
+                 person_count: int, rois: Optional[Sequence[Roi]] = None) -> np.ndarray:
+    """
+    Annotate a BGR frame in place
+
+    Args:
+        frame: Frame to draw on
+        tracks: Tracks to box and label
+        zones: Counting lines and polygons, labelled with their names
+        car_count, person_count: Running counts shown in the corner
+        rois: Analysed road regions, outlined unless they cover the whole frame
+
+    Returns:
+        The same frame
+    """
+    # Draw counting zones
+    h, w = frame.shape[:2]
+    for zone in zones:
+        points = zone.pixels(w, h).round().astype(np.int32)
+        color = LINE_COLOR if zone.kind == 'line' else POLYGON_COLOR
+        if zone.kind == 'line':
+            cv2.line(frame, tuple(map(int, points[0])), tuple(map(int, points[1])), color, 2)
+        else:
+            cv2.polylines(frame, [points], True, color, 2)
+        x, y = points[0]
+        cv2.putText(frame, zone.name, (int(x) + 5, max(int(y) - 8, 15)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+
+    # Outline the analysed road regions
+    if rois and list(rois) != [FULL_FRAME]:
+        for roi in rois:
+            x1, y1, x2, y2 = roi_pixels(roi, frame.shape[1], frame.shape[0])
+            cv2.rectangle(frame, (x1, y1), (x2 - 1, y2 - 1), (200, 200, 200), 1)
+
+    for track in tracks:
+        class_name = 'person' if track.class_id == 0 else 'car'
+        color = PERSON_COLOR if class_name == 'person' else CAR_COLOR
+        label = f"{class_name} #{track.track_id} {track.score:.2f}"
+
+        x_min, y_min, x_max, y_max = map(int, track.box)
+
+        cv2.rectangle(frame, (x_min, y_min), (x_max, y_max), color, 2)
+        cv2.putText(frame, label, (x_min, y_min - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+
+    # Display counts
+    cv2.putText(frame, f"Cars: {car_count}", (10, 30),
+                cv2.FONT_HERSHEY_SIMPLEX, 1, CAR_COLOR, 2)
+    cv2.putText(frame, f"People: {person_count}", (10, 70),
+                cv2.FONT_HERSHEY_SIMPLEX, 1, PERSON_COLOR, 2)
+    return frame
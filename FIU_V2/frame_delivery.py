@@ -0,0 +1,164 @@
+"""
+Frame Delivery
+Downscaled, adaptively compressed JPEG frames for the browser, throttled in Streamlit or served as MJPEG
+"""
+
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import quote, unquote
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DELIVERY_MODES = ('streamlit', 'mjpeg')
+
+
+def downscale(frame: np.ndarray, max_width: int) -> np.ndarray:
+    """Shrink a frame to at most max_width pixels wide, keeping its aspect ratio"""
+    h, w = frame.shape[:2]
+    if max_width <= 0 or w <= max_width:
+        return frame
+    return cv2.resize(frame, (max_width, max(int(round(h * max_width / w)), 1)), interpolation=cv2.INTER_AREA)
+
+
+class AdaptiveJpegEncoder:
+    """
+    JPEG encoder that steers its quality towards a target frame size
+
+    After each frame the quality moves one step down if the frame came out
+    more than 10% over target_kb and one step up if it was more than 20%
+    under, so busy scenes are compressed harder and quiet ones look
+    better at a roughly constant bandwidth. Frames are encoded straight
+    from BGR, so no colour conversion is needed for display.
+
+    Args:
+        target_kb: Desired size of one frame
+        quality: Starting JPEG quality
+        min_quality, max_quality: Bounds for the quality
+        step: Quality change per adjustment
+    """
+
+    def __init__(self, target_kb: float = 60.0, quality: int = 80, min_quality: int = 35,
+                 max_quality: int = 90, step: int = 5):
+        self.target_bytes = target_kb * 1024
+        self.quality = quality
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.step = step
+        self.last_size = 0
+
+    def encode(self, frame: np.ndarray) -> bytes:
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, int(self.quality)])
+        if not ok:
+            raise RuntimeError("JPEG encoding failed")
+        data = buffer.tobytes()
+        self.last_size = len(data)
+        if self.last_size > self.target_bytes * 1.1:
+            self.quality = max(self.quality - self.step, self.min_quality)
+        elif self.last_size < self.target_bytes * 0.8:
+            self.quality = min(self.quality + self.step, self.max_quality)
+        return data
+
+
+class FrameThrottle:
+    """Lets at most max_fps updates per second through"""
+
+    def __init__(self, max_fps: float = 10.0):
+        self.interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self._last = 0.0
+
+    def ready(self) -> bool:
+        now = time.perf_counter()
+        if now - self._last >= self.interval:
+            self._last = now
+            return True
+        return False
+
+
+class _MjpegHandler(BaseHTTPRequestHandler):
+    server: 'MjpegServer'
+
+    def do_GET(self):
+        name = unquote(self.path.lstrip('/').split('?')[0])
+        if not name.endswith('.mjpg'):
+            self.send_error(404)
+            return
+        name = name[:-len('.mjpg')]
+        self.send_response(200)
+        self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=frame')
+        self.send_header('Cache-Control', 'no-cache, private')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        sequence = 0
+        try:
+            while not self.server.closing:
+                sequence, jpeg = self.server.wait_frame(name, sequence, timeout=5.0)
+                if jpeg is None:
+                    continue
+                self.wfile.write(b'--frame\r\nContent-Type: image/jpeg\r\nContent-Length: '
+                                 + str(len(jpeg)).encode() + b'\r\n\r\n' + jpeg + b'\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+class MjpegServer(ThreadingHTTPServer):
+    """
+    Minimal MJPEG server for annotated detection frames
+
+    Each stream keeps only its newest JPEG; every connected viewer is sent
+    that frame when it changes, so one encode serves any number of
+    viewers and frames bypass Streamlit's websocket entirely. A viewer on
+    a slow connection simply skips frames. Streams are available at
+    http://host:port/<name>.mjpg.
+
+    Args:
+        host: Interface to bind; localhost by default
+        port: TCP port
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8765):
+        super().__init__((host, port), _MjpegHandler)
+        self.closing = False
+        self._frames: Dict[str, tuple] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'MjpegServer':
+        self._thread = threading.Thread(target=self.serve_forever, name='mjpeg-server', daemon=True)
+        self._thread.start()
+        logger.info(f"MJPEG server listening on {self.server_address[0]}:{self.server_address[1]}")
+        return self
+
+    def stop(self):
+        self.closing = True
+        with self._cond:
+            self._cond.notify_all()
+        self.shutdown()
+        self.server_close()
+
+    def url(self, name: str, host: Optional[str] = None) -> str:
+        return f"http://{host or self.server_address[0]}:{self.server_address[1]}/{quote(name)}.mjpg"
+
+    def publish(self, name: str, jpeg: bytes):
+        """Replace a stream's current frame and wake its viewers"""
+        with self._cond:
+            sequence = self._frames.get(name, (0, None))[0] + 1
+            self._frames[name] = (sequence, jpeg)
+            self._cond.notify_all()
+
+    def wait_frame(self, name: str, after: int, timeout: float):
+        """(sequence, jpeg) of the first frame newer than after, or (after, None) on timeout"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.closing or self._frames.get(name, (0, None))[0] > after, timeout)
+            sequence, jpeg = self._frames.get(name, (0, None))
+            return (sequence, jpeg) if sequence > after else (after, None)
@@ -0,0 +1,209 @@
+"""
+KDE Heatmap Tiles
+Server-side kernel density rasters cut into web-mercator XYZ tiles and encoded as PNG
+"""
+
+import base64
+import logging
+import struct
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TILE_SIZE = 256
+EARTH_CIRCUMFERENCE_M = 40_075_016.686
+
+# Largest raster side in pixels; higher zooms over a wide extent fall back to a coarser level
+MAX_RASTER_PX = 4096
+
+# Same ramp as deck.gl's default heatmap colorRange, low to high density
+COLOR_RAMP = np.array([
+    [255, 255, 178], [254, 217, 118], [254, 178, 76],
+    [253, 141, 60], [240, 59, 32], [189, 0, 38],
+], dtype=float)
+
+TileKey = Tuple[int, int, int]
+
+
+def lonlat_to_pixels(lon, lat, zoom: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Global web-mercator pixel coordinates at a zoom level"""
+    scale = TILE_SIZE * (1 << zoom)
+    lat = np.clip(np.asarray(lat, dtype=float), -85.05112878, 85.05112878)
+    x = (np.asarray(lon, dtype=float) + 180.0) / 360.0 * scale
+    y = (1.0 - np.log(np.tan(np.radians(lat)) + 1.0 / np.cos(np.radians(lat))) / np.pi) / 2.0 * scale
+    return x, y
+
+
+def tile_bounds(zoom: int, tile_x: int, tile_y: int) -> List[float]:
+    """[west, south, east, north] of an XYZ tile in degrees"""
+    n = 1 << zoom
+
+    def lat(y):
+        return float(np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * y / n)))))
+
+    return [tile_x / n * 360.0 - 180.0, lat(tile_y + 1), (tile_x + 1) / n * 360.0 - 180.0, lat(tile_y)]
+
+
+def _raster_extent(px_min: float, py_min: float, px_max: float, py_max: float, mean_lat: float,
+                   zoom: int, bandwidth_m: float) -> Tuple[float, int, int, int, int, int]:
+    """Kernel sigma and padding in pixels, and the first and last tile columns and rows covering the points"""
+    meters_per_px = EARTH_CIRCUMFERENCE_M * np.cos(np.radians(mean_lat)) / (TILE_SIZE * (1 << zoom))
+    sigma = max(bandwidth_m / meters_per_px, 0.5)
+    pad = int(np.ceil(3 * sigma))
+    tx0, ty0 = int((px_min - pad) // TILE_SIZE), int((py_min - pad) // TILE_SIZE)
+    tx1, ty1 = int((px_max + pad) // TILE_SIZE), int((py_max + pad) // TILE_SIZE)
+    return sigma, pad, tx0, ty0, tx1, ty1
+
+
+def _fits(tx0: int, ty0: int, tx1: int, ty1: int, pad: int) -> bool:
+    return max(tx1 - tx0 + 1, ty1 - ty0 + 1) * TILE_SIZE + 2 * pad <= MAX_RASTER_PX
+
+
+def max_zoom(lat, lon, zoom: int, bandwidth_m: float = 200.0) -> Optional[int]:
+    """
+    Largest zoom level, at most zoom, whose heatmap raster fits MAX_RASTER_PX
+
+    Only the points' bounds are projected per level, so this is cheap
+    next to kde_tiles(). Returns None if no level from zoom down to 1 fits
+    or there are no valid points.
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    if not valid.any():
+        return None
+    lat, lon = lat[valid], lon[valid]
+    corner_lon = np.array([lon.min(), lon.max()])
+    corner_lat = np.array([lat.max(), lat.min()])  # pixel y grows southwards
+    for level in range(zoom, 0, -1):
+        px, py = lonlat_to_pixels(corner_lon, corner_lat, level)
+        _, pad, tx0, ty0, tx1, ty1 = _raster_extent(px[0], py[0], px[1], py[1], lat.mean(), level, bandwidth_m)
+        if _fits(tx0, ty0, tx1, ty1, pad):
+            return level
+    return None
+
+
+def _fast_size(n: int) -> int:
+    """Smallest size >= n with no prime factors above 5, where FFTs are fastest"""
+    while True:
+        m = n
+        for p in (2, 3, 5):
+            while m % p == 0:
+                m //= p
+        if m == 1:
+            return n
+        n += 1
+
+
+def _gaussian_kernel_fft(shape: Tuple[int, int], sigma_px: float) -> np.ndarray:
+    """rfft2 of a unit-mass Gaussian centred on the origin of a periodic grid"""
+    # The kernel is separable, so its 2D transform is the outer product of two 1D transforms
+    def axis(n):
+        d = np.minimum(np.arange(n), n - np.arange(n))
+        g = np.exp(-d ** 2 / (2.0 * sigma_px ** 2))
+        return g / g.sum()
+
+    return np.fft.fft(axis(shape[0]))[:, None] * np.fft.rfft(axis(shape[1]))[None, :]
+
+
+def _color_lut(threshold: float) -> np.ndarray:
+    """(256, 4) RGBA lookup table indexed by density quantised to 0..255"""
+    intensity = np.linspace(0.0, 1.0, 256)
+    position = intensity * (len(COLOR_RAMP) - 1)
+    low = np.floor(position).astype(int)
+    high = np.minimum(low + 1, len(COLOR_RAMP) - 1)
+    frac = (position - low)[:, None]
+    rgb = COLOR_RAMP[low] * (1 - frac) + COLOR_RAMP[high] * frac
+    alpha = np.where(intensity >= threshold, 90 + 150 * np.sqrt(intensity), 0)
+    return np.hstack([rgb, alpha[:, None]]).round().astype(np.uint8)
+
+
+def colorize(intensity: np.ndarray, threshold: float = 0.03) -> np.ndarray:
+    """Map normalised density (0..1) to RGBA uint8, transparent below the threshold"""
+    levels = (np.clip(intensity, 0.0, 1.0) * 255).astype(np.uint8)
+    return _color_lut(threshold)[levels]
+
+
+def encode_png(rgba: np.ndarray, compression: int = 6) -> bytes:
+    """Encode an (H, W, 4) uint8 array as an RGBA PNG using only zlib"""
+    height, width = rgba.shape[:2]
+
+    def chunk(kind: bytes, payload: bytes) -> bytes:
+        return struct.pack('>I', len(payload)) + kind + payload + struct.pack('>I', zlib.crc32(kind + payload) & 0xffffffff)
+
+    # Filter type 0 (none) in front of every scanline
+    raw = np.hstack([np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, width * 4)])
+    return (
+        b'\x89PNG\r\n\x1a\n'
+        + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+        + chunk(b'IDAT', zlib.compress(raw.tobytes(), compression))
+        + chunk(b'IEND', b'')
+    )
+
+
+def png_data_url(rgba: np.ndarray) -> str:
+    """PNG data URL for use as a BitmapLayer image"""
+    return 'data:image/png;base64,' + base64.b64encode(encode_png(rgba)).decode('ascii')
+
+
+def kde_tiles(lat, lon, zoom: int, weights: Optional[np.ndarray] = None,
+              bandwidth_m: float = 200.0, threshold: float = 0.03) -> Dict[TileKey, np.ndarray]:
+    """
+    Gaussian kernel density of points, cut into RGBA tiles at one zoom level
+
+    Points are binned onto the web-mercator pixel grid of the tiles that
+    cover them (plus a 3-sigma margin) and convolved with the kernel by
+    FFT, so the cost depends on the raster size and not on the number of
+    points. Density is normalised by its maximum over all tiles of the
+    level; tiles with no visible pixels are omitted.
+
+    Args:
+        lat, lon: Point coordinates
+        zoom: XYZ zoom level of the tiles
+        weights: Optional per-point weights (e.g. accident counts)
+        bandwidth_m: Kernel standard deviation in metres
+        threshold: Normalised density below which pixels are transparent
+
+    Returns:
+        Dict mapping (zoom, x, y) to a (256, 256, 4) uint8 array
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    weights = np.ones(len(lat)) if weights is None else np.asarray(weights, dtype=float)
+    valid &= np.isfinite(weights)
+    if not valid.any():
+        return {}
+    lat, lon, weights = lat[valid], lon[valid], weights[valid]
+
+    px, py = lonlat_to_pixels(lon, lat, zoom)
+    sigma, pad, tx0, ty0, tx1, ty1 = _raster_extent(
+        px.min(), py.min(), px.max(), py.max(), lat.mean(), zoom, bandwidth_m
+    )
+    width, height = (tx1 - tx0 + 1) * TILE_SIZE, (ty1 - ty0 + 1) * TILE_SIZE
+    if not _fits(tx0, ty0, tx1, ty1, pad):
+        raise ValueError(f"Heatmap raster of {width}x{height}px at zoom {zoom} exceeds {MAX_RASTER_PX}px")
+
+    # Grid with a margin so the periodic FFT convolution does not wrap density across edges
+    shape = (_fast_size(height + 2 * pad), _fast_size(width + 2 * pad))
+    cols = (px - tx0 * TILE_SIZE + pad).astype(np.int64)
+    rows = (py - ty0 * TILE_SIZE + pad).astype(np.int64)
+    grid = np.bincount(rows * shape[1] + cols, weights=weights, minlength=shape[0] * shape[1]).reshape(shape)
+    density = np.fft.irfft2(np.fft.rfft2(grid) * _gaussian_kernel_fft(shape, sigma), s=shape)
+    density = density[pad:pad + height, pad:pad + width]
+    peak = density.max()
+    if peak <= 0:
+        return {}
+    rgba = colorize(density / peak, threshold)
+
+    tiles = {}
+    for j in range(ty1 - ty0 + 1):
+        for i in range(tx1 - tx0 + 1):
+            tile = rgba[j * TILE_SIZE:(j + 1) * TILE_SIZE, i * TILE_SIZE:(i + 1) * TILE_SIZE]
+            if tile[..., 3].any():
+                tiles[(zoom, tx0 + i, ty0 + j)] = np.ascontiguousarray(tile)
+    logger.info(f"KDE heatmap: {len(lat)} points -> {len(tiles)} tiles at zoom {zoom} ({width}x{height}px)")
+    return tiles
@@ -15,15 +15,10 @@ import os
 import io
 import base64
 from pydantic import BaseModel, validator
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
-import google.generativeai as genai
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
 from sklearn.linear_model import LinearRegression
 from streamlit_folium import folium_static
 import folium
-from folium.plugins import HeatMap, TimestampedGeoJson
+from folium.plugins import TimestampedGeoJson
 import requests
 from deep_translator import GoogleTranslator
 import pydeck as pdk
@@ -32,6 +27,24 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 import re
 import hashlib
 import streamlit.components.v1 as components  # For embedding iframes
+from config import config
+from conversation_context import ConversationContext
+from data_versioning import versioned
+from document_ingestion import PDFIngestionPipeline
+from embedding_cache import CachedEmbeddings
+from heatmap_tiles import kde_tiles, max_zoom, png_data_url, tile_bounds
+from hex_binning import HexBinPyramid
+from map_payloads import compact_points
+from query_router import StructuredQueryRouter
+from render_cache import RenderCache, freeze_deck
+from response_cache import SemanticResponseCache
+from spatial_index import GridSpatialIndex
+from timeline_frames import TimelineFrames
+from rag_pipeline import (
+    LazyEmbeddings, LocalRAGPipeline, answer_question, build_dataset_documents,
+    create_chat_model, stream_answer
+)
+from spatiotemporal_join import join_posts_to_incidents
 
 # ===========================================================
 # 1. Configuration and Constants
@@ -121,36 +134,36 @@ def load_police_data():
         if 'lat' not in df.columns or 'lon' not in df.columns:
             df['lat'] = np.random.uniform(25.70, 25.75, len(df))
             df['lon'] = np.random.uniform(-80.30, -80.25, len(df))
-        return df
+        return versioned(df)
     except FileNotFoundError:
         st.warning("`police_data_with.csv` not found. Generating synthetic police data.")
-        return generate_police_data()
+        return versioned(generate_police_data())
     except Exception as e:
         st.error(f"Error loading police data: {e}")
-        return pd.DataFrame()
+        return versioned(pd.DataFrame())
 
 @st.cache_data
 def load_social_media_data():
     try:
         df = pd.read_csv("data/online_posts.csv")
         df['date'] = pd.to_datetime(df['date'])
-        return df
+        return versioned(df)
     except FileNotFoundError:
         st.warning("`online_posts.csv` not found. Generating synthetic social media data.")
-        return generate_social_media_data()
+        return versioned(generate_social_media_data())
     except Exception as e:
         st.error(f"Error loading social media data: {e}")
-        return pd.DataFrame()
+        return versioned(pd.DataFrame())
 
 @st.cache_data
 def generate_traffic_data():
     dates = pd.date_range(start='2023-01-01', end='2024-12-31', freq='D')
-    return pd.DataFrame({
+    return versioned(pd.DataFrame({
         'Date': dates,
         'lat': np.random.uniform(25.70, 25.75, len(dates)),
         'lon': np.random.uniform(-80.30, -80.25, len(dates)),
         'Accidents': np.random.randint(0, 10, len(dates))
-    })
+    }))
 
 @st.cache_data
 def generate_real_estate_data():
@@ -158,10 +171,10 @@ def generate_real_estate_data():
     # Simulate ZHVI with a slight upward trend and some noise
     base_value = 400000
     values = base_value + np.cumsum(np.random.normal(loc=2000, scale=1000, size=len(dates)))
-    return pd.DataFrame({
+    return versioned(pd.DataFrame({
         'Date': dates,
         'ZHVI': values
-    })
+    }))
 
 @st.cache_data
 def generate_police_data():
@@ -262,10 +275,14 @@ def get_table_download_link(df, filename, file_label):
     href = f'<a href="data:file/csv;base64,{b64}" download="{filename}">{file_label}</a>'
     return href
 
+@st.cache_data(max_entries=4096, show_spinner=False)
+def _translate(text, dest_lang):
+    # Failures raise instead of returning, so they are never cached
+    return GoogleTranslator(source='auto', target=dest_lang).translate(text)
+
 def translate_text(text, dest_lang):
     try:
-        translator = GoogleTranslator(source='auto', target=dest_lang)
-        return translator.translate(text)
+        return _translate(text, dest_lang)
     except Exception as e:
         st.error(f"Translation error: {e}")
         return text  # Fallback to original text
@@ -303,39 +320,82 @@ def compare_historical_data(df, column, start_date1, end_date1, start_date2, end
     )
     return fig
 
-def create_3d_map(data, column, color_scale, overlay_type):
+@st.cache_resource(max_entries=8, show_spinner=False)
+def get_hex_pyramid(data_version, weight_col, _data):
+    # Binned once per data version; date ranges and zoom levels are sliced from it
+    return HexBinPyramid(_data, date_col='Date', weight_col=weight_col)
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def get_spatial_index(data_version, _data):
+    # One grid index per dataset version, shared by every map and proximity query
+    return GridSpatialIndex.from_frame(_data)
+
+def filter_date_range(data, start_date=None, end_date=None):
+    if start_date is None and end_date is None:
+        return data
+    return data[
+        (data['Date'] >= pd.Timestamp(start_date or data['Date'].min())) &
+        (data['Date'] <= pd.Timestamp(end_date or data['Date'].max()))
+    ]
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def get_heatmap_tiles(data_version, column, start_date, end_date, category, zoom, _data):
+    # Density tiles per (data version, date range, category); cost is set by the raster size, not the point count
+    data = filter_date_range(_data, start_date, end_date)
+    weights = None
+    if pd.api.types.is_numeric_dtype(data[column]):
+        weights = data[column].to_numpy(dtype=float)
+    elif category is not None:
+        data = data[data[column] == category]
+    lat, lon = data['lat'].to_numpy(), data['lon'].to_numpy()
+    # Wide extents fall back to the finest level whose raster fits, found from the bounds alone
+    zoom = max_zoom(lat, lon, zoom)
+    tiles = kde_tiles(lat, lon, zoom, weights=weights) if zoom is not None else {}
+    return [(tile_bounds(*key), png_data_url(rgba)) for key, rgba in tiles.items()]
+
+def create_3d_map(data, data_version, column, color_scale, overlay_type, start_date=None, end_date=None, zoom=11,
+                  category=None):
     if overlay_type == "HexagonLayer":
-        layer = pdk.Layer(
-            "HexagonLayer",
-            data=data,
+        # Aggregate on the server and send one column per non-empty hexagon instead of every point
+        weight_col = column if pd.api.types.is_numeric_dtype(data[column]) else None
+        pyramid = get_hex_pyramid(data_version, weight_col, data)
+        radius = pyramid.radius_for_zoom(zoom)
+        cells = pyramid.cells(radius=radius, start_date=start_date, end_date=end_date)
+        peak = cells['weight'].max() if not cells.empty else 0
+        cells['elevation'] = cells['weight'] / peak * 1000 if peak else 0.0
+        layers = [pdk.Layer(
+            "ColumnLayer",
+            data=cells,
             get_position=['lon', 'lat'],
+            get_elevation='elevation',
+            # deck.gl puts the first disk vertex due east, so angle 0 gives the
+            # flat-top hexagons HexBinPyramid bins into, with radius as circumradius
+            disk_resolution=6,
+            angle=0,
+            radius=radius,
             auto_highlight=True,
-            radius=100,
             elevation_scale=4,
-            elevation_range=[0, 1000],
             pickable=True,
             extruded=True,
             get_fill_color=color_scale,
-        )
+        )]
+        data = cells if not cells.empty else data
     elif overlay_type == "ScatterplotLayer":
-        layer = pdk.Layer(
+        data = filter_date_range(data, start_date, end_date)
+        layers = [pdk.Layer(
             "ScatterplotLayer",
-            data=data,
+            data=compact_points(data),
             get_position=['lon', 'lat'],
             get_color=color_scale,
             get_radius=100,
-        )
+        )]
     elif overlay_type == "HeatmapLayer":
-        layer = pdk.Layer(
-            "HeatmapLayer",
-            data=data,
-            get_position=['lon', 'lat'],
-            aggregation='MEAN',
-            intensity=column,
-            radius=100,
-            upper_percentile=100,
-            threshold=0.03,
-        )
+        # Pre-rendered density tiles, two zoom levels finer than the view so they stay sharp when zooming in
+        tiles = get_heatmap_tiles(data_version, column, start_date, end_date, category, zoom + 2, data)
+        layers = [
+            pdk.Layer("BitmapLayer", id=f"heatmap-{i}", image=image, bounds=bounds, opacity=0.8)
+            for i, (bounds, image) in enumerate(tiles)
+        ]
     else:
         st.warning("Invalid overlay type selected.")
         return go.Figure()
@@ -345,12 +405,101 @@ def create_3d_map(data, column, color_scale, overlay_type):
         initial_view_state={
             "latitude": data['lat'].mean(),
             "longitude": data['lon'].mean(),
-            "zoom": 11,
+            "zoom": zoom,
             "pitch": 50,
         },
-        layers=[layer],
+        layers=layers,
+    )
+    return freeze_deck(deck)
+
+@st.cache_resource
+def get_render_cache():
+    return RenderCache(max_entries=64)
+
+def render_cached(view, data_version, start_date, end_date, overlay_type, lang_code, builder):
+    # Built decks and figures are reused until the data or the view's own inputs change
+    key = (view, data_version, str(start_date), str(end_date), overlay_type, lang_code)
+    return get_render_cache().get_or_build(key, builder)
+
+def build_crime_trends(police_data, start_date, end_date, lang_code):
+    filtered_police_data = filter_date_range(police_data, start_date, end_date)
+    if filtered_police_data.empty:
+        return None
+    incident_counts = filtered_police_data.groupby(['Date', 'incident_type']).size().unstack(fill_value=0)
+    total_incidents = filtered_police_data.groupby('Date').size()
+    future_trend = predict_future_trend(total_incidents)
+    future_dates = pd.date_range(start=total_incidents.index[-1] + pd.Timedelta(days=1), periods=30)
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=total_incidents.index, y=total_incidents.values, name=translate_text('Historical', lang_code)))
+    fig.add_trace(go.Scatter(x=future_dates, y=future_trend, name=translate_text('Predicted', lang_code)))
+    fig.update_layout(template='plotly_dark')
+    download_link = get_table_download_link(
+        filtered_police_data,
+        "crime_data.csv",
+        translate_text("Download Crime Data as CSV", lang_code)
+    )
+    return {'incident_counts': incident_counts, 'trend_figure': fig, 'download_link': download_link}
+
+def build_traffic_trends(traffic_data, start_date, end_date, lang_code):
+    filtered_traffic_data = filter_date_range(traffic_data, start_date, end_date)
+    if filtered_traffic_data.empty:
+        return None
+    history_fig = px.line(
+        filtered_traffic_data,
+        x='Date',
+        y='Accidents',
+        title=translate_text('Traffic Accidents Over Time', lang_code),
+        template='plotly_dark'
     )
-    return deck
+    future_trend = predict_future_trend(filtered_traffic_data.set_index('Date')['Accidents'])
+    future_dates = pd.date_range(start=filtered_traffic_data['Date'].max() + pd.Timedelta(days=1), periods=30)
+    trend_fig = go.Figure()
+    trend_fig.add_trace(go.Scatter(x=filtered_traffic_data['Date'], y=filtered_traffic_data['Accidents'], name=translate_text('Historical', lang_code)))
+    trend_fig.add_trace(go.Scatter(x=future_dates, y=future_trend, name=translate_text('Predicted', lang_code)))
+    trend_fig.update_layout(template='plotly_dark')
+    download_link = get_table_download_link(
+        filtered_traffic_data,
+        "traffic_data.csv",
+        translate_text("Download Traffic Data as CSV", lang_code)
+    )
+    return {'history_figure': history_fig, 'trend_figure': trend_fig, 'download_link': download_link}
+
+def build_sentiment_histogram(social_media_data, lang_code):
+    sentiment = social_media_data['content'].apply(analyze_sentiment)
+    return px.histogram(
+        x=sentiment,
+        nbins=50,
+        labels={'x': 'sentiment'},
+        title=translate_text("Distribution of Social Media Sentiment", lang_code),
+        template='plotly_dark'
+    )
+
+@st.cache_resource(show_spinner=False)
+def get_incident_timeline(frequency):
+    # Frames live for the whole process and are only topped up as new incidents arrive
+    return TimelineFrames(frequency)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def render_timeline_map(frequency, frames_version, start_date, end_date, _frames):
+    # Rendered once per frame set and date range; scrubbing the slider is handled in the browser
+    m = folium.Map(location=list(config.get_default_location()), zoom_start=13, tiles='cartodbdark_matter')
+    TimestampedGeoJson(
+        _frames.feature_collection(start_date, end_date),
+        period=_frames.duration,
+        duration=_frames.duration,
+        add_last_point=False,
+        auto_play=False,
+        loop=False,
+        max_speed=10,
+        date_options='YYYY-MM-DD',
+        time_slider_drag_update=True,
+    ).add_to(m)
+    return m.get_root().render()
+
+@st.cache_data(show_spinner=False)
+def get_post_incident_matches(data_version, tolerance_days, _police_data, _social_media_data):
+    # Cached per data version so the join only reruns when either dataset changes
+    return join_posts_to_incidents(_police_data, _social_media_data, tolerance_days=tolerance_days)
 
 def recommend_content(user_history, all_content):
     if not all_content:
@@ -368,16 +517,89 @@ def recommend_content(user_history, all_content):
 # 4. Gemini Chat Functions (Reintegrated Original Code)
 # ===========================================================
 
+@st.cache_resource(show_spinner="Loading local knowledge base...")
+def get_knowledge_base():
+    # Built once per process: opening the persisted Chroma collection is cheap and
+    # only documents whose content hash changed since the last run are re-embedded
+    embeddings = CachedEmbeddings(
+        LazyEmbeddings(config.EMBEDDING_MODEL_NAME),
+        config.EMBEDDING_CACHE_DIR,
+        namespace=config.EMBEDDING_MODEL_NAME,
+        batch_size=config.EMBEDDING_BATCH_SIZE,
+        max_workers=config.EMBEDDING_WORKERS or None
+    )
+    pipeline = LocalRAGPipeline(config.VECTORSTORE_DIR, embeddings)
+    pipeline.sync(
+        build_dataset_documents(load_police_data()[0], load_social_media_data()[0]),
+        prune_prefixes=('police:', 'post:')
+    )
+    # City PDFs are parsed in a process pool; unchanged files are skipped by hash
+    PDFIngestionPipeline(pipeline, config.DOCUMENTS_DIR).run()
+    return pipeline
+
+@st.cache_resource
+def get_chat_model():
+    return create_chat_model(config.CHAT_BACKEND, config.GOOGLE_GEMINI_API_KEY, config.GEMINI_MODEL_NAME)
+
 def setup_gemini_chat():
-    # Initialize Gemini Chat components if necessary
-    # This function should set up the model and vectorstore as per your requirements
-    # For now, it returns None placeholders
-    return None, None
+    model = get_chat_model()
+    try:
+        vectorstore = get_knowledge_base().vectorstore
+    except Exception as e:
+        st.error(f"Error building the local knowledge base: {e}")
+        vectorstore = None
+    return model, vectorstore
+
+CHAT_ERROR_ANSWER = "Sorry, I couldn't answer that right now."
+CHAT_HISTORY_DISPLAY_TURNS = 20
 
 def gemini_chat(model, vectorstore, question, conversation_history):
-    # Implement the Gemini Chat functionality here
-    # For now, it's a placeholder returning a static response
-    return "This is a placeholder response from the Gemini model."
+    try:
+        answer, _ = answer_question(model, vectorstore, question, conversation_history, top_k=config.RETRIEVAL_TOP_K)
+        return answer
+    except Exception as e:
+        st.error(f"Error generating answer: {e}")
+        return CHAT_ERROR_ANSWER
+
+def gemini_chat_stream(model, vectorstore, question, conversation_history):
+    # Streaming variant of gemini_chat: tokens are rendered as they arrive
+    try:
+        yield from stream_answer(model, vectorstore, question, conversation_history, top_k=config.RETRIEVAL_TOP_K)
+    except Exception as e:
+        st.error(f"Error generating answer: {e}")
+        yield CHAT_ERROR_ANSWER
+
+@st.cache_resource
+def get_semantic_response_cache():
+    # Shared by all sessions: residents tend to ask the same handful of questions.
+    # Raises while the knowledge base is unavailable, so no degraded instance is cached
+    embed_fn = get_knowledge_base().embeddings.embed_query
+    return SemanticResponseCache(embed_fn, threshold=config.CHAT_CACHE_SIMILARITY)
+
+@st.cache_resource
+def get_exact_response_cache():
+    # Exact-match stand-in while the embeddings cannot be loaded
+    return SemanticResponseCache(None, threshold=config.CHAT_CACHE_SIMILARITY)
+
+def get_response_cache():
+    # Retried on every call, so similarity matching comes back with the knowledge base
+    try:
+        return get_semantic_response_cache()
+    except Exception:
+        return get_exact_response_cache()
+
+@st.cache_resource(max_entries=4)
+def get_query_router(data_version, _police_data, _social_media_data):
+    # One router per data version; it precomputes the column arrays it filters on
+    return StructuredQueryRouter(_police_data, _social_media_data)
+
+def get_chat_data_version(model):
+    # Answers depend on the indexed documents and on which model produced them
+    try:
+        index_version = get_knowledge_base().index_version
+    except Exception:
+        index_version = "no-index"
+    return f"{index_version}:{model.name}"
 
 # ===========================================================
 # 5. Data Models for Custom Alerts
@@ -406,7 +628,7 @@ def setup_custom_alert(alert_type, threshold, user_id):
 # 6. Display Functions
 # ===========================================================
 
-def display_home_page(police_data, traffic_data, real_estate_data, social_media_data, lang_code):
+def display_home_page(police_data, traffic_data, real_estate_data, social_media_data, versions, lang_code):
     st.write(translate_text("Welcome to the Coral Gables AI for Good Dashboard. This tool provides insights into various aspects of life in Coral Gables, Florida.", lang_code))
     
     st.subheader(translate_text("Quick Stats", lang_code))
@@ -429,7 +651,10 @@ def display_home_page(police_data, traffic_data, real_estate_data, social_media_
                 ["HexagonLayer", "ScatterplotLayer", "HeatmapLayer"],
                 key=f'{widget}_overlay'
             )
-            crime_3d_map = create_3d_map(police_data, 'incident_type', [255, 0, 0], overlay_type)
+            crime_3d_map = render_cached(
+                'home_crime_map', versions['police'], None, None, overlay_type, lang_code,
+                lambda: create_3d_map(police_data, versions['police'], 'incident_type', [255, 0, 0], overlay_type)
+            )
             st.pydeck_chart(crime_3d_map)
         elif widget == "3D Traffic Heatmap":
             st.subheader(translate_text("3D Traffic Accident Heatmap", lang_code))
@@ -438,118 +663,144 @@ def display_home_page(police_data, traffic_data, real_estate_data, social_media_
                 ["HexagonLayer", "ScatterplotLayer", "HeatmapLayer"],
                 key=f'{widget}_overlay'
             )
-            traffic_3d_map = create_3d_map(traffic_data, 'Accidents', [0, 255, 0], overlay_type)
+            traffic_3d_map = render_cached(
+                'home_traffic_map', versions['traffic'], None, None, overlay_type, lang_code,
+                lambda: create_3d_map(traffic_data, versions['traffic'], 'Accidents', [0, 255, 0], overlay_type)
+            )
             st.pydeck_chart(traffic_3d_map)
         elif widget == "Social Media Sentiment":
             st.subheader(translate_text("Social Media Sentiment Analysis", lang_code))
-            social_media_data['sentiment'] = social_media_data['content'].apply(analyze_sentiment)
-            fig = px.histogram(
-                social_media_data, 
-                x='sentiment', 
-                nbins=50, 
-                title=translate_text("Distribution of Social Media Sentiment", lang_code),
-                template='plotly_dark'
+            fig = render_cached(
+                'home_sentiment', versions['social_media'], None, None, None, lang_code,
+                lambda: build_sentiment_histogram(social_media_data, lang_code)
             )
             st.plotly_chart(fig)
         elif widget == "Real Estate Trends":
             st.subheader(translate_text("Real Estate Trends", lang_code))
-            fig = px.line(
-                real_estate_data, 
-                x='Date', 
-                y='ZHVI', 
-                title=translate_text('Zillow Home Value Index Over Time', lang_code),
-                template='plotly_dark'
+            fig = render_cached(
+                'home_real_estate', versions['real_estate'], None, None, None, lang_code,
+                lambda: px.line(
+                    real_estate_data, 
+                    x='Date', 
+                    y='ZHVI', 
+                    title=translate_text('Zillow Home Value Index Over Time', lang_code),
+                    template='plotly_dark'
+                )
             )
             st.plotly_chart(fig)
     
     display_recommendations(police_data, social_media_data, lang_code)
 
-def display_crime_analysis(police_data, start_date, end_date, lang_code):
+def display_crime_analysis(police_data, police_version, start_date, end_date, lang_code):
     st.subheader(translate_text("3D Crime Incident Map", lang_code))
     overlay_type = st.selectbox(
         translate_text("Select Map Overlay Type", lang_code),
         ["HexagonLayer", "ScatterplotLayer", "HeatmapLayer"],
         key='crime_overlay'
     )
-    filtered_police_data = police_data[
-        (police_data['Date'] >= pd.Timestamp(start_date)) & 
-        (police_data['Date'] <= pd.Timestamp(end_date))
-    ]
-    crime_3d_map = create_3d_map(filtered_police_data, 'incident_type', [255, 0, 0], overlay_type)
+    category = None
+    if overlay_type == "HeatmapLayer":
+        all_types = translate_text("All incident types", lang_code)
+        selected_type = st.selectbox(
+            translate_text("Incident Type", lang_code),
+            [all_types] + sorted(police_data['incident_type'].dropna().unique().tolist()),
+            key='crime_heatmap_category'
+        )
+        category = None if selected_type == all_types else selected_type
+    crime_3d_map = render_cached(
+        'crime_map', police_version, start_date, end_date, f"{overlay_type}:{category}", lang_code,
+        lambda: create_3d_map(police_data, police_version, 'incident_type', [255, 0, 0], overlay_type, start_date, end_date,
+                              category=category)
+    )
     st.pydeck_chart(crime_3d_map)
 
+    st.subheader(translate_text("Incidents Near a Location", lang_code))
+    default_lat, default_lon = config.get_default_location()
+    col1, col2, col3 = st.columns(3)
+    center_lat = col1.number_input(translate_text("Latitude", lang_code), value=default_lat, format="%.5f", key='nearby_lat')
+    center_lon = col2.number_input(translate_text("Longitude", lang_code), value=default_lon, format="%.5f", key='nearby_lon')
+    radius_m = col3.slider(translate_text("Radius (meters)", lang_code), 100, 3000, 500, step=100, key='nearby_radius')
+
+    spatial_index = get_spatial_index(police_version, police_data)
+    rows, distances = spatial_index.query_radius(center_lat, center_lon, radius_m, return_distance=True)
+    nearby = police_data.iloc[rows].assign(distance_m=distances.round(0))
+    nearby = nearby[(nearby['Date'] >= pd.Timestamp(start_date)) & (nearby['Date'] <= pd.Timestamp(end_date))]
+    st.metric(translate_text("Incidents within radius", lang_code), len(nearby))
+    if nearby.empty:
+        nearest_rows, nearest_distances = spatial_index.query_knn(center_lat, center_lon, k=5, return_distance=True)
+        st.info(translate_text("No incidents in this radius for the selected dates. Nearest incidents overall:", lang_code))
+        nearby = police_data.iloc[nearest_rows].assign(distance_m=nearest_distances.round(0))
+    st.pydeck_chart(pdk.Deck(
+        map_style="mapbox://styles/mapbox/dark-v9",
+        initial_view_state={"latitude": center_lat, "longitude": center_lon, "zoom": 14, "pitch": 0},
+        layers=[
+            pdk.Layer("ScatterplotLayer", data=compact_points(nearby), get_position=['lon', 'lat'],
+                      get_color=[255, 0, 0], get_radius=25),
+            pdk.Layer("ScatterplotLayer", data=pd.DataFrame({'lon': [center_lon], 'lat': [center_lat]}),
+                      get_position=['lon', 'lat'], get_color=[0, 170, 255], get_radius=radius_m,
+                      stroked=True, filled=False, line_width_min_pixels=2),
+        ],
+    ))
+    display_columns = [c for c in ['Date', 'incident_type', 'Location', 'distance_m'] if c in nearby.columns]
+    st.dataframe(nearby[display_columns].head(100), use_container_width=True)
+
+    st.subheader(translate_text("Incident Timeline", lang_code))
+    frequency = st.radio(
+        translate_text("Frame length", lang_code), ["daily", "weekly"],
+        format_func=lambda f: translate_text(f.capitalize(), lang_code),
+        horizontal=True, key='timeline_frequency'
+    )
+    timeline = get_incident_timeline(frequency)
+    timeline.update(police_data, data_version=police_version)
+    components.html(
+        render_timeline_map(frequency, timeline.version, start_date, end_date, timeline),
+        height=520,
+    )
+
     st.subheader(translate_text("Incident Types Over Time", lang_code))
-    if filtered_police_data.empty:
+    trends = render_cached(
+        'crime_trends', police_version, start_date, end_date, None, lang_code,
+        lambda: build_crime_trends(police_data, start_date, end_date, lang_code)
+    )
+    if trends is None:
         st.warning(translate_text("No crime data available for the selected date range.", lang_code))
     else:
-        incident_counts = filtered_police_data.groupby(['Date', 'incident_type']).size().unstack(fill_value=0)
-        st.line_chart(incident_counts)
+        st.line_chart(trends['incident_counts'])
         
         st.subheader(translate_text("Predicted Crime Trend (Next 30 Days)", lang_code))
-        total_incidents = filtered_police_data.groupby('Date').size()
-        future_trend = predict_future_trend(total_incidents)
-        future_dates = pd.date_range(start=total_incidents.index[-1] + pd.Timedelta(days=1), periods=30)
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(x=total_incidents.index, y=total_incidents.values, name=translate_text('Historical', lang_code)))
-        fig.add_trace(go.Scatter(x=future_dates, y=future_trend, name=translate_text('Predicted', lang_code)))
-        fig.update_layout(template='plotly_dark')
-        st.plotly_chart(fig)
+        st.plotly_chart(trends['trend_figure'])
         
-        st.markdown(
-            get_table_download_link(
-                filtered_police_data, 
-                "crime_data.csv", 
-                translate_text("Download Crime Data as CSV", lang_code)
-            ), 
-            unsafe_allow_html=True
-        )
+        st.markdown(trends['download_link'], unsafe_allow_html=True)
 
-def display_traffic_analysis(traffic_data, start_date, end_date, lang_code):
+def display_traffic_analysis(traffic_data, traffic_version, start_date, end_date, lang_code):
     st.subheader(translate_text("3D Traffic Accident Heatmap", lang_code))
     overlay_type = st.selectbox(
         translate_text("Select Map Overlay Type", lang_code),
         ["HexagonLayer", "ScatterplotLayer", "HeatmapLayer"],
         key='traffic_overlay_analysis'
     )
-    filtered_traffic_data = traffic_data[
-        (traffic_data['Date'] >= pd.Timestamp(start_date)) & 
-        (traffic_data['Date'] <= pd.Timestamp(end_date))
-    ]
-    traffic_3d_map = create_3d_map(filtered_traffic_data, 'Accidents', [0, 255, 0], overlay_type)
+    traffic_3d_map = render_cached(
+        'traffic_map', traffic_version, start_date, end_date, overlay_type, lang_code,
+        lambda: create_3d_map(traffic_data, traffic_version, 'Accidents', [0, 255, 0], overlay_type, start_date, end_date)
+    )
     st.pydeck_chart(traffic_3d_map)
 
     st.subheader(translate_text("Traffic Accidents Over Time", lang_code))
-    if filtered_traffic_data.empty:
+    trends = render_cached(
+        'traffic_trends', traffic_version, start_date, end_date, None, lang_code,
+        lambda: build_traffic_trends(traffic_data, start_date, end_date, lang_code)
+    )
+    if trends is None:
         st.warning(translate_text("No traffic data available for the selected date range.", lang_code))
     else:
-        fig = px.line(
-            filtered_traffic_data, 
-            x='Date', 
-            y='Accidents', 
-            title=translate_text('Traffic Accidents Over Time', lang_code),
-            template='plotly_dark'
-        )
-        st.plotly_chart(fig)
+        st.plotly_chart(trends['history_figure'])
         
         st.subheader(translate_text("Predicted Traffic Accident Trend (Next 30 Days)", lang_code))
-        future_trend = predict_future_trend(filtered_traffic_data.set_index('Date')['Accidents'])
-        future_dates = pd.date_range(start=filtered_traffic_data['Date'].max() + pd.Timedelta(days=1), periods=30)
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(x=filtered_traffic_data['Date'], y=filtered_traffic_data['Accidents'], name=translate_text('Historical', lang_code)))
-        fig.add_trace(go.Scatter(x=future_dates, y=future_trend, name=translate_text('Predicted', lang_code)))
-        fig.update_layout(template='plotly_dark')
-        st.plotly_chart(fig)
+        st.plotly_chart(trends['trend_figure'])
         
-        st.markdown(
-            get_table_download_link(
-                filtered_traffic_data, 
-                "traffic_data.csv", 
-                translate_text("Download Traffic Data as CSV", lang_code)
-            ), 
-            unsafe_allow_html=True
-        )
+        st.markdown(trends['download_link'], unsafe_allow_html=True)
 
-def display_social_media_analysis(social_media_data, start_date, end_date, lang_code):
+def display_social_media_analysis(social_media_data, police_data, versions, start_date, end_date, lang_code):
     st.subheader(translate_text("Social Media Sentiment Analysis", lang_code))
     filtered_social_media_data = social_media_data[
         (social_media_data['date'] >= pd.Timestamp(start_date)) &
@@ -589,6 +840,27 @@ def display_social_media_analysis(social_media_data, start_date, end_date, lang_
         st.text(f"{post['date'].date()}: {post['content']}")
         st.write("---")
     
+    st.subheader(translate_text("Posts Near Recent Incidents", lang_code))
+    tolerance_days = st.slider(
+        translate_text("Days between post and incident", lang_code),
+        1, 60, 7,
+        key="post_incident_tolerance"
+    )
+    matches = get_post_incident_matches(
+        f"{versions['police']}:{versions['social_media']}",
+        tolerance_days,
+        police_data,
+        social_media_data
+    )
+    matches = matches[
+        (matches['post_date'] >= pd.Timestamp(start_date)) &
+        (matches['post_date'] <= pd.Timestamp(end_date))
+    ]
+    if matches.empty:
+        st.info(translate_text("No posts mention an incident address within the selected window.", lang_code))
+    else:
+        st.dataframe(matches, use_container_width=True)
+    
     st.markdown(
         get_table_download_link(
             filtered_social_media_data, 
@@ -743,22 +1015,48 @@ def display_community_forum(lang_code):
     else:
         st.info(translate_text("No posts yet. Be the first to share!", lang_code))
 
-def display_gemini_chat(lang_code):
+def display_gemini_chat(police_data, social_media_data, versions, lang_code):
     st.subheader(translate_text("Gemini Chat", lang_code))
     
     model, vectorstore = setup_gemini_chat()
+    query_router = get_query_router(
+        f"{versions['police']}:{versions['social_media']}",
+        police_data,
+        social_media_data
+    )
     
     if 'conversation_history' not in st.session_state:
         st.session_state.conversation_history = []
+    if 'chat_context' not in st.session_state:
+        st.session_state.chat_context = ConversationContext()
     
     user_question = st.text_input(translate_text("Ask a question about Coral Gables:", lang_code), key="gemini_chat_input")
     if st.button(translate_text("Submit", lang_code), key="gemini_chat_submit"):
         if user_question:
-            conversation_history = "\n".join([f"Human: {q}\nAI: {a}" for q, a in st.session_state.conversation_history])
-            answer = gemini_chat(model, vectorstore, user_question, conversation_history)
-            st.write(f"{translate_text('Answer:', lang_code)} {answer}")
+            st.write(translate_text('Answer:', lang_code))
+            # Aggregate questions ("how many thefts in 33146 last month") are answered
+            # exactly from the data; everything else goes to the cache, then the LLM
+            routed = query_router.route(user_question)
+            response_cache = get_response_cache()
+            data_version = get_chat_data_version(model)
+            # The prompt only carries a bounded rolling context, not the whole session
+            context = st.session_state.chat_context.render()
+            # The cache is shared by all sessions, so only answers that do not depend on this
+            # conversation ("what about last week?") are looked up or stored
+            cacheable = not context
+            answer = routed['answer'] if routed else (
+                response_cache.lookup(user_question, data_version) if cacheable else None
+            )
+            if answer is None:
+                answer = st.write_stream(gemini_chat_stream(model, vectorstore, user_question, context))
+                if cacheable and not answer.endswith(CHAT_ERROR_ANSWER):
+                    response_cache.store(user_question, answer, data_version)
+            else:
+                st.write(answer)
             
+            st.session_state.chat_context.add_turn(user_question, answer)
             st.session_state.conversation_history.append((user_question, answer))
+            st.session_state.conversation_history = st.session_state.conversation_history[-CHAT_HISTORY_DISPLAY_TURNS:]
         else:
             st.warning(translate_text("Please enter a question.", lang_code))
     
@@ -773,7 +1071,16 @@ def display_gemini_chat(lang_code):
     
     if st.button(translate_text("Clear Conversation History", lang_code), key="clear_gemini_history"):
         st.session_state.conversation_history = []
+        st.session_state.chat_context.clear()
         st.success(translate_text("Conversation history cleared!", lang_code))
+    
+    with st.expander(translate_text("Response Cache", lang_code)):
+        cache_stats = get_response_cache().get_stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric(translate_text("Exact Hits", lang_code), cache_stats['exact_hits'])
+        col2.metric(translate_text("Similar Hits", lang_code), cache_stats['semantic_hits'])
+        col3.metric(translate_text("Misses", lang_code), cache_stats['misses'])
+        col4.metric(translate_text("Hit Rate", lang_code), f"{cache_stats['hit_rate']:.0%}")
 
 def display_historical_comparison(police_data, traffic_data, real_estate_data, lang_code):
     st.subheader(translate_text("Compare Historical Data", lang_code))
@@ -876,10 +1183,17 @@ def main():
     )
 
     # Load data
-    police_data = load_police_data()
-    social_media_data = load_social_media_data()
-    traffic_data = generate_traffic_data()
-    real_estate_data = generate_real_estate_data()
+    # Each loader hashes its frame once; reruns reuse the cached version strings as cache keys
+    police_data, police_version = load_police_data()
+    social_media_data, social_media_version = load_social_media_data()
+    traffic_data, traffic_version = generate_traffic_data()
+    real_estate_data, real_estate_version = generate_real_estate_data()
+    versions = {
+        'police': police_version,
+        'social_media': social_media_version,
+        'traffic': traffic_version,
+        'real_estate': real_estate_version,
+    }
 
     # Date range selection
     start_date, end_date = st.sidebar.date_input(
@@ -889,13 +1203,13 @@ def main():
 
     # Page content
     if page == "Home":
-        display_home_page(police_data, traffic_data, real_estate_data, social_media_data, lang_code)
+        display_home_page(police_data, traffic_data, real_estate_data, social_media_data, versions, lang_code)
     elif page == "Crime Analysis":
-        display_crime_analysis(police_data, start_date, end_date, lang_code)
+        display_crime_analysis(police_data, police_version, start_date, end_date, lang_code)
     elif page == "Traffic Analysis":
-        display_traffic_analysis(traffic_data, start_date, end_date, lang_code)
+        display_traffic_analysis(traffic_data, traffic_version, start_date, end_date, lang_code)
     elif page == "Social Media Analysis":
-        display_social_media_analysis(social_media_data, start_date, end_date, lang_code)
+        display_social_media_analysis(social_media_data, police_data, versions, start_date, end_date, lang_code)
     elif page == "Real Estate Trends":
         display_real_estate_trends(real_estate_data, start_date, end_date, lang_code)
     elif page == "Weather":
@@ -903,7 +1217,7 @@ def main():
     elif page == "Community Forum":
         display_community_forum(lang_code)
     elif page == "Gemini Chat":
-        display_gemini_chat(lang_code)
+        display_gemini_chat(police_data, social_media_data, versions, lang_code)
     elif page == "Historical Comparison":
         display_historical_comparison(police_data, traffic_data, real_estate_data, lang_code)
     elif page == "Custom Alerts":
@@ -0,0 +1,40 @@
+"""
+Compact Map Payloads
+Trims point data to the columns a pydeck layer actually draws before it is serialised
+"""
+
+from typing import Sequence
+
+import pandas as pd
+
+# 5 decimal places is about 1.1 m, well below what a city-scale map can show
+COORDINATE_DECIMALS = 5
+
+
+def compact_points(df: pd.DataFrame, lat_col: str = 'lat', lon_col: str = 'lon',
+                   columns: Sequence[str] = (), decimals: int = COORDINATE_DECIMALS) -> pd.DataFrame:
+    """
+    Minimal columnar frame for a pydeck layer
+
+    pydeck serialises a layer's data row by row to JSON, so every column of
+    the source frame (incident text, addresses, ...) is shipped to the
+    browser and every coordinate is printed with 17 significant digits.
+    This keeps only 'lon', 'lat' and the requested columns, drops rows
+    without coordinates and rounds the coordinates so each prints in a
+    few characters. Constant styling such as colours belongs in the layer
+    accessor (get_color=[r, g, b]), not in a per-row column.
+
+    Args:
+        df: Source frame
+        lat_col, lon_col: Coordinate columns in the source frame
+        columns: Extra columns the layer reads (weights, tooltip fields)
+        decimals: Coordinate precision
+
+    Returns:
+        DataFrame with 'lon', 'lat' and the extra columns
+    """
+    extra = [c for c in columns if c not in (lat_col, lon_col)]
+    points = df[[lon_col, lat_col] + extra].rename(columns={lon_col: 'lon', lat_col: 'lat'})
+    points['lon'] = pd.to_numeric(points['lon'], errors='coerce').round(decimals)
+    points['lat'] = pd.to_numeric(points['lat'], errors='coerce').round(decimals)
+    return points.dropna(subset=['lon', 'lat']).reset_index(drop=True)
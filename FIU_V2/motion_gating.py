@@ -0,0 +1,210 @@
+"""
+Motion Gating and Regions of Interest
+Skips detection on frames where nothing moves and runs the detector only on cropped road areas
+"""
+
+import logging
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from vehicle_tracker import iou_matrix
+
+logger = logging.getLogger(__name__)
+
+# Region of interest as [x1, y1, x2, y2] fractions of the frame size
+Roi = Tuple[float, float, float, float]
+FULL_FRAME: Roi = (0.0, 0.0, 1.0, 1.0)
+GATING_METHODS = ('off', 'diff', 'mog2')
+
+
+def parse_rois(spec: str) -> List[Roi]:
+    """
+    Parse 'x1,y1,x2,y2;x1,y1,x2,y2' (fractions of the frame) into regions
+
+    An empty spec means the whole frame.
+    """
+    rois = []
+    for part in (spec or '').split(';'):
+        if not part.strip():
+            continue
+        values = [float(v) for v in part.split(',')]
+        if len(values) != 4:
+            raise ValueError(f"Region of interest '{part}' must have four values x1,y1,x2,y2")
+        x1, y1, x2, y2 = np.clip(values, 0.0, 1.0)
+        if x2 <= x1 or y2 <= y1:
+            raise ValueError(f"Region of interest '{part}' is empty")
+        rois.append((float(x1), float(y1), float(x2), float(y2)))
+    return rois or [FULL_FRAME]
+
+
+def roi_pixels(roi: Roi, width: int, height: int) -> Tuple[int, int, int, int]:
+    """Integer pixel bounds of a fractional region"""
+    x1, y1, x2, y2 = roi
+    return int(x1 * width), int(y1 * height), max(int(np.ceil(x2 * width)), 1), max(int(np.ceil(y2 * height)), 1)
+
+
+class MotionGate:
+    """
+    Cheap test of whether anything moved inside the regions of interest
+
+    Frames are shrunk to a thumbnail of the given width, converted to
+    grey and blurred, so a check costs well under a millisecond. 'diff'
+    compares each checked frame with the previous one; 'mog2' keeps an
+    adaptive background model, which ignores swaying trees and gradual
+    light changes better at a slightly higher cost. Motion is the share
+    of changed pixels inside the regions of interest, so clouds and
+    building facades never trigger detection.
+
+    Every heartbeat-th check passes regardless, so tracks of vehicles
+    that stopped at a light are still confirmed by the detector.
+
+    Args:
+        method: 'diff', 'mog2' or 'off' (every frame passes)
+        rois: Regions watched for motion; defaults to the whole frame
+        threshold: Fraction of region pixels that must change
+        pixel_threshold: Grey-level difference that counts as a change ('diff' only)
+        width: Thumbnail width used for the test
+        heartbeat: Pass at least one in this many checks (0 disables)
+    """
+
+    def __init__(self, method: str = 'diff', rois: Optional[Sequence[Roi]] = None, threshold: float = 0.003,
+                 pixel_threshold: int = 25, width: int = 160, heartbeat: int = 30):
+        if method not in GATING_METHODS:
+            raise ValueError(f"Unknown motion gating method '{method}', expected one of {', '.join(GATING_METHODS)}")
+        self.method = method
+        self.rois = list(rois or [FULL_FRAME])
+        self.threshold = threshold
+        self.pixel_threshold = pixel_threshold
+        self.width = width
+        self.heartbeat = heartbeat
+        self.checked = 0
+        self.gated = 0
+        self.last_motion = 0.0
+        self._previous: Optional[np.ndarray] = None
+        self._mask: Optional[np.ndarray] = None
+        self._since_pass = 0
+        self._subtractor = None
+
+    def _thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        import cv2
+
+        h, w = frame.shape[:2]
+        size = (self.width, max(int(round(h * self.width / w)), 1))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def _roi_mask(self, shape: Tuple[int, int]) -> np.ndarray:
+        if self._mask is None or self._mask.shape != shape:
+            mask = np.zeros(shape, dtype=bool)
+            for roi in self.rois:
+                x1, y1, x2, y2 = roi_pixels(roi, shape[1], shape[0])
+                mask[y1:y2, x1:x2] = True
+            self._mask = mask
+        return self._mask
+
+    def motion(self, frame: np.ndarray) -> float:
+        """Fraction of region-of-interest pixels that changed since the previous check"""
+        import cv2
+
+        small = self._thumbnail(frame)
+        if self.method == 'mog2':
+            if self._subtractor is None:
+                self._subtractor = cv2.createBackgroundSubtractorMOG2(history=200, varThreshold=25, detectShadows=False)
+            changed = self._subtractor.apply(small) > 0
+        else:
+            previous, self._previous = self._previous, small
+            if previous is None or previous.shape != small.shape:
+                return 1.0
+            changed = cv2.absdiff(small, previous) > self.pixel_threshold
+        mask = self._roi_mask(small.shape)
+        return float(np.count_nonzero(changed & mask)) / max(np.count_nonzero(mask), 1)
+
+    def check(self, frame: np.ndarray) -> bool:
+        """True if the frame should go to the detector"""
+        self.checked += 1
+        if self.method == 'off':
+            return True
+        self.last_motion = self.motion(frame)
+        self._since_pass += 1
+        if self.last_motion >= self.threshold or (self.heartbeat and self._since_pass >= self.heartbeat):
+            self._since_pass = 0
+            return True
+        self.gated += 1
+        return False
+
+    def reset(self):
+        self._previous = None
+        self._subtractor = None
+        self._since_pass = 0
+        self.checked = self.gated = 0
+
+    @property
+    def gated_fraction(self) -> float:
+        return self.gated / self.checked if self.checked else 0.0
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, classes: np.ndarray, iou_threshold: float = 0.5) -> np.ndarray:
+    """Indices kept by class-aware non-maximum suppression, highest score first"""
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=int)
+    order = np.argsort(-scores, kind='stable')
+    overlaps = iou_matrix(boxes[order], boxes[order])
+    overlaps[classes[order][:, None] != classes[order][None, :]] = 0.0
+    suppressed = np.zeros(len(order), dtype=bool)
+    for i in range(len(order)):
+        if not suppressed[i]:
+            suppressed[i + 1:] |= overlaps[i, i + 1:] > iou_threshold
+    return order[~suppressed]
+
+
+class RoiDetector:
+    """
+    Runs a batched detector on region-of-interest crops instead of whole frames
+
+    The regions of every frame in a call are cropped and sent through the
+    detector together, so several cameras and several regions still cost
+    one batched inference. Crops are letterboxed to the network size like
+    full frames, which leaves small distant vehicles larger than they
+    would be in a downscaled full frame. Boxes are shifted back to frame
+    coordinates; where regions overlap, duplicates are removed with NMS.
+
+    Args:
+        detect_fn: Batched detector, detect_fn(images, classes) -> (boxes, scores, classes) per image
+        rois: Regions to analyse; the whole frame if omitted
+    """
+
+    def __init__(self, detect_fn: Callable, rois: Optional[Sequence[Roi]] = None):
+        self.detect_fn = detect_fn
+        self.rois = list(rois or [FULL_FRAME])
+
+    def detect(self, frames: Sequence[np.ndarray], classes: Optional[Sequence[int]] = None):
+        if self.rois == [FULL_FRAME]:
+            return self.detect_fn(frames, classes)
+
+        crops, owners, offsets = [], [], []
+        for i, frame in enumerate(frames):
+            h, w = frame.shape[:2]
+            for roi in self.rois:
+                x1, y1, x2, y2 = roi_pixels(roi, w, h)
+                crops.append(frame[y1:y2, x1:x2])
+                owners.append(i)
+                offsets.append((x1, y1, x1, y1))
+        results = self.detect_fn(crops, classes) if crops else []
+
+        per_frame = [([], [], []) for _ in frames]
+        for owner, offset, (boxes, scores, labels) in zip(owners, offsets, results):
+            per_frame[owner][0].append(np.asarray(boxes, dtype=float).reshape(-1, 4) + offset)
+            per_frame[owner][1].append(np.asarray(scores, dtype=float).reshape(-1))
+            per_frame[owner][2].append(np.asarray(labels, dtype=int).reshape(-1))
+
+        detections = []
+        for boxes, scores, labels in per_frame:
+            boxes, scores, labels = np.concatenate(boxes), np.concatenate(scores), np.concatenate(labels)
+            if len(self.rois) > 1:
+                keep = nms(boxes, scores, labels)
+                boxes, scores, labels = boxes[keep], scores[keep], labels[keep]
+            detections.append((boxes, scores, labels))
+        return detections
@@ -0,0 +1,228 @@
+"""
+Multi-Camera Detection Scheduler
+Reads many camera streams concurrently and runs their latest frames through one batched detector call
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# detect_fn(frames) -> one result per frame, e.g. Detector.detect from detector_backends
+DetectFn = Callable[[List[np.ndarray]], Sequence[Any]]
+# on_result(camera_name, frame, result) -> None, called on the scheduler thread;
+# result is None when the camera's motion gate skipped detection for that frame
+ResultFn = Callable[[str, np.ndarray, Any], None]
+
+
+class CameraReader:
+    """
+    Background reader that keeps only the newest frame of one stream
+
+    Decoding runs continuously so the stream's buffer never backs up;
+    the scheduler samples whatever frame is newest when the camera is due.
+    """
+
+    def __init__(self, name: str, open_source: Callable[[], Any]):
+        self.name = name
+        self.open_source = open_source
+        self.frame: Optional[np.ndarray] = None
+        self.frame_time = 0.0
+        self.sequence = 0
+        self.read_failures = 0
+        self.source = None
+        self.error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f'camera-{self.name}', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        source = None
+        try:
+            source = self.source = self.open_source()
+            while not self._stop.is_set():
+                ok, frame = source.read()
+                if not ok:
+                    self.read_failures += 1
+                    time.sleep(0.05)
+                    continue
+                with self._lock:
+                    self.frame = frame
+                    self.frame_time = time.perf_counter()
+                    self.sequence += 1
+        except Exception as e:
+            logger.error(f"Camera {self.name} stopped: {e}")
+            self.error = e
+        finally:
+            if source is not None:
+                source.release()
+
+    def latest(self):
+        """(sequence, frame, capture time) of the newest frame"""
+        with self._lock:
+            return self.sequence, self.frame, self.frame_time
+
+
+class MultiCameraScheduler:
+    """
+    Shares one detector between many cameras with per-camera frame-rate targets
+
+    Each camera is due every 1/target_fps seconds. On every cycle the
+    scheduler takes the due cameras that have a new frame, most overdue
+    first, up to max_batch of them, and runs their frames through a
+    single detector call; batching amortises the per-call overhead and
+    keeps the CPU's vector units busy. Ordering by lateness gives every
+    camera its turn even when the detector cannot keep up with all
+    targets, in which case rates degrade evenly instead of starving the
+    cameras at the end of the list. A camera's next due time never falls
+    behind the present, so a slow cycle does not cause a burst of catch-up.
+
+    A camera with a motion gate is only sent to the detector when its
+    frame shows movement; a quiet camera's turn costs one thumbnail
+    comparison and its frame is handed to on_result with no result.
+
+    Args:
+        sources: Camera name -> callable opening the stream (read()/release())
+        detect_fn: Batched detector, one result per input frame
+        on_result: Receives each camera's frame and detection result
+        target_fps: Detection rate per camera, a single value or per-camera dict
+        max_batch: Largest number of frames per detector call
+        gates: Optional camera name -> MotionGate
+    """
+
+    def __init__(self, sources: Dict[str, Callable[[], Any]], detect_fn: DetectFn, on_result: ResultFn,
+                 target_fps=5.0, max_batch: int = 8, gates: Optional[Dict[str, Any]] = None):
+        self.readers = {name: CameraReader(name, open_source) for name, open_source in sources.items()}
+        self.detect_fn = detect_fn
+        self.on_result = on_result
+        self.max_batch = max_batch
+        self.gates = gates or {}
+        self.periods = {
+            name: 1.0 / (target_fps.get(name, 5.0) if isinstance(target_fps, dict) else target_fps)
+            for name in self.readers
+        }
+        self.error: Optional[BaseException] = None
+        self._next_due = {name: 0.0 for name in self.readers}
+        self._last_sequence = {name: 0 for name in self.readers}
+        self._stats = {name: {'processed': 0, 'skipped': 0, 'gated': 0, 'lag': 0.0, 'started': 0.0} for name in self.readers}
+        self._batches = {'count': 0, 'frames': 0, 'seconds': 0.0}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'MultiCameraScheduler':
+        now = time.perf_counter()
+        for name, reader in self.readers.items():
+            self._stats[name]['started'] = now
+            reader.start()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='camera-scheduler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        for reader in self.readers.values():
+            reader.stop(timeout)
+
+    def _due_cameras(self, now: float) -> List[str]:
+        due = []
+        for name, reader in self.readers.items():
+            sequence, frame, _ = reader.latest()
+            if frame is not None and sequence > self._last_sequence[name] and now >= self._next_due[name]:
+                due.append(name)
+        # Most overdue first, so every camera gets served when the detector is saturated
+        due.sort(key=lambda name: self._next_due[name])
+        return due[:self.max_batch]
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                now = time.perf_counter()
+                batch = self._due_cameras(now)
+                if not batch:
+                    wait = min(self._next_due.values()) - now
+                    self._stop.wait(min(max(wait, 0.005), 0.05))
+                    continue
+
+                names, frames, captured = [], [], []
+                for name in batch:
+                    sequence, frame, frame_time = self.readers[name].latest()
+                    with self._lock:
+                        self._stats[name]['skipped'] += max(sequence - self._last_sequence[name] - 1, 0)
+                    self._last_sequence[name] = sequence
+                    gate = self.gates.get(name)
+                    if gate is not None and not gate.check(frame):
+                        # Nothing moved: skip inference and come back at the camera's next slot
+                        self.on_result(name, frame, None)
+                        self._next_due[name] = max(self._next_due[name] + self.periods[name], now)
+                        with self._lock:
+                            self._stats[name]['gated'] += 1
+                        continue
+                    names.append(name)
+                    frames.append(frame)
+                    captured.append(frame_time)
+
+                if not frames:
+                    continue
+                started = time.perf_counter()
+                results = self.detect_fn(frames)
+                finished = time.perf_counter()
+
+                for name, frame, frame_time, result in zip(names, frames, captured, results):
+                    self.on_result(name, frame, result)
+                    self._next_due[name] = max(self._next_due[name] + self.periods[name], finished)
+                    with self._lock:
+                        stats = self._stats[name]
+                        stats['processed'] += 1
+                        stats['lag'] = finished - frame_time
+                with self._lock:
+                    self._batches['count'] += 1
+                    self._batches['frames'] += len(frames)
+                    self._batches['seconds'] += finished - started
+        except Exception as e:
+            logger.error(f"Camera scheduler failed: {e}")
+            self.error = e
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-camera achieved rate, skipped and gated frames and lag, plus batch sizes and detector time"""
+        now = time.perf_counter()
+        with self._lock:
+            cameras = {}
+            for name, stats in self._stats.items():
+                reader = self.readers[name]
+                elapsed = max(now - stats['started'], 1e-9)
+                cameras[name] = {
+                    'target_fps': 1.0 / self.periods[name],
+                    'fps': stats['processed'] / elapsed,
+                    'skipped': stats['skipped'],
+                    'gated': stats['gated'],
+                    'lag_ms': stats['lag'] * 1000,
+                    'read_failures': reader.read_failures,
+                    'stream': reader.source.stats() if hasattr(reader.source, 'stats') else {},
+                    'error': str(reader.error) if reader.error else '',
+                }
+            batches = dict(self._batches)
+        count = batches['count']
+        return {
+            'cameras': cameras,
+            'batches': count,
+            'mean_batch_size': batches['frames'] / count if count else 0.0,
+            'mean_batch_ms': batches['seconds'] / count * 1000 if count else 0.0,
+        }
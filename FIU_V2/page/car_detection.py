@@ -1,16 +1,104 @@
-import cv2
+import sys
+import time
+import uuid
 import streamlit as st
-from ultralytics import YOLO
 from pathlib import Path
 
-# Load YOLOv8 model
-model = YOLO('yolov8n.pt')  # Use a smaller model for faster inference
+# Shared modules live in the app root, one level above this page
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from adaptive_inference import AdaptiveController
+from config import config
+from count_store import CountStore
+from counting_zones import ZoneCounter, parse_zones
+from detector_backends import BACKENDS, load_detector
+from frame_annotation import draw_overlay
+from frame_delivery import DELIVERY_MODES, AdaptiveJpegEncoder, FrameThrottle, MjpegServer, downscale
+from motion_gating import GATING_METHODS, MotionGate, RoiDetector, parse_rois
+from multi_camera import MultiCameraScheduler
+from stream_reader import ResilientStream
+from vehicle_tracker import VehicleTracker
+from video_pipeline import VideoPipeline
+from video_replay import ReplaySource
 
 # Set up Streamlit interface
 st.title("Live Vehicle and People Detection from Online Video Stream")
 
-start_button = st.button("Start Live Feed")
-stop_button = st.button("Stop Live Feed")
+# Recorded counts come from the headless detection worker; the live modes run detection in this session
+camera_streams = config.get_camera_streams()
+modes = ["Recorded counts", "Single stream"] + (["All cameras"] if len(camera_streams) > 1 else [])
+mode = st.sidebar.radio("Mode", modes)
+live = mode != "Recorded counts"
+
+# Road regions analysed by the detector and outlined on the frames
+rois = parse_rois(config.DETECTION_ROIS)
+# Lines and polygons counted per direction and class
+zones = parse_zones(config.COUNTING_ZONES)
+
+if live:
+    backend = st.sidebar.selectbox(
+        "Inference backend", BACKENDS,
+        index=BACKENDS.index(config.DETECTION_BACKEND) if config.DETECTION_BACKEND in BACKENDS else 0,
+        help="ONNX Runtime and OpenVINO run the exported model on CPU; -int8 variants are quantized."
+    )
+
+    gating = st.sidebar.selectbox(
+        "Motion gating", GATING_METHODS,
+        index=GATING_METHODS.index(config.MOTION_GATING) if config.MOTION_GATING in GATING_METHODS else 0,
+        help="Skip the detector while nothing moves in the road regions (frame differencing or MOG2)."
+    )
+
+    adaptive = st.sidebar.checkbox(
+        "Adapt to load", config.ADAPTIVE_INFERENCE,
+        help="Lower the detector's input size, then run it less often, whenever frames fall behind the target rate."
+    )
+    if adaptive:
+        target_fps = st.sidebar.slider("Target FPS", 5, 30, int(config.INFERENCE_TARGET_FPS))
+        detect_interval = 1
+    else:
+        detect_interval = st.sidebar.slider(
+            "Run detector every N frames", 1, 10, 3,
+            help="Tracks are predicted between detector runs; higher values trade accuracy for speed."
+        )
+
+    # A recorded clip can stand in for the live stream, e.g. for profiling
+    replay_path = st.sidebar.text_input("Replay video file", config.REPLAY_VIDEO_PATH,
+                                        help="Local video played instead of the live stream (single stream mode)")
+    replay_speed = st.sidebar.select_slider("Replay speed", [0.5, 1.0, 2.0, 4.0], value=1.0) if replay_path else 1.0
+
+    delivery = st.sidebar.selectbox(
+        "Frame delivery", DELIVERY_MODES,
+        index=DELIVERY_MODES.index(config.FRAME_DELIVERY) if config.FRAME_DELIVERY in DELIVERY_MODES else 0,
+        help="streamlit: downscaled JPEG frames at a capped rate; mjpeg: a local MJPEG endpoint outside the websocket."
+    )
+
+    start_button = st.button("Start Live Feed")
+    stop_button = st.button("Stop Live Feed")
+else:
+    start_button = stop_button = False
+
+@st.cache_resource(show_spinner=False)
+def get_detector(backend, weights, imgsz, model_dir, calibration_dir):
+    # Loaded and warmed up once per process, then shared by every session and rerun;
+    # ultralytics is only imported here, when detection is first started
+    detector = load_detector(backend, weights, imgsz, model_dir, calibration_dir)
+    detector.warmup()
+    return detector
+
+def get_roi_detector(controller=None):
+    # YOLOv8n keeps inference fast; exported models are cached on disk
+    with st.spinner(f"Loading {backend} detector..."):
+        detector = get_detector(
+            backend, config.DETECTION_MODEL, config.DETECTION_IMGSZ,
+            config.DETECTION_MODEL_DIR, config.DETECTION_CALIBRATION_DIR
+        )
+    # Only the configured road regions are cropped and sent to the detector
+    if controller is None:
+        return RoiDetector(detector.detect, rois)
+    # The shared detector keeps its size; this session's calls use the controller's current one
+    return RoiDetector(lambda images, classes: detector.detect(images, classes, imgsz=controller.imgsz), rois)
+
+def make_gate():
+    return MotionGate(gating, rois, threshold=config.MOTION_THRESHOLD, heartbeat=config.MOTION_HEARTBEAT)
 
 # Initialize session state variables
 if "running" not in st.session_state:
@@ -19,95 +107,299 @@ if "car_count" not in st.session_state:
     st.session_state.car_count = 0
 if "person_count" not in st.session_state:
     st.session_state.person_count = 0
-if "previous_centroids" not in st.session_state:
-    st.session_state.previous_centroids = {}
+if "tracker" not in st.session_state:
+    st.session_state.tracker = VehicleTracker()
+if "zone_counter" not in st.session_state:
+    st.session_state.zone_counter = ZoneCounter(zones)
 
 if start_button:
     st.session_state.running = True
 if stop_button:
     st.session_state.running = False
 
-# Define the URL for the .m3u8 video stream
-stream_url = "https://165-d6.divas.cloud/CHAN-3733/CHAN-3733_1.stream/playlist.m3u8?207.104.43.103&vdswztokenhash=461LVNdYHfTNh83qZQ48fJzya9ED8ORLMpGwvS2ierc="
+# Define the URL for the .m3u8 video stream (the configured main camera, else the public demo stream)
+stream_url = config.MAIN_CAMERA_STREAM_URL or "https://165-d6.divas.cloud/CHAN-3733/CHAN-3733_1.stream/playlist.m3u8?207.104.43.103&vdswztokenhash=461LVNdYHfTNh83qZQ48fJzya9ED8ORLMpGwvS2ierc="
 
-# Placeholder for video frames
+# Placeholders for stream health, video frames and pipeline timings
+status_placeholder = st.empty()
 frame_placeholder = st.empty()
+stats_placeholder = st.empty()
 
-def process_live_feed():
-    cap = cv2.VideoCapture(stream_url)
+@st.cache_resource(show_spinner=False)
+def get_mjpeg_server(port):
+    # One server per process, shared by every session
+    return MjpegServer('127.0.0.1', port).start()
 
-    if not cap.isOpened():
-        st.error("Error: Could not open video stream.")
-        return
+def show_mjpeg(placeholder, server, name):
+    placeholder.markdown(f'<img src="{server.url(name, "localhost")}" style="width:100%">', unsafe_allow_html=True)
+
+def open_stream():
+    if replay_path:
+        return ReplaySource(replay_path, speed=replay_speed, loop=True)
+    # Reconnects on its own after stalls and fails over to the backup camera
+    return ResilientStream([stream_url, config.BACKUP_CAMERA_STREAM_URL],
+                           stall_timeout=config.STREAM_STALL_TIMEOUT, max_delay=config.STREAM_MAX_BACKOFF)
 
-    while st.session_state.running:
-        ret, frame = cap.read()
-        if not ret:
-            st.warning("No frame captured. Retrying...")
-            continue  # Try to read the next frame
+def stream_health(stream):
+    # One line of stream health, e.g. for a caption; empty for sources that do not report it
+    if not stream:
+        return ""
+    source = "main" if stream['active'] == 0 else "backup"
+    age = f"{stream['frame_age_s']:.1f}s" if stream['frame_age_s'] is not None else "n/a"
+    return (f"Stream {stream['state']} ({source}) · Up {stream['uptime_s']:.0f}s, "
+            f"{stream['availability']:.0%} available · Reconnects: {stream['reconnects']} · Last frame {age} ago")
 
-        # Perform inference on the frame
-        results = model(frame)
+def show_stream_status(stream):
+    # A single status line that is replaced in place, rather than a new warning for every failed read
+    if stream and stream['state'] != 'connected':
+        status_placeholder.warning(f"{stream_health(stream)} · {stream['last_error']}")
+    else:
+        status_placeholder.empty()
 
-        # Process detections
-        detections = results[0].boxes.data.cpu().numpy()
-        classes = results[0].boxes.cls.cpu().numpy()
-        confidences = results[0].boxes.conf.cpu().numpy()
+def count_and_annotate(frame, tracks, tracker, counter, encoder, max_width):
+    # Count each confirmed track once per line it crosses, and as it enters or leaves each polygon;
+    # the car and person totals count each track once however many lines it crosses
+    counter.update(tracker.confirmed_tracks(), frame.shape[1], frame.shape[0])
+    totals = counter.totals()
+    car_count, person_count = totals.get(2, 0), totals.get(0, 0)
 
-        # Draw trip line
-        trip_line_y = int(frame.shape[0] * 0.5)
-        cv2.line(frame, (0, trip_line_y), (frame.shape[1], trip_line_y), (0, 0, 255), 2)
+    draw_overlay(frame, tracks, zones, car_count, person_count, rois)
 
-        current_centroids = {}
+    # Ship a display-sized JPEG rather than the full-resolution raw frame
+    return encoder.encode(downscale(frame, max_width)), car_count, person_count
 
-        for i, det in enumerate(detections):
-            x_min, y_min, x_max, y_max, score, _ = det
-            class_id = int(classes[i])
-            confidence = confidences[i]
+def make_frame_processor(roi_detector, gate, encoder, controller=None):
+    # Runs on the inference thread; Streamlit state is only touched by the render loop
+    tracker = st.session_state.tracker
+    tracker.reset()
+    # Counts carry over between runs of the session; track positions do not, as ids restart
+    counter = st.session_state.zone_counter
+    counter.forget_tracks()
 
-            if class_id in [0, 2]:  # 0: person, 2: car
-                class_name = 'person' if class_id == 0 else 'car'
-                color = (255, 0, 0) if class_name == 'person' else (0, 255, 0)
-                label = f"{class_name} {confidence:.2f}"
+    def process_frame(frame, frame_index):
+        started = time.perf_counter()
+        detect_seconds, detected = 0.0, False
+        # Run the detector every N frames (chosen by the controller when adapting); the tracker carries boxes in between
+        due = controller.should_detect() if controller is not None else frame_index % detect_interval == 0
+        if due:
+            if gate.check(frame):
+                detect_started = time.perf_counter()
+                boxes, scores, classes = roi_detector.detect([frame], classes=[0, 2])[0]  # 0: person, 2: car
+                detect_seconds, detected = time.perf_counter() - detect_started, True
+                tracks = tracker.update(boxes, scores, classes)
+            else:
+                # Nothing moved in the road regions: skip the detector but keep the Kalman state in step
+                tracks = tracker.predict()
+        else:
+            tracks = tracker.predict()
 
-                x_min, y_min, x_max, y_max = map(int, [x_min, y_min, x_max, y_max])
+        result = count_and_annotate(frame, tracks, tracker, counter, encoder, config.DISPLAY_WIDTH)
+        if controller is not None:
+            controller.record(time.perf_counter() - started, detect_seconds, detected)
+        return result
 
-                cv2.rectangle(frame, (x_min, y_min), (x_max, y_max), color, 2)
-                cv2.putText(frame, label, (x_min, y_min - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+    return process_frame
 
-                centroid = (int((x_min + x_max) / 2), int((y_min + y_max) / 2))
-                current_centroids[i] = (centroid, class_name)
+def zone_rows(counts, occupancy=None):
+    # One row per zone and direction with car and person counts
+    occupancy = occupancy or {}
+    rows = []
+    for zone, directions in counts.items():
+        for direction, by_class in directions.items():
+            rows.append({'Zone': zone, 'Direction': direction, 'Cars': by_class.get(2, 0), 'People': by_class.get(0, 0)})
+        if zone in occupancy:
+            rows.append({'Zone': zone, 'Direction': 'inside now',
+                         'Cars': occupancy[zone].get(2, 0), 'People': occupancy[zone].get(0, 0)})
+    return rows
 
-                # Check if the object crossed the trip line
-                prev_centroid = st.session_state.previous_centroids.get(i)
-                if prev_centroid:
-                    prev_y = prev_centroid[0][1]
-                    curr_y = centroid[1]
-                    if prev_y < trip_line_y <= curr_y:
-                        if class_name == 'car':
-                            st.session_state.car_count += 1
-                        elif class_name == 'person':
-                            st.session_state.person_count += 1
+def display_pipeline_stats(stats, gate, encoder, counter, controller=None):
+    rows = [
+        {'Stage': stage, 'Mean (ms)': round(t['mean_ms'], 1), 'p95 (ms)': round(t['p95_ms'], 1), 'FPS': round(t['fps'], 1)}
+        for stage, t in stats['stages'].items()
+    ]
+    with stats_placeholder.container():
+        st.caption(
+            f"Dropped frames: {stats['dropped_capture']} before inference, "
+            f"{stats['dropped_results']} before display · Read failures: {stats['read_failures']} · "
+            f"Motion gate skipped {gate.gated_fraction:.0%} of detector runs · "
+            f"JPEG quality {encoder.quality}, {encoder.last_size / 1024:.0f} KB per frame"
+        )
+        if stats['stream']:
+            st.caption(stream_health(stats['stream']))
+        if controller is not None:
+            adaptive = controller.stats()
+            st.caption(
+                f"Adaptive: {adaptive['imgsz']}px input, detector every {adaptive['interval']} frame(s) · "
+                f"Load {adaptive['load']:.0%} of the {controller.target_fps:.0f} FPS budget · "
+                f"Detector {adaptive['detect_ms']:.0f} ms, other work {adaptive['overhead_ms']:.0f} ms per frame"
+            )
+        st.table(rows)
+        st.table(zone_rows(counter.counts(), counter.occupancy()))
 
-        st.session_state.previous_centroids = current_centroids
+def process_live_feed():
+    # Capture and inference run on their own threads; this loop is the render stage
+    gate = make_gate()
+    encoder = AdaptiveJpegEncoder(config.JPEG_TARGET_KB)
+    throttle = FrameThrottle(config.DISPLAY_FPS)
+    server = get_mjpeg_server(config.MJPEG_PORT) if delivery == 'mjpeg' else None
+    stream_name = st.session_state.setdefault('stream_id', uuid.uuid4().hex[:8])
+    if server is not None:
+        show_mjpeg(frame_placeholder, server, stream_name)
+
+    controller = AdaptiveController(
+        target_fps, config.ADAPTIVE_MIN_IMGSZ, config.DETECTION_IMGSZ, max_interval=config.ADAPTIVE_MAX_INTERVAL
+    ) if adaptive else None
+    pipeline = VideoPipeline(
+        open_stream, make_frame_processor(get_roi_detector(controller), gate, encoder, controller)
+    ).start()
+    last_stats = time.perf_counter()
+    try:
+        while st.session_state.running:
+            packet = pipeline.get(timeout=1.0)
+            if packet is None:
+                if pipeline.error is not None:
+                    st.error(f"Error: {pipeline.error}")
+                    break
+                show_stream_status(pipeline.stats()['stream'])
+                continue
+
+            started = time.perf_counter()
+            jpeg, st.session_state.car_count, st.session_state.person_count = packet.result
+            # MJPEG viewers get every frame; through Streamlit updates are capped at DISPLAY_FPS
+            if server is not None:
+                server.publish(stream_name, jpeg)
+            elif throttle.ready():
+                frame_placeholder.image(jpeg, use_column_width=True)
+            pipeline.record_render(packet, time.perf_counter() - started)
+
+            if started - last_stats >= 1.0:
+                stats = pipeline.stats()
+                show_stream_status(stats['stream'])
+                display_pipeline_stats(stats, gate, encoder, st.session_state.zone_counter, controller)
+                last_stats = started
+    finally:
+        pipeline.stop()
+
+def open_camera(url):
+    # The main camera fails over to the backup stream; other cameras just reconnect
+    urls = [url, config.BACKUP_CAMERA_STREAM_URL if url == config.MAIN_CAMERA_STREAM_URL else '']
+    def open_source():
+        return ResilientStream(urls, stall_timeout=config.STREAM_STALL_TIMEOUT, max_delay=config.STREAM_MAX_BACKOFF)
+    return open_source
+
+def camera_row(name, s):
+    stream = s['stream']
+    # A reconnecting stream reports why, even though its reader thread has not failed
+    error = s['error'] or (stream['last_error'] if stream and stream['state'] != 'connected' else '')
+    return {
+        'Camera': name, 'Target FPS': round(s['target_fps'], 1), 'FPS': round(s['fps'], 1),
+        'Lag (ms)': round(s['lag_ms']), 'Skipped': s['skipped'], 'Gated': s['gated'],
+        'Stream': stream.get('state', ''), 'Reconnects': stream.get('reconnects', 0),
+        'Frame age (s)': round(stream['frame_age_s'], 1) if stream.get('frame_age_s') is not None else None,
+        'Error': error,
+    }
+
+def process_all_cameras():
+    # One reader thread per camera; their latest frames share batched detector calls
+    roi_detector = get_roi_detector()
+    cameras = {
+        name: {'tracker': VehicleTracker(), 'counter': ZoneCounter(zones), 'encoder': AdaptiveJpegEncoder(config.JPEG_TARGET_KB),
+               'frame': None, 'sequence': 0, 'cars': 0, 'people': 0}
+        for name in camera_streams
+    }
+    columns_count = min(len(cameras), 3)
+    tile_width = config.DISPLAY_WIDTH // columns_count
+    server = get_mjpeg_server(config.MJPEG_PORT) if delivery == 'mjpeg' else None
 
-        # Display counts
-        cv2.putText(frame, f"Cars: {st.session_state.car_count}", (10, 30),
-                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-        cv2.putText(frame, f"People: {st.session_state.person_count}", (10, 70),
-                    cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2)
+    def detect(frames):
+        return roi_detector.detect(frames, classes=[0, 2])  # 0: person, 2: car
+
+    def on_result(name, frame, result):
+        camera = cameras[name]
+        # No result means the motion gate found the camera still; the tracks still advance one frame
+        tracks = camera['tracker'].update(*result) if result is not None else camera['tracker'].predict()
+        camera['frame'], camera['cars'], camera['people'] = count_and_annotate(
+            frame, tracks, camera['tracker'], camera['counter'], camera['encoder'], tile_width
+        )
+        camera['sequence'] += 1
+        if server is not None:
+            server.publish(name, camera['frame'])
+
+    scheduler = MultiCameraScheduler(
+        {name: open_camera(url) for name, url in camera_streams.items()},
+        detect, on_result,
+        target_fps=config.CAMERA_TARGET_FPS,
+        max_batch=config.DETECTION_BATCH_SIZE,
+        gates={name: make_gate() for name in camera_streams},
+    ).start()
+
+    with frame_placeholder.container():
+        columns = st.columns(columns_count)
+        tiles = {name: columns[i % len(columns)].empty() for i, name in enumerate(cameras)}
+        captions = {name: columns[i % len(columns)].empty() for i, name in enumerate(cameras)}
+    if server is not None:
+        for name in cameras:
+            show_mjpeg(tiles[name], server, name)
+    shown = {name: 0 for name in cameras}
+    try:
+        while st.session_state.running:
+            for name, camera in cameras.items():
+                captions[name].caption(f"{name}: {camera['cars']} cars, {camera['people']} people")
+                # Only tiles with a new frame are re-sent
+                if server is None and camera['sequence'] != shown[name]:
+                    shown[name] = camera['sequence']
+                    tiles[name].image(camera['frame'], use_column_width=True)
+            stats = scheduler.stats()
+            stats_placeholder.table([camera_row(name, s) for name, s in stats['cameras'].items()])
+            if scheduler.error is not None:
+                st.error(f"Error: {scheduler.error}")
+                break
+            time.sleep(1.0 / max(config.DISPLAY_FPS, 1.0))
+    finally:
+        scheduler.stop()
+
+@st.cache_data(ttl=10, show_spinner=False)
+def load_recorded_counts(hours):
+    # Shared by every viewer; the store is re-read at most every 10 seconds
+    store = CountStore(config.COUNT_STORE_PATH)
+    since = time.time() - hours * 3600
+    return store.counts(since=since), store.zone_counts(since=since), store.status()
+
+def show_recorded_counts():
+    hours = st.sidebar.slider("Hours of history", 1, 72, 24)
+    counts, zone_counts, status = load_recorded_counts(hours)
+    if not status:
+        st.info("No counts recorded yet. Start the detection worker with `python detection_worker.py`.")
+        return
 
-        # Convert BGR to RGB for Streamlit display
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    col1, col2 = st.columns(2)
+    col1.metric("Cars", int(counts['cars'].sum()))
+    col2.metric("People", int(counts['people'].sum()))
+    if not counts.empty:
+        st.line_chart(counts.groupby('interval_start')[['cars', 'people']].sum())
 
-        # Display frame using Streamlit
-        frame_placeholder.image(frame_rgb, channels="RGB", use_column_width=True)
+    if not zone_counts.empty:
+        st.subheader("Counting zones")
+        by_zone = {}
+        for row in zone_counts.itertuples():
+            zone = by_zone.setdefault(f"{row.camera} · {row.zone}", {})
+            zone.setdefault(row.direction, {})[row.class_id] = zone.get(row.direction, {}).get(row.class_id, 0) + row.count
+        st.table(zone_rows(by_zone))
 
-    cap.release()
+    st.subheader("Detection worker")
+    st.table([
+        {'Camera': name, 'Last update (s ago)': round(s['age_s']), 'FPS': round(s['fps'] or 0, 1),
+         'Lag (ms)': round(s['lag_ms'] or 0), 'Gated': s['gated'], 'Error': s['error']}
+        for name, s in status.items()
+    ])
 
 # Run live feed processing if the session state is set to running
-if st.session_state.running:
-    process_live_feed()
+if not live:
+    show_recorded_counts()
+elif st.session_state.running:
+    if mode == "All cameras":
+        process_all_cameras()
+    else:
+        process_live_feed()
 
 
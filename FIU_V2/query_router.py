@@ -0,0 +1,302 @@
+"""
+Structured Query Router
+Answers aggregate chat questions directly from the incident and post data, without the LLM
+"""
+
+import calendar
+import logging
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+COUNT_PATTERN = re.compile(r'\b(how many|number of|count of|count|total)\b')
+TOP_PATTERN = re.compile(r'\b(most common|most frequent|top \d+|top|what (kinds?|types?) of|which (kinds?|types?) of)\b')
+WHERE_PATTERN = re.compile(r'\b(which|what) (zip ?codes?|zips?|streets?|address(es)?|locations?|areas?)\b.*\bmost\b')
+ZIP_PATTERN = re.compile(r'\b(33\d{3})\b')
+POST_WORDS = {'post', 'posts', 'social', 'mentions'}
+GENERIC_WORDS = {'crime', 'crimes', 'incident', 'incidents', 'report', 'reports', 'call', 'calls', 'case', 'cases'}
+# Words a question may use without asking for a filter the router cannot apply. Questions are
+# filtered by incident type, zip code and period only; any other word (a street, a topic, "at night",
+# "arrested") sends the question to retrieval rather than getting an unfiltered count
+QUESTION_WORDS = {
+    'how', 'many', 'number', 'of', 'count', 'total', 'were', 'was', 'there', 'are', 'is', 'did', 'do', 'does',
+    'we', 'get', 'got', 'have', 'has', 'had', 'made', 'written', 'posted', 'published', 'community', 'online',
+    'media', 'the', 'a', 'an', 'in', 'on', 'for', 'from', 'during', 'since', 'at', 'all', 'zip', 'zips', 'code',
+    'codes', 'today', 'yesterday', 'this', 'last', 'past', 'previous', 'day', 'days', 'week', 'weeks', 'month',
+    'months', 'year', 'years', 'between', 'and', 'to', 'through', 'until', 'most', 'common', 'frequent', 'top',
+    'what', 'which', 'kind', 'kinds', 'type', 'types', 'street', 'streets', 'address', 'addresses', 'location',
+    'locations', 'area', 'areas', 'happen', 'happened', 'occur', 'occurred', 'reported', 'recorded', 'any',
+}
+
+# Words that appear in incident type names but say nothing about the kind of incident
+TYPE_STOPWORDS = {
+    'AND', 'OR', 'OF', 'THE', 'BY', 'FROM', 'TO', 'IN', 'ON', 'FOR', 'WITH', 'NON', 'OTHER',
+    'INCIDENT', 'REPORT', 'FD', 'PERSON', 'LAW', 'GENERAL', 'ALL', 'A',
+}
+
+MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+MONTH_NAMES = '|'.join(sorted(MONTHS, key=len, reverse=True))
+# "between March and May 2024", "from 2023 to 2024"
+MONTH_RANGE_PATTERN = re.compile(
+    rf'\b(?:between|from) ({MONTH_NAMES})(?: (\d{{4}}))? (?:and|to|through|until) ({MONTH_NAMES})(?: (\d{{4}}))?\b'
+)
+YEAR_RANGE_PATTERN = re.compile(r'\b(?:between|from) (20\d{2}) (?:and|to|through|until) (20\d{2})\b')
+
+
+def _singular(word: str) -> str:
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    if word.endswith(('ses', 'xes', 'ches', 'shes')):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith('ss') and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+class StructuredQueryRouter:
+    """
+    Detects aggregate questions and executes them as vectorised pandas filters
+
+    Supported intents:
+        count   "how many thefts in 33146 last month"
+        top     "most common incidents this year", "top 5 crimes in 33134"
+        where   "which zip code has the most burglaries"
+
+    Relative periods ("last month", "this week", "last 30 days") are
+    anchored at the most recent record of the dataset asked about, so the
+    stale sample data still gives meaningful answers; the anchor is stated
+    in every reply. route() returns None for anything it does not fully
+    understand, including questions with words no filter accounts for,
+    so the caller can fall through to retrieval and the LLM.
+    """
+
+    def __init__(self, police_data: pd.DataFrame, social_media_data: pd.DataFrame):
+        self.police_dates = pd.to_datetime(police_data.get('Date'), errors='coerce').to_numpy(dtype='datetime64[ns]') \
+            if not police_data.empty else np.array([], dtype='datetime64[ns]')
+        self.police_types = police_data['incident_type'].astype(str).str.upper().to_numpy() \
+            if 'incident_type' in police_data.columns else np.array([], dtype=object)
+        self.police_zips = police_data['zip'].astype(str).str[:5].to_numpy() \
+            if 'zip' in police_data.columns else None
+        self.police_locations = police_data['Location'].astype(str).str.upper().to_numpy() \
+            if 'Location' in police_data.columns else None
+
+        self.post_dates = pd.to_datetime(social_media_data.get('date'), errors='coerce').to_numpy(dtype='datetime64[ns]') \
+            if not social_media_data.empty else np.array([], dtype='datetime64[ns]')
+        self.post_zips = social_media_data['Zip Code'].astype('Int64').astype(str).to_numpy() \
+            if 'Zip Code' in social_media_data.columns else None
+
+        # Incidents and posts cover different periods, so each is anchored at its own latest record
+        self.anchors = {'police': self._latest(self.police_dates), 'posts': self._latest(self.post_dates)}
+
+        # Map each meaningful word in the incident type names to the types containing it
+        self.type_vocabulary: Dict[str, List[str]] = {}
+        for incident_type in np.unique(self.police_types):
+            for word in re.findall(r'[A-Z]+', incident_type):
+                if word not in TYPE_STOPWORDS and len(word) > 2:
+                    self.type_vocabulary.setdefault(word.lower(), []).append(incident_type)
+
+    @staticmethod
+    def _latest(dates: np.ndarray) -> pd.Timestamp:
+        valid_dates = dates[~np.isnat(dates)]
+        return pd.Timestamp(valid_dates.max()).normalize() if len(valid_dates) else pd.Timestamp.now().normalize()
+
+    # -------------------------------------------------------------------------
+    # Parsing
+    # -------------------------------------------------------------------------
+
+    def _parse_period(self, q: str, a: pd.Timestamp) -> Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp], str]:
+        """Return (start, end inclusive, label) for the time window in a question, relative to anchor a"""
+        match = MONTH_RANGE_PATTERN.search(q)
+        if match:
+            first, last = MONTHS[match.group(1)], MONTHS[match.group(3)]
+            end_year = int(match.group(4)) if match.group(4) else (a.year if last <= a.month else a.year - 1)
+            start_year = int(match.group(2)) if match.group(2) else (end_year if first <= last else end_year - 1)
+            start = pd.Timestamp(year=start_year, month=first, day=1)
+            end = pd.Timestamp(year=end_year, month=last, day=1) + pd.offsets.MonthEnd(0)
+            return start, end, f"from {start:%B %Y} to {end:%B %Y}"
+        match = YEAR_RANGE_PATTERN.search(q)
+        if match:
+            start = pd.Timestamp(year=int(match.group(1)), month=1, day=1)
+            end = pd.Timestamp(year=int(match.group(2)), month=12, day=31)
+            return start, end, f"from {start.year} to {end.year}"
+
+        if 'today' in q:
+            return a, a, f"on {a.date()}"
+        if 'yesterday' in q:
+            d = a - pd.Timedelta(days=1)
+            return d, d, f"on {d.date()}"
+
+        match = re.search(r'\b(?:last|past|previous) (\d+) (day|week|month|year)s?\b', q)
+        if match:
+            n, unit = int(match.group(1)), match.group(2)
+            offsets = {'day': pd.DateOffset(days=n), 'week': pd.DateOffset(weeks=n),
+                       'month': pd.DateOffset(months=n), 'year': pd.DateOffset(years=n)}
+            start = a - offsets[unit] + pd.Timedelta(days=1)
+            return start, a, f"in the {n} {unit}s up to {a.date()}"
+
+        week_start = a - pd.Timedelta(days=a.weekday())
+        if 'this week' in q:
+            return week_start, a, f"in the week of {week_start.date()}"
+        if re.search(r'\b(last|past|previous) week\b', q):
+            start = week_start - pd.Timedelta(days=7)
+            return start, start + pd.Timedelta(days=6), f"in the week of {start.date()}"
+
+        month_start = a.replace(day=1)
+        if 'this month' in q:
+            return month_start, a, f"in {month_start:%B %Y}"
+        if re.search(r'\b(last|past|previous) month\b', q):
+            start = (month_start - pd.Timedelta(days=1)).replace(day=1)
+            return start, month_start - pd.Timedelta(days=1), f"in {start:%B %Y}"
+
+        if 'this year' in q:
+            start = a.replace(month=1, day=1)
+            return start, a, f"in {a.year}"
+        if re.search(r'\b(last|past|previous) year\b', q):
+            start = a.replace(year=a.year - 1, month=1, day=1)
+            return start, start.replace(month=12, day=31), f"in {start.year}"
+
+        match = re.search(rf'\b({MONTH_NAMES})\b(?: (\d{{4}}))?', q)
+        # A bare "may" is far more often the verb than the month
+        if match and (match.group(2) or match.group(1) != 'may'):
+            month = MONTHS[match.group(1)]
+            year = int(match.group(2)) if match.group(2) else (a.year if month <= a.month else a.year - 1)
+            start = pd.Timestamp(year=year, month=month, day=1)
+            end = start + pd.offsets.MonthEnd(0)
+            return start, end, f"in {start:%B %Y}"
+
+        match = re.search(r'\b(?:in|during) (20\d{2})\b', q)
+        if match:
+            year = int(match.group(1))
+            return pd.Timestamp(year=year, month=1, day=1), pd.Timestamp(year=year, month=12, day=31), f"in {year}"
+
+        return None, None, ""
+
+    def _parse_types(self, q: str) -> Tuple[List[str], Set[str]]:
+        """Return the incident types a question names and the words that named them"""
+        types, consumed = set(), set()
+        for word in re.findall(r'[a-z]+', q):
+            matched = self.type_vocabulary.get(_singular(word)) or self.type_vocabulary.get(word)
+            if matched:
+                types.update(matched)
+                consumed.add(word)
+        return sorted(types), consumed
+
+    def parse(self, question: str) -> Optional[Dict[str, Any]]:
+        """Extract intent and filters from a question, or None if it is not an aggregate query"""
+        q = re.sub(r'\s+', ' ', question.lower()).strip()
+        if WHERE_PATTERN.search(q):
+            intent = 'where'
+        elif COUNT_PATTERN.search(q):
+            intent = 'count'
+        elif TOP_PATTERN.search(q):
+            intent = 'top'
+        else:
+            return None
+
+        words = set(re.findall(r'[a-z]+', q))
+        dataset = 'posts' if words & POST_WORDS else 'police'
+        types, type_words = self._parse_types(q) if dataset == 'police' else ([], set())
+        if dataset == 'police' and not types and not (words & GENERIC_WORDS):
+            # "how many people live here" or "which areas have the most parks" is not a question about our data
+            return None
+        if words - type_words - GENERIC_WORDS - POST_WORDS - QUESTION_WORDS - set(MONTHS):
+            # "how many thefts on Ponce de Leon Blvd" or "how many posts mention noise" asks for a
+            # filter only retrieval can apply; an unfiltered count would be confidently wrong
+            return None
+        if 'between' in words and not (MONTH_RANGE_PATTERN.search(q) or YEAR_RANGE_PATTERN.search(q)):
+            return None
+
+        anchor = self.anchors[dataset]
+        start, end, period_label = self._parse_period(q, anchor)
+        zip_match = ZIP_PATTERN.search(q)
+        top_match = re.search(r'\btop (\d+)\b', q)
+        return {
+            'intent': intent,
+            'dataset': dataset,
+            'types': types,
+            'zip': zip_match.group(1) if zip_match else None,
+            'start': start,
+            'end': end,
+            'period_label': period_label,
+            'anchor': anchor,
+            'top_n': int(top_match.group(1)) if top_match else 5,
+            'group_by': 'zip' if re.search(r'\bzip', q) else 'location',
+        }
+
+    # -------------------------------------------------------------------------
+    # Execution
+    # -------------------------------------------------------------------------
+
+    def _mask(self, query: Dict[str, Any]) -> np.ndarray:
+        police = query['dataset'] == 'police'
+        dates = self.police_dates if police else self.post_dates
+        mask = ~np.isnat(dates)
+        if query['start'] is not None:
+            mask &= dates >= query['start'].to_datetime64()
+            mask &= dates < (query['end'] + pd.Timedelta(days=1)).to_datetime64()
+        zips = self.police_zips if police else self.post_zips
+        if query['zip']:
+            mask &= (zips == query['zip']) if zips is not None else False
+        if police and query['types']:
+            mask &= np.isin(self.police_types, query['types'])
+        return mask
+
+    def _describe(self, query: Dict[str, Any]) -> str:
+        parts = []
+        if query['zip']:
+            parts.append(f"in zip {query['zip']}")
+        if query['period_label']:
+            parts.append(query['period_label'])
+        return (' ' + ' '.join(parts)) if parts else ''
+
+    def route(self, question: str) -> Optional[Dict[str, Any]]:
+        """
+        Answer a question from the data if it is a supported aggregate query
+
+        Returns:
+            Dict with 'answer', 'intent' and 'count' (or None to fall through)
+        """
+        query = self.parse(question)
+        if query is None:
+            return None
+
+        mask = self._mask(query)
+        count = int(mask.sum())
+        scope = self._describe(query)
+        as_of = f" (data through {query['anchor'].date()})"
+        subject = 'community posts' if query['dataset'] == 'posts' else 'incidents'
+        if query['types'] and len(query['types']) <= 3:
+            subject = ', '.join(t.title() for t in query['types']) + ' incidents'
+        elif query['types']:
+            subject = f"matching incidents ({len(query['types'])} incident types)"
+
+        if query['intent'] == 'count':
+            answer = f"There were {count:,} {subject}{scope}.{as_of}"
+        elif query['dataset'] == 'posts':
+            return None
+        elif query['intent'] == 'top':
+            counts = pd.Series(self.police_types[mask]).value_counts().head(query['top_n'])
+            if counts.empty:
+                answer = f"No incidents were recorded{scope}.{as_of}"
+            else:
+                lines = '\n'.join(f"- {t.title()}: {n:,}" for t, n in counts.items())
+                answer = f"Most common incident types{scope}:\n{lines}{as_of}"
+        else:
+            keys = self.police_zips if query['group_by'] == 'zip' else self.police_locations
+            if keys is None:
+                return None
+            counts = pd.Series(keys[mask]).value_counts().head(query['top_n'])
+            if counts.empty:
+                answer = f"No {subject} were recorded{scope}.{as_of}"
+            else:
+                label = 'zip codes' if query['group_by'] == 'zip' else 'locations'
+                lines = '\n'.join(f"- {k}: {n:,}" for k, n in counts.items())
+                answer = f"{label.capitalize()} with the most {subject}{scope}:\n{lines}{as_of}"
+
+        logger.info(f"Routed chat question to structured query: {query['intent']} ({count} rows)")
+        return {'answer': answer, 'intent': query['intent'], 'count': count}
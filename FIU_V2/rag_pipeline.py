@@ -0,0 +1,364 @@
+"""
+Local RAG Pipeline
+Persistent Chroma retrieval over the local datasets and city PDFs, with a pluggable chat model
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_HEADER = "Context:"
+QUESTION_HEADER = "Question:"
+
+PROMPT_TEMPLATE = """You are LocalPulse, a helpful assistant for residents of Coral Gables, Florida.
+Answer the question using only the context below. If the context does not contain
+the answer, say so briefly.
+
+{context_header}
+{context}
+
+Conversation so far:
+{history}
+
+{question_header} {question}
+Answer:"""
+
+
+# =============================================================================
+# CHAT MODELS
+# =============================================================================
+
+class ChatModel(ABC):
+    """
+    Interface for the language model behind the chat page
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def generate(self, prompt: str) -> str:
+        """Return the full answer for a prompt"""
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Yield the answer in pieces as soon as they are available"""
+        yield self.generate(prompt)
+
+
+class GeminiChatModel(ChatModel):
+    """
+    Google Gemini backed chat model
+    """
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt: str) -> str:
+        response = self.model.generate_content(prompt)
+        return response.text
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self.model.generate_content(prompt, stream=True):
+            if chunk.text:
+                yield chunk.text
+
+
+class OfflineChatModel(ChatModel):
+    """
+    Deterministic stand-in used when no LLM is configured
+
+    Answers with the retrieved context itself so the page stays useful
+    offline and in development.
+    """
+
+    name = "offline"
+
+    def generate(self, prompt: str) -> str:
+        context = ""
+        if CONTEXT_HEADER in prompt:
+            context = prompt.split(CONTEXT_HEADER, 1)[1].split("Conversation so far:", 1)[0]
+        snippets = [line.strip() for line in context.splitlines() if line.strip()]
+        if not snippets:
+            return "I couldn't find anything about that in the local Coral Gables data."
+        return "Here is what the local data says:\n" + "\n".join(f"- {s}" for s in snippets[:5])
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for line in self.generate(prompt).splitlines(keepends=True):
+            yield line
+
+
+def create_chat_model(backend: str, api_key: str = '', model_name: str = 'gemini-1.5-flash') -> ChatModel:
+    """
+    Create the chat model for a backend name ('auto', 'gemini' or 'offline')
+
+    'auto' uses Gemini when an API key is configured and falls back to the
+    offline model otherwise, or when Gemini cannot be initialised.
+    """
+    backend = (backend or 'auto').lower()
+    if backend == 'offline' or (backend == 'auto' and not api_key):
+        return OfflineChatModel()
+    try:
+        return GeminiChatModel(api_key, model_name)
+    except Exception as e:
+        logger.error(f"Could not initialise Gemini, using offline model: {e}")
+        return OfflineChatModel()
+
+
+# =============================================================================
+# DOCUMENTS
+# =============================================================================
+
+def content_hash(text: str) -> str:
+    """SHA-1 of a document's text, used to detect changed documents"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def build_dataset_documents(police_data: pd.DataFrame, social_media_data: pd.DataFrame) -> List[Dict]:
+    """
+    Render incident and post rows as short retrievable text documents
+
+    Returns:
+        List of dicts with 'id', 'text' and 'metadata'
+    """
+    documents = []
+
+    if not police_data.empty:
+        ids = police_data['record_id'] if 'record_id' in police_data.columns else police_data.index
+        dates = pd.to_datetime(police_data['Date'], errors='coerce').dt.strftime('%Y-%m-%d')
+        locations = police_data.get('Location', pd.Series('an unknown location', index=police_data.index))
+        zips = police_data.get('zip', pd.Series('', index=police_data.index))
+        for record_id, date, incident, location, zip_code in zip(
+            ids, dates, police_data['incident_type'].astype(str), locations.astype(str), zips.astype(str)
+        ):
+            text = f"On {date} police recorded {incident} at {location}"
+            text += f" (zip {zip_code})." if zip_code and zip_code != 'nan' else "."
+            documents.append({
+                'id': f"police:{record_id}",
+                'text': text,
+                'metadata': {'source': 'police_data', 'date': str(date), 'incident_type': incident},
+            })
+
+    if not social_media_data.empty:
+        posts = social_media_data.dropna(subset=['content'])
+        ids = posts['post_id'] if 'post_id' in posts.columns else posts.index
+        dates = pd.to_datetime(posts['date'], errors='coerce').dt.strftime('%Y-%m-%d')
+        for post_id, date, content in zip(ids, dates, posts['content'].astype(str)):
+            documents.append({
+                'id': f"post:{post_id}",
+                'text': f"Community post on {date}: {content}",
+                'metadata': {'source': 'social_media', 'date': str(date)},
+            })
+
+    return documents
+
+
+# =============================================================================
+# VECTOR STORE
+# =============================================================================
+
+class LazyEmbeddings:
+    """
+    Embeddings wrapper that loads the HuggingFace model on first use
+
+    Opening an existing index only needs the Chroma files on disk; the
+    sentence-transformers model is loaded the first time something is
+    actually embedded (new documents or a query).
+    """
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        # Batches may arrive from several worker threads at once
+        with self._lock:
+            if self._model is None:
+                from langchain_community.embeddings import HuggingFaceEmbeddings
+
+                logger.info(f"Loading embedding model {self.model_name}")
+                self._model = HuggingFaceEmbeddings(model_name=self.model_name)
+            return self._model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.model.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.model.embed_query(text)
+
+
+class LocalRAGPipeline:
+    """
+    Persistent on-disk Chroma collection kept in sync with local documents
+
+    A manifest next to the collection maps each document id to the hash
+    of its text, so sync() only embeds documents that are new or changed
+    and deletes the ones that disappeared. Batches are kept large so a
+    batching embedder can spread each one over several workers.
+    """
+
+    def __init__(self, persist_dir: str, embeddings, collection_name: str = 'localpulse',
+                 batch_size: int = 2048):
+        from langchain_community.vectorstores import Chroma
+
+        self.persist_dir = Path(persist_dir)
+        self.persist_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.persist_dir / f"{collection_name}_manifest.json"
+        self.batch_size = batch_size
+        self.embeddings = embeddings
+        self.vectorstore = Chroma(
+            collection_name=collection_name,
+            embedding_function=embeddings,
+            persist_directory=str(self.persist_dir),
+        )
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> Dict[str, str]:
+        try:
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"Error reading vector store manifest, reindexing: {e}")
+            return {}
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f)
+        tmp_path.replace(self.manifest_path)
+
+    @property
+    def index_version(self) -> str:
+        """Fingerprint of the indexed content; changes whenever sync() changes anything"""
+        digest = hashlib.sha1()
+        for doc_id in sorted(self.manifest):
+            digest.update(f"{doc_id}={self.manifest[doc_id]};".encode())
+        return digest.hexdigest()[:16]
+
+    def delete_documents(self, ids: List[str]):
+        """Remove documents from the collection and the manifest"""
+        for start in range(0, len(ids), self.batch_size):
+            self.vectorstore.delete(ids=ids[start:start + self.batch_size])
+        for doc_id in ids:
+            self.manifest.pop(doc_id, None)
+        if ids:
+            self._save_manifest()
+
+    def add_documents(self, documents: List[Dict]):
+        """
+        Embed and store documents, replacing any existing ones with the same id
+
+        Callers that already know which documents changed (such as the PDF
+        ingestion stage) use this directly instead of sync().
+        """
+        replaced = [doc['id'] for doc in documents if doc['id'] in self.manifest]
+        for start in range(0, len(replaced), self.batch_size):
+            self.vectorstore.delete(ids=replaced[start:start + self.batch_size])
+
+        for start in range(0, len(documents), self.batch_size):
+            batch = documents[start:start + self.batch_size]
+            self.vectorstore.add_texts(
+                texts=[doc['text'] for doc in batch],
+                metadatas=[doc.get('metadata') or {} for doc in batch],
+                ids=[doc['id'] for doc in batch],
+            )
+            for doc in batch:
+                self.manifest[doc['id']] = content_hash(doc['text'])
+            # Save after every batch so an interrupted run resumes where it stopped
+            self._save_manifest()
+
+    def sync(self, documents: List[Dict], prune: bool = True,
+             prune_prefixes: Optional[Tuple[str, ...]] = None) -> Dict[str, int]:
+        """
+        Bring the collection in line with documents, embedding only changes
+
+        Args:
+            documents: Dicts with 'id', 'text' and 'metadata'
+            prune: Delete indexed documents that are no longer present
+            prune_prefixes: Only prune ids starting with one of these
+                prefixes, leaving documents managed elsewhere untouched
+
+        Returns:
+            Counts of added, updated, deleted and unchanged documents
+        """
+        stats = {'added': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+        pending = []
+        seen = set()
+        for doc in documents:
+            doc_id = doc['id']
+            if doc_id in seen:
+                continue
+            seen.add(doc_id)
+            previous = self.manifest.get(doc_id)
+            if previous == content_hash(doc['text']):
+                stats['unchanged'] += 1
+                continue
+            stats['updated' if previous else 'added'] += 1
+            pending.append(doc)
+
+        stale = []
+        if prune:
+            stale = [
+                doc_id for doc_id in self.manifest
+                if doc_id not in seen and (prune_prefixes is None or doc_id.startswith(prune_prefixes))
+            ]
+        self.delete_documents(stale)
+        stats['deleted'] = len(stale)
+        self.add_documents(pending)
+
+        logger.info(f"Vector store sync: {stats}")
+        return stats
+
+
+def build_prompt(question: str, documents: List, conversation_history: str) -> str:
+    """Assemble the LLM prompt from retrieved documents and prior turns"""
+    context = "\n".join(doc.page_content for doc in documents)
+    return PROMPT_TEMPLATE.format(
+        context_header=CONTEXT_HEADER,
+        context=context or "(no matching local documents)",
+        history=conversation_history or "(none)",
+        question_header=QUESTION_HEADER,
+        question=question,
+    )
+
+
+def retrieve(vectorstore, question: str, top_k: int = 4) -> List:
+    """Top-k documents for a question, or none when no index is available"""
+    return vectorstore.similarity_search(question, k=top_k) if vectorstore is not None else []
+
+
+def stream_answer(model: ChatModel, vectorstore, question: str,
+                  conversation_history: str, top_k: int = 4) -> Iterator[str]:
+    """
+    Retrieve supporting documents and stream the chat model's answer
+    """
+    prompt = build_prompt(question, retrieve(vectorstore, question, top_k), conversation_history)
+    yield from model.stream(prompt)
+
+
+def answer_question(model: ChatModel, vectorstore, question: str,
+                    conversation_history: str, top_k: int = 4) -> Tuple[str, List]:
+    """
+    Retrieve supporting documents and ask the chat model
+
+    Returns:
+        Tuple of (answer, retrieved documents)
+    """
+    documents = retrieve(vectorstore, question, top_k)
+    prompt = build_prompt(question, documents, conversation_history)
+    return model.generate(prompt), documents
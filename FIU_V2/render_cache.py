@@ -0,0 +1,67 @@
+"""
+Render Cache
+LRU cache of built map decks and Plotly figures keyed by data version and view parameters
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def freeze_deck(deck):
+    """
+    Serialise a pydeck Deck once and reuse the JSON on every render
+
+    st.pydeck_chart calls deck.to_json() on each rerun, which walks every
+    layer's data again; a cached deck never changes, so its spec does not
+    either.
+    """
+    spec = deck.to_json()
+    deck.to_json = lambda: spec
+    return deck
+
+
+class RenderCache:
+    """
+    Process-wide store of finished chart objects
+
+    Keys carry everything a chart depends on (view name, dataset version,
+    date range, overlay, language, ...), so a hit can be rendered as-is
+    and skips all filtering, aggregation and figure construction. Only
+    reruns caused by an unrelated widget hit the cache; any change to the
+    data or the view's own inputs makes a new key.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get_or_build(self, key: Tuple[Hashable, ...], builder: Callable[[], Any]) -> Any:
+        """Return the cached object for key, building and storing it on a miss"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return self._entries[key]
+            self.stats['misses'] += 1
+
+        value = builder()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries))
@@ -0,0 +1,130 @@
+"""
+Semantic Response Cache
+Reuses chat answers for questions that were already asked, by exact text or embedding similarity
+"""
+
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_FILLER_WORDS = {'please', 'pls', 'hey', 'hi', 'hello', 'thanks', 'thank', 'you', 'can', 'could', 'tell', 'me'}
+
+
+def normalize_question(question: str) -> str:
+    """
+    Reduce a question to a canonical form for exact matching
+
+    "Hi, can you tell me: any road closures?" and "any road closures"
+    normalise to the same key.
+    """
+    words = re.sub(r'[^\w\s]', ' ', question.lower()).split()
+    kept = [w for w in words if w not in _FILLER_WORDS]
+    return ' '.join(kept or words)
+
+
+class SemanticResponseCache:
+    """
+    LRU cache of chat answers keyed by normalised question text
+
+    A lookup first tries the normalised text, then the cosine similarity
+    of the question embedding against every cached question; a match at
+    or above the threshold is a hit. The whole cache is dropped when the
+    data version changes, so answers never outlive the data they came from.
+    """
+
+    def __init__(self, embed_fn: Optional[Callable[[str], List[float]]] = None,
+                 threshold: float = 0.92, max_entries: int = 512):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.data_version: Optional[str] = None
+        self._entries: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._keys: List[str] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self.stats = {'exact_hits': 0, 'semantic_hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        if self.embed_fn is None:
+            return None
+        try:
+            vector = np.asarray(self.embed_fn(text), dtype=np.float32)
+        except Exception as e:
+            logger.error(f"Error embedding question for response cache: {e}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _check_version(self, data_version: str):
+        if data_version != self.data_version:
+            if self._entries:
+                self.stats['invalidations'] += 1
+                logger.info("Data version changed, clearing chat response cache")
+            self._entries.clear()
+            self._rebuild_matrix()
+            self.data_version = data_version
+
+    def _rebuild_matrix(self):
+        self._keys = [k for k, e in self._entries.items() if e['vector'] is not None]
+        self._matrix = np.vstack([self._entries[k]['vector'] for k in self._keys]) if self._keys else None
+
+    def lookup(self, question: str, data_version: str) -> Optional[str]:
+        """Return a cached answer for the question, or None on a miss"""
+        key = normalize_question(question)
+        with self._lock:
+            self._check_version(data_version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats['exact_hits'] += 1
+                return entry['answer']
+            matrix = self._matrix
+            keys = list(self._keys)
+
+        vector = self._embed(key) if matrix is not None else None
+        if vector is not None and vector.shape[0] == matrix.shape[1]:
+            scores = matrix @ vector
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                with self._lock:
+                    entry = self._entries.get(keys[best])
+                    if entry is not None and self.data_version == data_version:
+                        self._entries.move_to_end(keys[best])
+                        self.stats['semantic_hits'] += 1
+                        return entry['answer']
+
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def store(self, question: str, answer: str, data_version: str):
+        """Remember the answer to a question for the given data version"""
+        key = normalize_question(question)
+        vector = self._embed(key)
+        with self._lock:
+            self._check_version(data_version)
+            self._entries[key] = {'answer': answer, 'vector': vector}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._rebuild_matrix()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._rebuild_matrix()
+
+    def get_stats(self) -> Dict[str, float]:
+        """Hit/miss counters plus entry count and overall hit rate"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['exact_hits'] + stats['semantic_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['exact_hits'] + stats['semantic_hits']) / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,147 @@
+"""
+Spatial Grid Index
+Uniform-grid index over lat/lon points for radius and nearest-neighbour queries
+"""
+
+import logging
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+METERS_PER_DEGREE = 111_320.0
+
+# Upper bound on grid cells; sparse, far-flung data gets coarser cells instead of a huge offset table
+MAX_CELLS = 1 << 22
+
+
+class GridSpatialIndex:
+    """
+    Points bucketed into square cells on a local metric projection
+
+    The points are sorted by cell once and the cell boundaries are kept in
+    a CSR-style offsets array, so the points of any cell are one contiguous
+    slice. A query visits only the cells overlapping its search area and
+    tests the candidates exactly. All queries return positional row indices
+    into the frame the index was built from (use with .iloc); rows with a
+    missing coordinate are never returned.
+
+    Distances use an equirectangular projection around the data's mean
+    latitude, which is accurate to well under a metre at city scale.
+    """
+
+    def __init__(self, lat, lon, cell_size_m: float = 250.0):
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        valid = np.isfinite(lat) & np.isfinite(lon)
+        self.size = len(lat)
+        self.rows = np.flatnonzero(valid)
+        self.ref_lat = float(lat[valid].mean()) if valid.any() else 0.0
+        self._x_scale = METERS_PER_DEGREE * np.cos(np.radians(self.ref_lat))
+
+        self.x = lon[valid] * self._x_scale
+        self.y = lat[valid] * METERS_PER_DEGREE
+        self.x0 = float(self.x.min()) if len(self.x) else 0.0
+        self.y0 = float(self.y.min()) if len(self.y) else 0.0
+        extent_x = (float(self.x.max()) - self.x0) if len(self.x) else 0.0
+        extent_y = (float(self.y.max()) - self.y0) if len(self.y) else 0.0
+        while (extent_x / cell_size_m + 1) * (extent_y / cell_size_m + 1) > MAX_CELLS:
+            cell_size_m *= 2
+        self.cell_size = cell_size_m
+        self.nx = int(extent_x // cell_size_m) + 1
+        self.ny = int(extent_y // cell_size_m) + 1
+
+        ix, iy = self._cell_xy(self.x, self.y)
+        cells = iy * self.nx + ix
+        order = np.argsort(cells, kind='stable')
+        self.x, self.y, self.rows = self.x[order], self.y[order], self.rows[order]
+        self.offsets = np.zeros(self.nx * self.ny + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=self.nx * self.ny), out=self.offsets[1:])
+        logger.info(f"Spatial index: {len(self.rows)} points in a {self.nx}x{self.ny} grid of {cell_size_m:.0f} m cells")
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, lat_col: str = 'lat', lon_col: str = 'lon',
+                   cell_size_m: float = 250.0) -> 'GridSpatialIndex':
+        """Build an index over a DataFrame's coordinate columns"""
+        return cls(df[lat_col].to_numpy(dtype=float), df[lon_col].to_numpy(dtype=float), cell_size_m)
+
+    def _cell_xy(self, x, y) -> Tuple[np.ndarray, np.ndarray]:
+        ix = np.clip(((np.asarray(x) - self.x0) // self.cell_size).astype(np.int64), 0, self.nx - 1)
+        iy = np.clip(((np.asarray(y) - self.y0) // self.cell_size).astype(np.int64), 0, self.ny - 1)
+        return ix, iy
+
+    def _project(self, lat: float, lon: float) -> Tuple[float, float]:
+        return lon * self._x_scale, lat * METERS_PER_DEGREE
+
+    def _candidates(self, x_min: float, y_min: float, x_max: float, y_max: float) -> np.ndarray:
+        """Sorted-order positions of all points in cells overlapping a projected rectangle"""
+        if len(self.rows) == 0 or x_max < self.x0 or y_max < self.y0:
+            return np.array([], dtype=np.int64)
+        (ix0, ix1), (iy0, iy1) = self._cell_xy([x_min, x_max], [y_min, y_max])
+        # Cells of one grid row are contiguous, so each row of the window is a single slice
+        row_starts = np.arange(iy0, iy1 + 1) * self.nx
+        starts = self.offsets[row_starts + ix0]
+        ends = self.offsets[row_starts + ix1 + 1]
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.array([], dtype=np.int64)
+        return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+
+    def query_radius(self, lat: float, lon: float, radius_m: float,
+                     return_distance: bool = False):
+        """
+        Points within radius_m metres of a location
+
+        Args:
+            lat, lon: Query location
+            radius_m: Search radius in metres
+            return_distance: Also return the distance of each point
+
+        Returns:
+            Row indices sorted by distance, plus distances in metres if requested
+        """
+        qx, qy = self._project(lat, lon)
+        pos = self._candidates(qx - radius_m, qy - radius_m, qx + radius_m, qy + radius_m)
+        dist = np.hypot(self.x[pos] - qx, self.y[pos] - qy)
+        keep = dist <= radius_m
+        pos, dist = pos[keep], dist[keep]
+        order = np.argsort(dist, kind='stable')
+        rows = self.rows[pos[order]]
+        return (rows, dist[order]) if return_distance else rows
+
+    def query_knn(self, lat: float, lon: float, k: int = 10, return_distance: bool = False):
+        """
+        The k points nearest to a location
+
+        Rings of cells are added around the query cell until k candidates
+        are found and the ring is wider than the k-th candidate distance,
+        at which point no unvisited cell can hold a closer point.
+
+        Returns:
+            Row indices sorted by distance, plus distances in metres if requested
+        """
+        k = min(k, len(self.rows))
+        if k <= 0:
+            empty = np.array([], dtype=np.int64)
+            return (empty, np.array([], dtype=float)) if return_distance else empty
+
+        qx, qy = self._project(lat, lon)
+        # Distance from the query to the grid, for queries that fall outside it
+        gap = np.hypot(max(self.x0 - qx, 0.0, qx - (self.x0 + self.nx * self.cell_size)),
+                       max(self.y0 - qy, 0.0, qy - (self.y0 + self.ny * self.cell_size)))
+        reach = gap + self.cell_size
+        while True:
+            pos = self._candidates(qx - reach, qy - reach, qx + reach, qy + reach)
+            if len(pos) >= k:
+                dist = np.hypot(self.x[pos] - qx, self.y[pos] - qy)
+                nearest = np.argpartition(dist, k - 1)[:k]
+                if dist[nearest].max() <= reach or len(pos) == len(self.rows):
+                    break
+            reach *= 2
+
+        order = nearest[np.argsort(dist[nearest], kind='stable')]
+        rows = self.rows[pos[order]]
+        return (rows, dist[order]) if return_distance else rows
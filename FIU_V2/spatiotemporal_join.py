@@ -0,0 +1,284 @@
+"""
+Space-Time Join Engine
+Matches social media posts to police incidents at the same place within a time window
+"""
+
+import logging
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Street suffix spellings normalised to the abbreviations used in police_data
+STREET_SUFFIXES = {
+    'STREET': 'ST',
+    'AVENUE': 'AVE',
+    'AV': 'AVE',
+    'BOULEVARD': 'BLVD',
+    'DRIVE': 'DR',
+    'ROAD': 'RD',
+    'CIRCLE': 'CIR',
+    'COURT': 'CT',
+    'PLACE': 'PL',
+    'LANE': 'LN',
+    'TERRACE': 'TER',
+    'PLAZA': 'PLZ',
+    'HIGHWAY': 'HWY',
+    'PARKWAY': 'PKWY',
+}
+
+_SUFFIX_PATTERN = r'\b(' + '|'.join(STREET_SUFFIXES) + r')\b'
+
+# Metres per degree of latitude; longitude is scaled by cos(latitude)
+METERS_PER_DEGREE = 111_320.0
+
+KeyLike = Union[str, pd.Series]
+
+
+def canonical_address(addresses: pd.Series) -> pd.Series:
+    """
+    Normalise free-text street addresses into a comparable key
+
+    "1245 Dauer Drive, Coral Gables, FL" and "1245 DAUER DR" both become
+    "1245 DAUER DR". Empty or missing addresses become <NA>.
+    """
+    s = addresses.astype('string').str.upper().str.split(',').str[0].astype('string')
+    s = s.str.replace(r'[^\w\s]', ' ', regex=True)
+    s = s.str.replace(_SUFFIX_PATTERN, lambda m: STREET_SUFFIXES[m.group(1)], regex=True)
+    s = s.str.replace(r'\s+', ' ', regex=True).str.strip()
+    return s.mask(s == '')
+
+
+def spatial_cells(lat: pd.Series, lon: pd.Series, cell_size_m: float) -> pd.DataFrame:
+    """
+    Assign each point to a square grid cell of roughly cell_size_m metres
+
+    Returns:
+        DataFrame with integer 'cell_x' and 'cell_y' columns aligned to the input
+    """
+    lat = pd.to_numeric(lat, errors='coerce')
+    lon = pd.to_numeric(lon, errors='coerce')
+    lat_step = cell_size_m / METERS_PER_DEGREE
+    ref_lat = np.nanmean(lat.to_numpy(dtype=float)) if len(lat) else 0.0
+    lon_step = lat_step / max(np.cos(np.radians(ref_lat)), 1e-6)
+    return pd.DataFrame({
+        'cell_x': np.floor(lon / lon_step).astype('Int64'),
+        'cell_y': np.floor(lat / lat_step).astype('Int64'),
+    }, index=lat.index)
+
+
+def _resolve(df: pd.DataFrame, key: KeyLike) -> pd.Series:
+    return df[key] if isinstance(key, str) else key.reindex(df.index)
+
+
+def _epoch_seconds(times: pd.Series) -> np.ndarray:
+    times = pd.to_datetime(times, errors='coerce')
+    return times.to_numpy(dtype='datetime64[s]').astype('int64')
+
+
+def space_time_join(
+    left: pd.DataFrame,
+    right: pd.DataFrame,
+    left_key: KeyLike,
+    right_key: KeyLike,
+    left_time: KeyLike,
+    right_time: KeyLike,
+    tolerance: pd.Timedelta,
+    direction: str = 'both',
+) -> pd.DataFrame:
+    """
+    Return every (left, right) pair sharing a key whose times are within tolerance
+
+    Both sides are reduced to a single sortable int64 of (key code, time),
+    the right side is sorted once and each left row finds its window with
+    two binary searches, so the cost is O((n + m) log m + matches) rather
+    than the O(n * m) of a cartesian comparison.
+
+    Args:
+        left, right: Frames to join
+        left_key, right_key: Column name or Series holding the grouping key
+            (canonical address, grid cell, ...). Missing keys never match.
+        left_time, right_time: Column name or Series holding timestamps
+        tolerance: Maximum time distance between matched rows
+        direction: 'both' for |right - left| <= tolerance, 'backward' when
+            the right event must precede the left one, 'forward' when it
+            must follow it
+
+    Returns:
+        DataFrame with 'left_index', 'right_index' (labels from the input
+        frames) and 'time_delta' (right time minus left time)
+    """
+    if direction not in ('both', 'backward', 'forward'):
+        raise ValueError(f"Unknown direction: {direction}")
+
+    empty = pd.DataFrame({
+        'left_index': pd.Series([], dtype=left.index.dtype),
+        'right_index': pd.Series([], dtype=right.index.dtype),
+        'time_delta': pd.Series([], dtype='timedelta64[s]'),
+    })
+    if left.empty or right.empty:
+        return empty
+
+    tol = int(pd.Timedelta(tolerance).total_seconds())
+    before = tol if direction in ('both', 'backward') else 0
+    after = tol if direction in ('both', 'forward') else 0
+
+    # Encode keys on the right side; left keys absent on the right can never match
+    right_keys = _resolve(right, right_key)
+    right_codes, uniques = pd.factorize(right_keys, use_na_sentinel=True)
+    left_codes = pd.Index(uniques).get_indexer(_resolve(left, left_key))
+
+    right_times = _epoch_seconds(_resolve(right, right_time))
+    left_times = _epoch_seconds(_resolve(left, left_time))
+    nat = np.iinfo('int64').min
+    right_valid = (right_codes >= 0) & (right_times != nat)
+    left_valid = (left_codes >= 0) & (left_times != nat)
+    if not right_valid.any() or not left_valid.any():
+        return empty
+
+    right_rows = np.flatnonzero(right_valid)
+    left_rows = np.flatnonzero(left_valid)
+    right_codes = right_codes[right_rows].astype('int64')
+    left_codes = left_codes[left_rows].astype('int64')
+    right_times = right_times[right_rows]
+    left_times = left_times[left_rows]
+
+    # Composite sort key: code * span + shifted time keeps every query window
+    # inside its own key's block
+    t0 = min(right_times.min(), left_times.min())
+    span = int(max(right_times.max(), left_times.max()) - t0) + before + after + 1
+    if (len(uniques) + 1) * span >= np.iinfo('int64').max:
+        raise ValueError("Time range too large for composite join key")
+
+    right_composite = right_codes * span + (right_times - t0 + before)
+    order = np.argsort(right_composite, kind='stable')
+    right_sorted = right_composite[order]
+
+    base = left_codes * span + (left_times - t0)
+    lo = np.searchsorted(right_sorted, base, side='left')
+    hi = np.searchsorted(right_sorted, base + before + after, side='right')
+    counts = hi - lo
+    total = int(counts.sum())
+    if total == 0:
+        return empty
+
+    # Expand [lo, hi) windows into flat pair arrays without a Python loop
+    left_pos = np.repeat(np.arange(len(left_rows)), counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    right_pos = order[np.repeat(lo, counts) + offsets]
+
+    return pd.DataFrame({
+        'left_index': left.index[left_rows[left_pos]],
+        'right_index': right.index[right_rows[right_pos]],
+        'time_delta': pd.to_timedelta(right_times[right_pos] - left_times[left_pos], unit='s'),
+    })
+
+
+def space_time_join_cells(
+    left: pd.DataFrame,
+    right: pd.DataFrame,
+    tolerance: pd.Timedelta,
+    max_distance_m: float,
+    left_time: KeyLike,
+    right_time: KeyLike,
+    lat_col: str = 'lat',
+    lon_col: str = 'lon',
+    direction: str = 'both',
+) -> pd.DataFrame:
+    """
+    Space-time join on coordinates instead of addresses
+
+    Points are bucketed into grid cells of max_distance_m; each left point
+    is swept against its own and the eight neighbouring cells, and the
+    candidates are then filtered by true distance.
+
+    Returns:
+        Same columns as space_time_join plus 'distance_m'
+    """
+    # Bucket both sides on one shared grid
+    cells = spatial_cells(
+        pd.concat([right[lat_col], left[lat_col]], ignore_index=True),
+        pd.concat([right[lon_col], left[lon_col]], ignore_index=True),
+        max_distance_m,
+    )
+    right_cells = cells.iloc[:len(right)].set_axis(right.index)
+    left_cells = cells.iloc[len(right):].set_axis(left.index)
+    right_key = right_cells['cell_x'].astype('string') + ':' + right_cells['cell_y'].astype('string')
+
+    pieces = []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            left_key = (left_cells['cell_x'] + dx).astype('string') + ':' + (left_cells['cell_y'] + dy).astype('string')
+            pieces.append(space_time_join(
+                left, right, left_key, right_key, left_time, right_time, tolerance, direction
+            ))
+    pairs = pd.concat(pieces, ignore_index=True)
+    if pairs.empty:
+        pairs['distance_m'] = pd.Series([], dtype=float)
+        return pairs
+
+    lat1 = np.radians(left.loc[pairs['left_index'], lat_col].to_numpy(dtype=float))
+    lon1 = np.radians(left.loc[pairs['left_index'], lon_col].to_numpy(dtype=float))
+    lat2 = np.radians(right.loc[pairs['right_index'], lat_col].to_numpy(dtype=float))
+    lon2 = np.radians(right.loc[pairs['right_index'], lon_col].to_numpy(dtype=float))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    pairs['distance_m'] = 2 * 6_371_000 * np.arcsin(np.sqrt(a))
+    return pairs[pairs['distance_m'] <= max_distance_m].reset_index(drop=True)
+
+
+def join_posts_to_incidents(
+    police_data: pd.DataFrame,
+    social_media_data: pd.DataFrame,
+    tolerance_days: int = 7,
+    direction: str = 'both',
+    post_address_col: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Find social media posts that mention an address within N days of an incident there
+
+    Args:
+        police_data: Incidents with 'Location' and 'Date' columns
+        social_media_data: Posts with 'date' and an extracted address column
+        tolerance_days: Maximum number of days between post and incident
+        direction: See space_time_join; 'backward' keeps only posts written
+            after the incident
+        post_address_col: Address column in the posts; defaults to
+            'Extracted address'
+
+    Returns:
+        One row per matched (post, incident) pair, sorted by post date
+    """
+    columns = ['post_date', 'address', 'content', 'incident_date', 'incident_type', 'days_apart']
+    post_address_col = post_address_col or 'Extracted address'
+    if (police_data.empty or social_media_data.empty
+            or 'Location' not in police_data.columns
+            or post_address_col not in social_media_data.columns):
+        return pd.DataFrame(columns=columns)
+
+    post_keys = canonical_address(social_media_data[post_address_col])
+    incident_keys = canonical_address(police_data['Location'])
+
+    pairs = space_time_join(
+        social_media_data, police_data,
+        left_key=post_keys, right_key=incident_keys,
+        left_time='date', right_time='Date',
+        tolerance=pd.Timedelta(days=tolerance_days),
+        direction=direction,
+    )
+    if pairs.empty:
+        return pd.DataFrame(columns=columns)
+
+    posts = social_media_data.loc[pairs['left_index']]
+    incidents = police_data.loc[pairs['right_index']]
+    matches = pd.DataFrame({
+        'post_date': posts['date'].to_numpy(),
+        'address': post_keys.loc[pairs['left_index']].to_numpy(),
+        'content': posts['content'].to_numpy(),
+        'incident_date': incidents['Date'].to_numpy(),
+        'incident_type': incidents['incident_type'].to_numpy() if 'incident_type' in incidents else pd.NA,
+        'days_apart': (-pairs['time_delta']).dt.days.to_numpy(),
+    })
+    logger.info(f"Space-time join matched {len(matches)} post/incident pairs")
+    return matches.sort_values(['post_date', 'incident_date']).reset_index(drop=True)
@@ -0,0 +1,195 @@
+"""
+Resilient Stream Reader
+Video stream source that detects stalls, reconnects with jittered exponential backoff and fails over to backup URLs
+"""
+
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STATES = ('connecting', 'connected', 'backoff', 'closed')
+
+
+def open_capture(url: str, timeout_s: float):
+    """cv2.VideoCapture with open and read timeouts, so a dead stream cannot block a read forever"""
+    import cv2
+
+    timeout_ms = int(timeout_s * 1000)
+    params = [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_ms, cv2.CAP_PROP_READ_TIMEOUT_MSEC, timeout_ms]
+    return cv2.VideoCapture(url, cv2.CAP_FFMPEG, params)
+
+
+class ResilientStream:
+    """
+    A read()/release() source that keeps itself connected
+
+    read() never raises for stream problems and never blocks much longer
+    than stall_timeout: a failed read returns (False, None) like
+    cv2.VideoCapture, while the reader decides in the background of those
+    calls whether to retry, reconnect or fail over.
+
+    - A stream that fails max_read_failures reads in a row, or delivers no
+      frame for stall_timeout seconds, is closed and reopened.
+    - Reconnect attempts wait base_delay * 2^n seconds (capped at
+      max_delay) with equal jitter, so many cameras or viewers recovering
+      from the same outage do not hit the server in lockstep. Waiting
+      happens in short slices inside read(), so callers can still stop.
+    - After failover_after failed attempts on one URL the next URL in the
+      list is tried, e.g. BACKUP_CAMERA_STREAM_URL after the main camera.
+
+    Args:
+        urls: Stream URLs in order of preference
+        open_fn: Called as open_fn(url) -> capture with read()/isOpened()/release()
+        stall_timeout: Seconds without a frame before the stream is considered stalled
+        max_read_failures: Consecutive failed reads before reconnecting
+        base_delay, max_delay: Backoff bounds in seconds
+        failover_after: Failed connection attempts before moving to the next URL
+    """
+
+    def __init__(self, urls: Sequence[str], open_fn: Optional[Callable[[str], Any]] = None,
+                 stall_timeout: float = 10.0, max_read_failures: int = 30, base_delay: float = 0.5,
+                 max_delay: float = 30.0, failover_after: int = 3):
+        self.urls = [url for url in urls if url]
+        if not self.urls:
+            raise ValueError("ResilientStream needs at least one URL")
+        self.open_fn = open_fn or (lambda url: open_capture(url, stall_timeout))
+        self.stall_timeout = stall_timeout
+        self.max_read_failures = max_read_failures
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failover_after = failover_after
+
+        self.state = 'connecting'
+        self.active = 0
+        self.connections = 0
+        self.failovers = 0
+        self.read_failures = 0
+        self.last_error = ''
+        self._capture = None
+        self._attempts = 0
+        self._consecutive_failures = 0
+        self._retry_at = 0.0
+        self._created = time.monotonic()
+        self._connected_at: Optional[float] = None
+        self._connected_total = 0.0
+        self._last_frame: Optional[float] = None
+        self._last_progress = 0.0
+        self._closed = threading.Event()
+
+    def _backoff_delay(self) -> float:
+        delay = min(self.base_delay * 2 ** max(self._attempts - 1, 0), self.max_delay)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _disconnect(self, reason: str):
+        if self._capture is not None:
+            try:
+                self._capture.release()
+            except Exception as e:
+                logger.debug(f"Error releasing stream: {e}")
+            self._capture = None
+        if self._connected_at is not None:
+            self._connected_total += time.monotonic() - self._connected_at
+            self._connected_at = None
+        self.last_error = reason
+        self._schedule_retry()
+
+    def _schedule_retry(self):
+        self._attempts += 1
+        if self._attempts > self.failover_after and len(self.urls) > 1:
+            self.active = (self.active + 1) % len(self.urls)
+            self._attempts = 1
+            self.failovers += 1
+            logger.warning(f"Failing over to stream {self.active + 1} of {len(self.urls)}")
+        delay = self._backoff_delay()
+        self._retry_at = time.monotonic() + delay
+        self.state = 'backoff'
+        logger.warning(f"Stream unavailable ({self.last_error}); retrying in {delay:.1f}s")
+
+    def _connect(self) -> bool:
+        self.state = 'connecting'
+        try:
+            capture = self.open_fn(self.urls[self.active])
+            if capture is None or not capture.isOpened():
+                raise RuntimeError("could not open stream")
+        except Exception as e:
+            self.last_error = str(e)
+            self._schedule_retry()
+            return False
+        self.connections += 1
+        self._capture = capture
+        self._consecutive_failures = 0
+        self._connected_at = time.monotonic()
+        # The stall clock starts at connection time, not at the last frame before the outage
+        self._last_progress = self._connected_at
+        self.state = 'connected'
+        logger.info(f"Connected to stream {self.active + 1} of {len(self.urls)}")
+        return True
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if self._closed.is_set():
+            return False, None
+        if self._capture is None:
+            wait = self._retry_at - time.monotonic()
+            if wait > 0:
+                # Sleep in short slices so the caller's loop stays responsive to stop requests
+                self._closed.wait(min(wait, 0.25))
+                return False, None
+            if not self._connect():
+                return False, None
+
+        ok, frame = self._capture.read()
+        now = time.monotonic()
+        if ok and frame is not None:
+            self._consecutive_failures = 0
+            self._attempts = 0
+            self._last_frame = self._last_progress = now
+            return True, frame
+
+        self.read_failures += 1
+        self._consecutive_failures += 1
+        if self._consecutive_failures >= self.max_read_failures:
+            self._disconnect(f"{self._consecutive_failures} failed reads")
+        elif now - self._last_progress >= self.stall_timeout:
+            self._disconnect(f"no frame for {now - self._last_progress:.1f}s")
+        else:
+            self._closed.wait(0.05)
+        return False, None
+
+    def isOpened(self) -> bool:
+        return not self._closed.is_set()
+
+    def release(self):
+        self._closed.set()
+        if self._capture is not None:
+            self._capture.release()
+            self._capture = None
+        if self._connected_at is not None:
+            self._connected_total += time.monotonic() - self._connected_at
+            self._connected_at = None
+        self.state = 'closed'
+
+    @property
+    def reconnects(self) -> int:
+        return max(self.connections - 1, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Connection state, active URL index, uptime, availability, reconnects, failovers and frame age"""
+        now = time.monotonic()
+        connected = self._connected_total + (now - self._connected_at if self._connected_at is not None else 0.0)
+        return {
+            'state': self.state,
+            'active': self.active,
+            'uptime_s': now - self._connected_at if self._connected_at is not None else 0.0,
+            'availability': connected / max(now - self._created, 1e-9),
+            'reconnects': self.reconnects,
+            'failovers': self.failovers,
+            'read_failures': self.read_failures,
+            'frame_age_s': now - self._last_frame if self._last_frame is not None else None,
+            'last_error': self.last_error,
+        }
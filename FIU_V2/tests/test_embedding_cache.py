@@ -0,0 +1,35 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Shared modules live in the app root, one level above the tests
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from embedding_cache import EmbeddingStore
+
+
+def test_orphaned_rows_are_dropped_on_reload(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.append(['a'], np.array([[1, 2, 3]], dtype=np.float32))
+
+    # Simulate a crash after the vectors were written but before their keys were
+    with open(store.vectors_path, 'ab') as f:
+        f.write(np.array([[9, 9, 9]], dtype='<f4').tobytes())
+
+    store = EmbeddingStore(str(tmp_path))
+    store.append(['b'], np.array([[4, 5, 6]], dtype=np.float32))
+    np.testing.assert_array_equal(store.get(['a', 'b']), [[1, 2, 3], [4, 5, 6]])
+
+    reloaded = EmbeddingStore(str(tmp_path))
+    np.testing.assert_array_equal(reloaded.get(['a', 'b']), [[1, 2, 3], [4, 5, 6]])
+    assert store.vectors_path.stat().st_size == 2 * 3 * 4
+
+
+def test_orphaned_rows_before_first_key_are_dropped(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.append(['a'], np.array([[1, 2, 3]], dtype=np.float32))
+    store.keys_path.unlink()
+
+    store = EmbeddingStore(str(tmp_path))
+    store.append(['b'], np.array([[4, 5, 6]], dtype=np.float32))
+    np.testing.assert_array_equal(EmbeddingStore(str(tmp_path)).get(['b']), [[4, 5, 6]])
@@ -0,0 +1,218 @@
+"""
+Vehicle Tracker
+SORT/ByteTrack-style multi-object tracker with Kalman motion prediction and IoU association
+"""
+
+import logging
+from typing import List, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Constant-velocity model over [cx, cy, area, aspect, vcx, vcy, varea]
+_F = np.eye(7)
+_F[0, 4] = _F[1, 5] = _F[2, 6] = 1.0
+_H = np.eye(4, 7)
+_Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 0.0001])
+_R = np.diag([1.0, 1.0, 10.0, 10.0])
+_P0 = np.diag([10.0, 10.0, 10.0, 10.0, 10000.0, 10000.0, 10000.0])
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of two sets of [x1, y1, x2, y2] boxes"""
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)))
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-9)
+
+
+def expand_boxes(boxes: np.ndarray, scale: float) -> np.ndarray:
+    """Grow [x1, y1, x2, y2] boxes by scale times their size on each side"""
+    if scale <= 0 or len(boxes) == 0:
+        return boxes
+    pad = np.stack([boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]], axis=1) * scale
+    return boxes + np.hstack([-pad, pad])
+
+
+def greedy_match(scores: np.ndarray, threshold: float) -> List[Tuple[int, int]]:
+    """
+    Greedy one-to-one assignment on a score matrix, highest score first
+
+    Close to Hungarian assignment for tracking, where good matches are
+    usually unambiguous, at a fraction of the cost.
+    """
+    if scores.size == 0:
+        return []
+    rows, cols = np.nonzero(scores >= threshold)
+    order = np.argsort(-scores[rows, cols], kind='stable')
+    used_rows, used_cols, matches = set(), set(), []
+    for r, c in zip(rows[order], cols[order]):
+        if r not in used_rows and c not in used_cols:
+            used_rows.add(r)
+            used_cols.add(c)
+            matches.append((int(r), int(c)))
+    return matches
+
+
+def _box_to_z(box: np.ndarray) -> np.ndarray:
+    w, h = box[2] - box[0], box[3] - box[1]
+    return np.array([box[0] + w / 2.0, box[1] + h / 2.0, w * h, w / max(h, 1e-6)])
+
+
+def _x_to_box(x: np.ndarray) -> np.ndarray:
+    area, aspect = max(x[2], 1e-6), max(x[3], 1e-6)
+    w = np.sqrt(area * aspect)
+    h = area / w
+    return np.array([x[0] - w / 2.0, x[1] - h / 2.0, x[0] + w / 2.0, x[1] + h / 2.0])
+
+
+class Track:
+    """One tracked object with its Kalman state"""
+
+    def __init__(self, track_id: int, box: np.ndarray, class_id: int, score: float):
+        self.track_id = track_id
+        self.class_id = class_id
+        self.score = score
+        self.x = np.zeros(7)
+        self.x[:4] = _box_to_z(box)
+        self.P = _P0.copy()
+        self.hits = 1
+        self.misses = 0
+        self.box = np.asarray(box, dtype=float)
+
+    def predict(self):
+        if self.x[2] + self.x[6] <= 0:
+            self.x[6] = 0.0
+        self.x = _F @ self.x
+        self.P = _F @ self.P @ _F.T + _Q
+        self.box = _x_to_box(self.x)
+
+    def correct(self, box: np.ndarray, score: float):
+        y = _box_to_z(box) - _H @ self.x
+        S = _H @ self.P @ _H.T + _R
+        K = self.P @ _H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(7) - K @ _H) @ self.P
+        self.box = _x_to_box(self.x)
+        self.score = score
+        self.hits += 1
+        self.misses = 0
+
+    @property
+    def centroid(self) -> Tuple[float, float]:
+        return (float(self.box[0] + self.box[2]) / 2.0, float(self.box[1] + self.box[3]) / 2.0)
+
+
+class VehicleTracker:
+    """
+    Multi-object tracker with stable ids across frames
+
+    update() takes a frame's detections: every track is advanced by its
+    Kalman model, then matched to detections by IoU in two passes as in
+    ByteTrack (confident detections first, then the low-confidence ones
+    against the tracks still unmatched) and only within the same class.
+    predict() advances the tracks without detections, so the detector
+    can run every N frames while boxes and ids keep moving in between.
+
+    Boxes are compared with a buffer around them (as in C-BIoU), so a
+    new track whose velocity is still unknown, or a fast vehicle seen only
+    every few frames, still overlaps its next detection.
+
+    Args:
+        iou_threshold: Minimum buffered IoU for a detection to continue a track
+        buffer: Box growth on each side, as a fraction of the box size
+        high_score: Detections at or above this confidence are matched first
+        min_hits: Detections needed before a track is reported
+        max_misses: Detection rounds a track survives without a match
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, buffer: float = 0.3, high_score: float = 0.5,
+                 min_hits: int = 2, max_misses: int = 5):
+        self.iou_threshold = iou_threshold
+        self.buffer = buffer
+        self.high_score = high_score
+        self.min_hits = min_hits
+        self.max_misses = max_misses
+        self.tracks: List[Track] = []
+        self._next_id = 1
+
+    def _associate(self, tracks: List[Track], boxes: np.ndarray, classes: np.ndarray) -> List[Tuple[int, int]]:
+        if not tracks or len(boxes) == 0:
+            return []
+        track_boxes = np.array([t.box for t in tracks])
+        scores = iou_matrix(expand_boxes(track_boxes, self.buffer), expand_boxes(boxes, self.buffer))
+        scores[np.array([t.class_id for t in tracks])[:, None] != classes[None, :]] = 0.0
+        return greedy_match(scores, self.iou_threshold)
+
+    def update(self, boxes: np.ndarray, scores: np.ndarray, classes: np.ndarray) -> List[Track]:
+        """
+        Advance all tracks one frame and fold in that frame's detections
+
+        Args:
+            boxes: (N, 4) detections as [x1, y1, x2, y2]
+            scores: (N,) confidences
+            classes: (N,) integer class ids
+
+        Returns:
+            Confirmed tracks matched in this round
+        """
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        scores = np.asarray(scores, dtype=float).reshape(-1)
+        classes = np.asarray(classes, dtype=int).reshape(-1)
+        for track in self.tracks:
+            track.predict()
+
+        high = np.flatnonzero(scores >= self.high_score)
+        low = np.flatnonzero(scores < self.high_score)
+
+        # First pass: confident detections against every track
+        matched_tracks: Set[int] = set()
+        matched_high: Set[int] = set()
+        for t, d in self._associate(self.tracks, boxes[high], classes[high]):
+            self.tracks[t].correct(boxes[high[d]], scores[high[d]])
+            matched_tracks.add(t)
+            matched_high.add(d)
+
+        # Second pass: weak detections keep otherwise lost tracks alive (occlusion, blur)
+        remaining = [i for i in range(len(self.tracks)) if i not in matched_tracks]
+        for r, d in self._associate([self.tracks[i] for i in remaining], boxes[low], classes[low]):
+            self.tracks[remaining[r]].correct(boxes[low[d]], scores[low[d]])
+            matched_tracks.add(remaining[r])
+
+        for i, track in enumerate(self.tracks):
+            if i not in matched_tracks:
+                track.misses += 1
+        # Unmatched confident detections start new tracks; unmatched weak ones are treated as noise
+        for d, i in enumerate(high):
+            if d not in matched_high:
+                self.tracks.append(Track(self._next_id, boxes[i], int(classes[i]), float(scores[i])))
+                self._next_id += 1
+
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+        return self.active_tracks()
+
+    def predict(self) -> List[Track]:
+        """Advance all tracks one frame without detections; returns confirmed live tracks"""
+        for track in self.tracks:
+            track.predict()
+        return self.active_tracks()
+
+    def confirmed_tracks(self) -> List[Track]:
+        """Tracks with at least min_hits detections, including ones coasting between detections"""
+        return [t for t in self.tracks if t.hits >= self.min_hits]
+
+    def active_tracks(self) -> List[Track]:
+        """Confirmed tracks that matched a detection in the latest detection round"""
+        return [t for t in self.tracks if t.misses == 0 and t.hits >= self.min_hits]
+
+    def reset(self):
+        self.tracks = []
+        self._next_id = 1
+
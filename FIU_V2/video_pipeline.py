@@ -0,0 +1,204 @@
+"""
+Pipelined Video Processing
+Capture, inference and render stages on separate threads joined by drop-oldest queues
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class DropOldestQueue:
+    """
+    Bounded queue that discards its oldest item instead of blocking the producer
+
+    A slow consumer therefore always receives the freshest items and the
+    producer never stalls; the number of discarded items is kept in dropped.
+    """
+
+    def __init__(self, maxsize: int = 1):
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._items: Deque[Any] = deque()
+        self._cond = threading.Condition()
+
+    def put(self, item: Any):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """Oldest queued item, or None if nothing arrives within timeout"""
+        with self._cond:
+            if not self._items and not self._cond.wait_for(lambda: self._items, timeout):
+                return None
+            return self._items.popleft()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+
+class StageTimings:
+    """Rolling per-stage durations (seconds) over the last window samples"""
+
+    def __init__(self, window: int = 120):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._stamps: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(stage, deque(maxlen=self.window)).append(seconds)
+            self._stamps.setdefault(stage, deque(maxlen=self.window)).append(time.perf_counter())
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Mean and p95 duration in milliseconds and completed items per second, per stage"""
+        with self._lock:
+            samples = {stage: np.array(values) for stage, values in self._samples.items()}
+            stamps = {stage: list(values) for stage, values in self._stamps.items()}
+        summary = {}
+        for stage, values in samples.items():
+            span = stamps[stage][-1] - stamps[stage][0] if len(stamps[stage]) > 1 else 0.0
+            summary[stage] = {
+                'mean_ms': float(values.mean() * 1000),
+                'p95_ms': float(np.percentile(values, 95) * 1000),
+                'fps': (len(stamps[stage]) - 1) / span if span > 0 else 0.0,
+            }
+        return summary
+
+
+class FramePacket:
+    """A frame moving through the pipeline with its timing metadata"""
+
+    def __init__(self, index: int, frame: np.ndarray, captured_at: float, timings: Optional[Dict[str, float]] = None):
+        self.index = index
+        self.frame = frame
+        self.captured_at = captured_at
+        self.result: Any = None
+        self.timings: Dict[str, float] = timings or {}
+
+
+class VideoPipeline:
+    """
+    Three-stage live video pipeline
+
+    capture:   a thread reading frames from the source into a drop-oldest queue
+    inference: a thread running process_fn on the freshest captured frame
+    render:    the caller (Streamlit's script thread) taking finished packets
+
+    Decoding, inference and display overlap instead of running back to
+    back, so throughput approaches that of the slowest stage. Frames
+    that a slower stage cannot keep up with are dropped at the queue
+    rather than piling up as latency.
+
+    Args:
+        open_source: Returns an object with read() -> (ok, frame) and release()
+        process_fn: Called as process_fn(frame, index) on the inference thread;
+            its return value becomes packet.result
+        capture_queue_size, result_queue_size: Queue bounds between stages
+    """
+
+    def __init__(self, open_source: Callable[[], Any], process_fn: Callable[[np.ndarray, int], Any],
+                 capture_queue_size: int = 2, result_queue_size: int = 1):
+        self.open_source = open_source
+        self.process_fn = process_fn
+        self.captured = DropOldestQueue(capture_queue_size)
+        self.results = DropOldestQueue(result_queue_size)
+        self.timings = StageTimings()
+        self.read_failures = 0
+        self.source = None
+        self.error: Optional[BaseException] = None
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self) -> 'VideoPipeline':
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name='video-capture', daemon=True),
+            threading.Thread(target=self._inference_loop, name='video-inference', daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    @property
+    def running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def _capture_loop(self):
+        source = None
+        try:
+            source = self.source = self.open_source()
+            index = 0
+            while not self._stop.is_set():
+                started = time.perf_counter()
+                ok, frame = source.read()
+                if not ok:
+                    self.read_failures += 1
+                    time.sleep(0.05)
+                    continue
+                elapsed = time.perf_counter() - started
+                self.timings.record('capture', elapsed)
+                self.captured.put(FramePacket(index, frame, time.perf_counter(), timings={'capture': elapsed}))
+                index += 1
+        except Exception as e:
+            logger.error(f"Capture stage failed: {e}")
+            self.error = e
+            self._stop.set()
+        finally:
+            if source is not None:
+                source.release()
+
+    def _inference_loop(self):
+        try:
+            while not self._stop.is_set():
+                packet = self.captured.get(timeout=0.2)
+                if packet is None:
+                    continue
+                started = time.perf_counter()
+                packet.result = self.process_fn(packet.frame, packet.index)
+                elapsed = time.perf_counter() - started
+                packet.timings['inference'] = elapsed
+                self.timings.record('inference', elapsed)
+                self.results.put(packet)
+        except Exception as e:
+            logger.error(f"Inference stage failed: {e}")
+            self.error = e
+            self._stop.set()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[FramePacket]:
+        """Freshest processed packet for the render stage, or None on timeout"""
+        return self.results.get(timeout)
+
+    def record_render(self, packet: FramePacket, seconds: float):
+        """Report the render stage's time for a packet; also records end-to-end latency"""
+        packet.timings['render'] = seconds
+        self.timings.record('render', seconds)
+        self.timings.record('latency', time.perf_counter() - packet.captured_at)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-stage timings, dropped-frame and read-failure counters, and the source's health if it reports one"""
+        return {
+            'stages': self.timings.summary(),
+            'dropped_capture': self.captured.dropped,
+            'dropped_results': self.results.dropped,
+            'read_failures': self.read_failures,
+            'stream': self.source.stats() if hasattr(self.source, 'stats') else {},
+        }
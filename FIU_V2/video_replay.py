@@ -0,0 +1,235 @@
+"""
+Video Replay and Detection Benchmark
+Replays local video files as a stand-in for the live stream and times every stage of the detection loop
+"""
+
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from counting_zones import ZoneCounter, parse_zones
+from frame_annotation import draw_overlay
+from frame_delivery import AdaptiveJpegEncoder, downscale
+from vehicle_tracker import VehicleTracker
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('decode', 'inference', 'tracking', 'drawing', 'encode', 'total')
+
+
+class ReplaySource:
+    """
+    A video file that reads like a live stream
+
+    read() paces frames to the file's own frame rate times speed, so the
+    capture thread of the video pipeline sees the same arrival rate as
+    with the camera; speed 0 reads as fast as the file decodes, which is
+    what a benchmark wants. With loop the file restarts at its end
+    instead of reporting a failed read.
+
+    Args:
+        path: Video file
+        speed: Playback rate relative to the native frame rate, 0 for unthrottled
+        loop: Restart at the end of the file
+    """
+
+    def __init__(self, path, speed: float = 1.0, loop: bool = False):
+        self.path = str(path)
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Could not open video file {self.path}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self.speed = speed
+        self.loop = loop
+        self.frames_read = 0
+        self._started: Optional[float] = None
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        ok, frame = self.cap.read()
+        if not ok and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.cap.read()
+        if not ok:
+            return False, None
+
+        if self.speed > 0:
+            now = time.perf_counter()
+            if self._started is None:
+                self._started = now
+            delay = self._started + self.frames_read / (self.fps * self.speed) - now
+            if delay > 0:
+                time.sleep(delay)
+        self.frames_read += 1
+        return True, frame
+
+    def isOpened(self) -> bool:
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+
+def summarize(samples: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    """Count, mean and p50/p95/p99 in milliseconds per stage"""
+    summary = {}
+    for stage, values in samples.items():
+        if not values:
+            continue
+        ms = np.asarray(values) * 1000
+        summary[stage] = {
+            'count': len(ms),
+            'mean_ms': float(ms.mean()),
+            'p50_ms': float(np.percentile(ms, 50)),
+            'p95_ms': float(np.percentile(ms, 95)),
+            'p99_ms': float(np.percentile(ms, 99)),
+        }
+    return summary
+
+
+def run_benchmark(source, detect_fn: Callable, max_frames: int = 500, detect_interval: int = 1,
+                  rois: Optional[Sequence] = None, display_width: int = 960, jpeg_target_kb: float = 60.0,
+                  gate=None, zones_spec: str = '', controller=None) -> Dict:
+    """
+    Time the live detection loop stage by stage on a replayed source
+
+    The loop matches process_live_feed's per-frame work, run serially so
+    each stage is measured on its own: decode, detection (every
+    detect_interval frames, optionally behind a motion gate), tracker
+    update or prediction, counting and drawing, and the downscale and
+    adaptive JPEG encode a frame costs before it reaches the browser.
+
+    Args:
+        source: Object with read() -> (ok, frame), e.g. ReplaySource
+        detect_fn: Called as detect_fn([frame]) -> [(boxes, scores, classes)]
+        max_frames: Frames to process
+        detect_interval: Run the detector every N frames
+        rois: Regions outlined on the frame
+        display_width, jpeg_target_kb: Settings of the encode stage
+        gate: Optional MotionGate
+        zones_spec: Counting zones as accepted by parse_zones()
+        controller: Optional AdaptiveController deciding the detection frames instead of
+            detect_interval; detect_fn should read its imgsz
+
+    Returns:
+        Per-stage latency summary, end-to-end fps and final counts
+    """
+    zones = parse_zones(zones_spec)
+    tracker, counter = VehicleTracker(), ZoneCounter(zones)
+    encoder = AdaptiveJpegEncoder(jpeg_target_kb)
+    samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    processed = 0
+    wall_started = time.perf_counter()
+
+    while processed < max_frames:
+        started = time.perf_counter()
+        ok, frame = source.read()
+        if not ok:
+            break
+        decoded = time.perf_counter()
+        samples['decode'].append(decoded - started)
+
+        detections = None
+        due = controller.should_detect() if controller is not None else processed % detect_interval == 0
+        if due and (gate is None or gate.check(frame)):
+            detections = detect_fn([frame])[0]
+            samples['inference'].append(time.perf_counter() - decoded)
+
+        tracked_from = time.perf_counter()
+        # Gated frames advance the tracks like any frame without detections
+        tracks = tracker.update(*detections) if detections is not None else tracker.predict()
+        drawn_from = time.perf_counter()
+        samples['tracking'].append(drawn_from - tracked_from)
+
+        counter.update(tracker.confirmed_tracks(), frame.shape[1], frame.shape[0])
+        totals = counter.totals()
+        draw_overlay(frame, tracks, zones, totals.get(2, 0), totals.get(0, 0), rois)
+        encoded_from = time.perf_counter()
+        samples['drawing'].append(encoded_from - drawn_from)
+
+        encoder.encode(downscale(frame, display_width))
+        finished = time.perf_counter()
+        samples['encode'].append(finished - encoded_from)
+        samples['total'].append(finished - started)
+        if controller is not None:
+            # Decode is the source's cost, not the loop's
+            detect_seconds = samples['inference'][-1] if detections is not None else 0.0
+            controller.record(finished - decoded, detect_seconds, detections is not None)
+        processed += 1
+
+    wall = time.perf_counter() - wall_started
+    return {
+        'frames': processed,
+        'fps': processed / wall if wall > 0 else 0.0,
+        'stages': summarize(samples),
+        'counts': counter.counts(),
+        'gated': gate.gated if gate is not None else 0,
+        'adaptive': controller.stats() if controller is not None else {},
+    }
+
+
+if __name__ == "__main__":
+    # Reproducible numbers before and after a detector change, e.g.
+    #   python video_replay.py data/clips/intersection.mp4 --backend onnx --output onnx.json
+    from adaptive_inference import AdaptiveController
+    from config import config
+    from detector_backends import BACKENDS, load_detector
+    from motion_gating import GATING_METHODS, MotionGate, RoiDetector, parse_rois
+
+    parser = argparse.ArgumentParser(description="Benchmark the vehicle detection loop on a recorded video")
+    parser.add_argument('video')
+    parser.add_argument('--frames', type=int, default=500)
+    parser.add_argument('--speed', type=float, default=0.0, help="Playback speed, 0 = as fast as possible")
+    parser.add_argument('--backend', default=config.DETECTION_BACKEND, choices=BACKENDS)
+    parser.add_argument('--detect-interval', type=int, default=1)
+    parser.add_argument('--adaptive', action='store_true', help="Adapt input size and interval to --target-fps")
+    parser.add_argument('--target-fps', type=float, default=config.INFERENCE_TARGET_FPS)
+    parser.add_argument('--gating', default='off', choices=GATING_METHODS)
+    parser.add_argument('--display-width', type=int, default=config.DISPLAY_WIDTH)
+    parser.add_argument('--jpeg-target-kb', type=float, default=config.JPEG_TARGET_KB)
+    parser.add_argument('--output', default=None, help="Write the results as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    detector = load_detector(
+        args.backend, config.DETECTION_MODEL, config.DETECTION_IMGSZ,
+        config.DETECTION_MODEL_DIR, config.DETECTION_CALIBRATION_DIR
+    )
+    rois = parse_rois(config.DETECTION_ROIS)
+    controller = AdaptiveController(
+        args.target_fps, config.ADAPTIVE_MIN_IMGSZ, config.DETECTION_IMGSZ,
+        args.detect_interval, config.ADAPTIVE_MAX_INTERVAL
+    ) if args.adaptive else None
+    roi_detector = RoiDetector(
+        lambda images, classes: detector.detect(images, classes, imgsz=controller.imgsz if controller else None), rois
+    )
+    gate = MotionGate(args.gating, rois, threshold=config.MOTION_THRESHOLD, heartbeat=config.MOTION_HEARTBEAT)
+
+    source = ReplaySource(args.video, speed=args.speed)
+    try:
+        result = run_benchmark(
+            source, lambda frames: roi_detector.detect(frames, classes=[0, 2]),
+            max_frames=args.frames, detect_interval=args.detect_interval, rois=rois,
+            display_width=args.display_width, jpeg_target_kb=args.jpeg_target_kb, gate=gate,
+            zones_spec=config.COUNTING_ZONES, controller=controller,
+        )
+    finally:
+        source.release()
+    result.update({'video': args.video, 'backend': args.backend, 'detect_interval': args.detect_interval})
+
+    print(f"{Path(args.video).name}: {result['frames']} frames at {result['fps']:.1f} fps end to end "
+          f"({args.backend}, detector every {args.detect_interval} frame(s), {result['gated']} gated)")
+    if controller is not None:
+        adaptive = result['adaptive']
+        print(f"Adaptive: settled at {adaptive['imgsz']}px every {adaptive['interval']} frame(s), "
+              f"load {adaptive['load']:.2f} after {adaptive['adjustments']} adjustment(s)")
+    print(f"{'stage':<11}{'count':>7}{'mean ms':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for stage, s in result['stages'].items():
+        print(f"{stage:<11}{s['count']:>7}{s['mean_ms']:>9.2f}{s['p50_ms']:>9.2f}{s['p95_ms']:>9.2f}{s['p99_ms']:>9.2f}")
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2))